@@ -1,11 +1,17 @@
 # app/api/auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, session, g, flash, request as rq, abort
+import hashlib
+import os
+from pathlib import Path
+from flask import Blueprint, Response, render_template, request, redirect, url_for, session, g, flash, request as rq, abort, make_response
 from functools import wraps
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import or_, func
-from app.repositories.db import get_db
-from app.models.models import UsuarioMunicipal, Emergencia
-from app.constants.status import estado_display, ESTADO_STYLES, ESTADO_DISPLAY
+from itertools import chain
+from typing import Callable, Hashable, Optional
+from app.repositories.db import get_session, solo_lectura
+from app.repositories import emergencias as emergencias_repo
+from app.services.cache_usuarios import obtener_usuario
+from app.models.models import UsuarioMunicipal
+from app.constants.roles import PERMISSION_BITS, PERMISSION_MANAGE_USERS
+from app.constants.status import ESTADO_STYLES, ESTADO_DISPLAY
 from app.constants.geo import ALL_DISTRICTS
 from app.constants.types import EMERGENCY_TYPES
 
@@ -21,13 +27,15 @@ def login_required(f):
 
 def admin_required(f):
     """Decorador que requiere que el usuario sea administrador"""
+    bit = PERMISSION_BITS[PERMISSION_MANAGE_USERS]
     @wraps(f)
     def _wrap(*args, **kwargs):
         if not session.get("user_id"):
             return redirect(url_for("auth.login"))
         if not g.user:
             return redirect(url_for("auth.login"))
-        if not g.user.is_admin and not g.user.has_permission("puede_gestionar_usuarios"):
+        # El super admin tiene todos los bits de la máscara
+        if not g.user.permisos_mask & bit:
             flash("No tienes permisos para acceder a esta sección", "error")
             return redirect(url_for("auth.inicio"))
         return f(*args, **kwargs)
@@ -35,6 +43,7 @@ def admin_required(f):
 
 def permission_required(permission: str):
     """Decorador que verifica un permiso específico"""
+    bit = PERMISSION_BITS[permission]
     def decorator(f):
         @wraps(f)
         def _wrap(*args, **kwargs):
@@ -42,28 +51,83 @@ def permission_required(permission: str):
                 return redirect(url_for("auth.login"))
             if not g.user:
                 return redirect(url_for("auth.login"))
-            if not g.user.has_permission(permission):
+            if not g.user.permisos_mask & bit:
                 flash(f"No tienes permisos suficientes para realizar esta acción", "error")
                 return redirect(url_for("auth.inicio"))
             return f(*args, **kwargs)
         return _wrap
     return decorator
 
+def _version_codigo() -> str:
+    """Versión del código desplegado para los ETag: APP_VERSION o, si no se define,
+    un hash de los mtime del código y las plantillas (igual en todos los workers)"""
+    version = os.getenv("APP_VERSION")
+    if version:
+        return version
+    raiz = Path(__file__).resolve().parent.parent
+    archivos = sorted(chain(raiz.rglob("*.py"), (raiz / "templates").rglob("*.html")))
+    marcas = "".join(f"{a.relative_to(raiz)}:{a.stat().st_mtime_ns};" for a in archivos)
+    return hashlib.sha1(marcas.encode()).hexdigest()[:12]
+
+
+# Una respuesta generada por otra versión del código no se reutiliza
+VERSION_CODIGO = _version_codigo()
+
+
+def con_etag(version: Callable[..., Optional[Hashable]]):
+    """
+    Respuesta condicional (ETag / If-None-Match) para vistas GET de solo lectura.
+
+    `version(**kwargs)` recibe los argumentos de la vista y devuelve lo que
+    identifica a los datos de la respuesta (versión del catálogo, marcas de las
+    filas...), con una consulta barata; None si la respuesta no se puede
+    versionar (por ejemplo, un 404). El ETag combina esa versión con la ruta,
+    la query string, el usuario y VERSION_CODIGO.
+
+    Si el navegador envía el mismo ETag en If-None-Match se responde 304 sin
+    ejecutar la vista. add_no_cache_headers deja estas respuestas como
+    `private, no-cache` (el navegador las guarda y las revalida en cada uso).
+    """
+    def decorator(f):
+        @wraps(f)
+        def _wrap(*args, **kwargs):
+            v = version(**kwargs)
+            if v is None:
+                return f(*args, **kwargs)
+            clave = (VERSION_CODIGO, rq.path, sorted(rq.args.items(multi=True)), session.get("user_id"), v)
+            etag = hashlib.sha1(repr(clave).encode()).hexdigest()
+            if rq.if_none_match.contains_weak(etag):
+                resp = Response(status=304)
+                resp.set_etag(etag, weak=True)
+                return resp
+            resp = make_response(f(*args, **kwargs))
+            if resp.status_code == 200:
+                resp.set_etag(etag, weak=True)
+            return resp
+        return _wrap
+    return decorator
+
 @auth_bp.before_app_request
 def load_current_user():
     g.user = None
+    # Los archivos estáticos no usan el usuario: no se consulta
+    if rq.endpoint and rq.endpoint.split('.')[-1] == 'static':
+        return
     uid = session.get("user_id")
     if uid:
-        with next(get_db()) as db:
-            # Cargar usuario con sus roles para evitar DetachedInstanceError
-            g.user = db.query(UsuarioMunicipal).options(
-                joinedload(UsuarioMunicipal.roles)
-            ).filter_by(usuario_municipal_id=uid).first()
+        # Usuario y roles desde la caché en proceso (TTL corto, ver app/services/cache_usuarios.py)
+        g.user = obtener_usuario(uid)
 
 @auth_bp.after_app_request
 def add_no_cache_headers(resp):
     
     if rq.endpoint and not rq.endpoint.startswith('static'):
+        if resp.headers.get('ETag'):
+            # Respuesta de @con_etag: el navegador la guarda y la revalida con
+            # If-None-Match; nunca en cachés compartidas (private)
+            resp.headers['Cache-Control'] = 'private, no-cache'
+            resp.vary.add('Cookie')
+            return resp
         resp.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0, private'
         resp.headers['Pragma'] = 'no-cache'
         resp.headers['Expires'] = '0'
@@ -78,18 +142,18 @@ def login():
     if rq.method == "POST":
         email = rq.form.get("email")
         password = rq.form.get("password")
-        with next(get_db()) as db:
-            user = db.query(UsuarioMunicipal).filter_by(email_usuario=email).first()
-            if not user:
-                flash("Usuario no encontrado", "error")
-                return render_template("login.html")
-            if not user.is_active:
-                flash("Usuario desactivado. Contacta al administrador", "error")
-                return render_template("login.html")
-            if user.password_usuario == password:
-                session["user_id"] = user.usuario_municipal_id
-                return redirect(url_for("auth.inicio"))
-            flash("Credenciales inválidas", "error")
+        db = get_session()
+        user = db.query(UsuarioMunicipal).filter_by(email_usuario=email).first()
+        if not user:
+            flash("Usuario no encontrado", "error")
+            return render_template("login.html")
+        if not user.is_active:
+            flash("Usuario desactivado. Contacta al administrador", "error")
+            return render_template("login.html")
+        if user.password_usuario == password:
+            session["user_id"] = user.usuario_municipal_id
+            return redirect(url_for("auth.inicio"))
+        flash("Credenciales inválidas", "error")
     return render_template("login.html")
 
 
@@ -101,67 +165,22 @@ def logout():
 
 @auth_bp.route("/inicio")
 @login_required
+@solo_lectura
 def inicio():
-    # Parámetros de filtro
-    q = (rq.args.get('q') or '').strip()
-    distrito = (rq.args.get('distrito') or '').strip()
-    estado = (rq.args.get('estado') or '').strip()
-    tipo = (rq.args.get('tipo') or '').strip()
-    desde = (rq.args.get('desde') or '').strip()
-    hasta = (rq.args.get('hasta') or '').strip()
-    sort = (rq.args.get('sort') or '').strip()  # id|nombre|distrito|estado|fecha
-    direction = (rq.args.get('dir') or 'desc').lower()  # asc|desc
-
-    with next(get_db()) as db:
-        # Construir consulta con filtros
-        query = db.query(Emergencia)
-
-        if q:
-            if q.isdigit():
-                query = query.filter(or_(Emergencia.id_emergencias == int(q),
-                                         Emergencia.Nombre_emergencia.ilike(f"%{q}%")))
-            else:
-                query = query.filter(Emergencia.Nombre_emergencia.ilike(f"%{q}%"))
-
-        if distrito:
-            query = query.filter(Emergencia.distrito == distrito)
-
-        if estado:
-            query = query.filter(Emergencia.estado == estado)
-
-        if tipo:
-            query = query.filter(Emergencia.tipo == tipo)
-
-        # Rango de fechas por fecha_reporte
-        if desde:
-            try:
-                # interpretar como fecha (YYYY-MM-DD). Comparar desde 00:00:00
-                query = query.filter(func.date(Emergencia.fecha_reporte) >= desde)
-            except Exception:
-                pass
-        if hasta:
-            try:
-                query = query.filter(func.date(Emergencia.fecha_reporte) <= hasta)
-            except Exception:
-                pass
-
-        # Ordenamiento
-        sort_map = {
-            'id': Emergencia.id_emergencias,
-            'nombre': Emergencia.Nombre_emergencia,
-            'distrito': Emergencia.distrito,
-            'estado': Emergencia.estado,
-            'fecha': Emergencia.fecha_reporte,
-        }
-        col = sort_map.get(sort or 'id', Emergencia.id_emergencias)
-        if direction == 'asc':
-            query = query.order_by(col.asc())
-        else:
-            query = query.order_by(col.desc())
-
-        emergencias = query.all()
-
-        # Opciones para selects (no filtradas) 
+    # Parámetros de filtro y orden (sort: id|nombre|distrito|estado|fecha|relevancia, dir: asc|desc)
+    filtros = emergencias_repo.FiltrosEmergencias.desde_args(rq.args)
+    limite = emergencias_repo.leer_limite(rq.args.get('limite'))
+    cursor = (rq.args.get('cursor') or '').strip() or None
+
+    db = get_session()
+    try:
+        pagina = emergencias_repo.pagina(db, filtros, limite, cursor)
+    except ValueError:
+        # Cursor vencido o de otro orden: volver a la primera página
+        pagina = emergencias_repo.pagina(db, filtros, limite)
+    emergencias = pagina.filas
+    total = emergencias_repo.contar(db, filtros)
+
     # Opciones fijas: Distritos de Lima + Callao y tipos predefinidos
     distritos_opts = sorted(ALL_DISTRICTS)
     tipos_opts = EMERGENCY_TYPES  # dict codigo -> etiqueta
@@ -169,22 +188,8 @@ def inicio():
     # Se reutilizan estilos y display centralizados
     estado_map = ESTADO_STYLES
 
-    markers = []
-    for e in emergencias:
-        # Mostrar en el mapa todas las emergencias que tengan coordenadas
-        if e.lat is not None and e.lon is not None:
-            try:
-                markers.append({
-                    "id": e.id_emergencias,
-                    "nombre": e.Nombre_emergencia,
-                    "distrito": e.distrito or "",
-                    # Mostrar etiqueta amigable en el popup del mapa
-                    "estado": estado_display(e.estado) or e.estado,
-                    "lat": float(e.lat),
-                    "lon": float(e.lon),
-                })
-            except Exception:
-                pass
+    # Solo las emergencias de la página actual (con coordenadas) van al mapa
+    markers = [m for m in (e.a_marcador() for e in emergencias) if m is not None]
 
     return render_template(
         "inicio.html",
@@ -192,18 +197,15 @@ def inicio():
         estado_map=estado_map,
         estado_display_map=ESTADO_DISPLAY,
         markers=markers,
-        filtros={
-            "q": q,
-            "distrito": distrito,
-            "estado": estado,
-            "tipo": tipo,
-            "desde": desde,
-            "hasta": hasta,
-            "sort": sort or 'id',
-            "dir": direction,
-        },
+        filtros=filtros.a_dict(),
         distritos_opts=distritos_opts,
         estados_opts=list(ESTADO_DISPLAY.keys()),
         tipos_opts=tipos_opts,
-        total=len(emergencias)
+        total=total,
+        args_paginacion=dict(
+            {k: v for k, v in filtros.a_dict().items() if v},
+            **({"limite": limite} if limite != emergencias_repo.LIMITE_DEFAULT else {})
+        ),
+        siguiente_cursor=pagina.siguiente_cursor,
+        anterior_cursor=pagina.anterior_cursor
     )
@@ -1,11 +1,21 @@
-from flask import Blueprint, render_template, request, jsonify, g
-from datetime import datetime
+import csv
+import io
+import json
+from flask import Blueprint, Response, render_template, request, jsonify, g, stream_with_context
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List
 from sqlalchemy.exc import SQLAlchemyError
-from app.api.auth import login_required, permission_required
-from app.repositories.db import get_db
+from app.api.auth import con_etag, login_required, permission_required
+from app.repositories.db import get_session, solo_lectura
+from app.repositories import emergencias as emergencias_repo
+from app.repositories import estadisticas as estadisticas_repo
+from app.repositories import versiones as versiones_repo
 from app.models.models import Emergencia
-from app.constants.geo import ALL_DISTRICTS, LIMA_CALLAO_BBOX
-from app.constants.status import ESTADOS_CIERRE, normalizar_estado
+from app.constants.status import ESTADOS_CIERRE, ESTADO_STYLES, estado_display
+from app.services.cache_reportes import cache_reportes
+from app.services import importacion_emergencias as importacion
+from app.services.eventos_emergencias import canal_emergencias, datos_emergencia
+from app.services.validacion_emergencias import validar_emergencia
 
 emergencia_bp = Blueprint("emergencia", __name__)
 
@@ -16,6 +26,156 @@ def crear_emergencia():
     return render_template("crear_emer.html")
 
 
+def _version_listado():
+    """Cualquier alta, cambio de estado o archivado incrementa la versión"""
+    return versiones_repo.leer(get_session(), versiones_repo.EMERGENCIAS)
+
+
+@emergencia_bp.route("/api/emergencias", methods=["GET"])
+@login_required
+@solo_lectura
+@con_etag(_version_listado)
+def api_listar_emergencias():
+    """Listado de emergencias en JSON, con los mismos filtros y páginas que /inicio.
+
+    Query parameters opcionales:
+        - q, distrito, estado, tipo, desde, hasta: filtros (como en /inicio); q busca
+          en nombre, descripción y dirección sin distinguir tildes
+        - sort: id|nombre|distrito|estado|fecha|relevancia (default: relevancia si hay q,
+          si no id), dir: asc|desc (default: desc)
+        - limite: tamaño de página (default: 50, máximo 200)
+        - cursor: siguiente_cursor o anterior_cursor de una respuesta anterior
+
+    Con If-None-Match responde 304 si no cambió ninguna emergencia (ver con_etag).
+    """
+    filtros = emergencias_repo.FiltrosEmergencias.desde_args(request.args)
+    limite = emergencias_repo.leer_limite(request.args.get('limite'))
+    cursor = (request.args.get('cursor') or '').strip() or None
+
+    db = get_session()
+    try:
+        pagina = emergencias_repo.pagina(db, filtros, limite, cursor)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Parámetros inválidos: {e}"}), 400
+    # El total solo se calcula en la primera página; al paginar no cambia
+    total = emergencias_repo.contar(db, filtros) if cursor is None else None
+
+    return jsonify({
+        "ok": True,
+        "filtros": filtros.a_dict(),
+        "total": total,
+        "limite": limite,
+        "data": [e.a_dict() for e in pagina.filas],
+        "siguiente_cursor": pagina.siguiente_cursor,
+        "anterior_cursor": pagina.anterior_cursor
+    }), 200
+
+
+FORMATOS_EXPORTACION = {
+    "csv": ("text/csv", "emergencias.csv"),
+    "ndjson": ("application/x-ndjson", "emergencias.ndjson"),
+}
+# Filas por bloque enviado al cliente
+FILAS_POR_BLOQUE = 200
+
+
+def _lineas_csv(filas: Iterator[Dict[str, Any]], columnas: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=columnas, lineterminator="\r\n")
+    # BOM para que Excel reconozca UTF-8 (tildes y ñ)
+    buffer.write("\ufeff")
+    escritor.writeheader()
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for i, fila in enumerate(filas, 1):
+        escritor.writerow(fila)
+        if i % FILAS_POR_BLOQUE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _lineas_ndjson(filas: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    bloque = []
+    for fila in filas:
+        bloque.append(json.dumps(fila, ensure_ascii=False) + "\n")
+        if len(bloque) == FILAS_POR_BLOQUE:
+            yield "".join(bloque)
+            bloque = []
+    yield "".join(bloque)
+
+
+@emergencia_bp.route("/api/emergencias/export", methods=["GET"])
+@login_required
+@solo_lectura
+def api_exportar_emergencias():
+    """Exporta todas las emergencias que cumplen los filtros de /inicio, en streaming.
+
+    Query parameters opcionales:
+        - formato (o format): csv|ndjson (default: csv)
+        - q, distrito, estado, tipo, desde, hasta, sort, dir: como en GET /api/emergencias
+        - conteos=1: agrega las columnas recursos y acciones (cantidad por emergencia)
+
+    Las filas se leen de la BD con un cursor del servidor y se envían a medida
+    que llegan: la memoria no depende del tamaño de la exportación.
+    """
+    formato = (request.args.get('formato') or request.args.get('format') or 'csv').lower()
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({"ok": False, "error": "Parámetros inválidos: formato debe ser csv o ndjson"}), 400
+    con_conteos = request.args.get('conteos') in ('1', 'true', 'si')
+    filtros = emergencias_repo.FiltrosEmergencias.desde_args(request.args)
+
+    def filas():
+        # Se consulta recién al empezar a enviar: el encabezado CSV sale de inmediato
+        return emergencias_repo.exportar(get_session(), filtros, con_conteos)
+
+    if formato == "csv":
+        columnas = [nombre for nombre, _ in emergencias_repo.COLUMNAS_EXPORTACION]
+        if con_conteos:
+            columnas += emergencias_repo.COLUMNAS_CONTEOS
+        cuerpo = _lineas_csv(filas(), columnas)
+    else:
+        cuerpo = _lineas_ndjson(filas())
+
+    tipo_contenido, archivo = FORMATOS_EXPORTACION[formato]
+    return Response(
+        stream_with_context(cuerpo),
+        mimetype=tipo_contenido,
+        headers={"Content-Disposition": f'attachment; filename="{archivo}"'},
+    )
+
+
+@emergencia_bp.route("/api/estadisticas", methods=["GET"])
+@login_required
+@solo_lectura
+def api_estadisticas():
+    """Cantidad de emergencias por estado, distrito y tipo (tabla de conteos agregados).
+
+    Query parameters opcionales:
+        - estado, distrito, tipo: filtros exactos
+        - desde, hasta: días de reporte YYYY-MM-DD (ambos incluidos)
+    """
+    try:
+        desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else None
+        hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else None
+    except ValueError:
+        return jsonify({"ok": False, "error": "Parámetros inválidos: las fechas deben ser YYYY-MM-DD"}), 400
+
+    db = get_session()
+    resumen = estadisticas_repo.resumen(
+        db,
+        estado=(request.args.get('estado') or '').strip(),
+        distrito=(request.args.get('distrito') or '').strip(),
+        tipo=(request.args.get('tipo') or '').strip(),
+        desde=desde,
+        hasta=hasta,
+    )
+    return jsonify({"ok": True, **resumen}), 200
+
+
 @emergencia_bp.route("/api/emergencias", methods=["POST"])
 @login_required
 @permission_required("puede_crear_emergencias")
@@ -28,89 +188,116 @@ def api_crear_emergencia():
     """
     data = request.get_json(silent=True) or {}
 
-    # Uso de listas y bounding box unificados (incluye Callao)
-    LIMA_BBOX = LIMA_CALLAO_BBOX
-
-    # Extraer y normalizar payload
-    nombre = (data.get("nombre") or data.get("Nombre_emergencia") or "").strip()
-    descripcion = (data.get("descripcion") or data.get("detalles") or "").strip()
-    tipo = (data.get("tipo") or data.get("emergency_type") or "").strip()
-    estado = (data.get("estado") or data.get("emergency_status") or "").strip()
-    direccion = (data.get("direccion") or data.get("location") or "").strip()
-    distrito = (data.get("distrito") or data.get("distrito_lima") or "").strip()
-
-    # Lat/Lon pueden venir como string
-    def to_float(v):
-        try:
-            if v is None or v == "":
-                return None
-            return float(v)
-        except (TypeError, ValueError):
-            return None
-
-    lat = to_float(data.get("lat"))
-    lon = to_float(data.get("lon"))
-
-    # Validación mínima
-    if not nombre:
-        return jsonify({"ok": False, "error": "El nombre de la emergencia es obligatorio."}), 400
-
-    # Validaciones de ámbito Lima Metropolitana
-    # 1) Distrito es obligatorio y debe pertenecer a Lima Metropolitana
-    if not distrito:
-        return jsonify({
-            "ok": False,
-            "error": "Debe seleccionar un distrito de Lima Metropolitana."
-        }), 400
-    if distrito not in ALL_DISTRICTS:
-        return jsonify({
-            "ok": False,
-            "error": "Solo se permiten distritos de Lima Metropolitana."
-        }), 400
-
-    # 2) Si hay coordenadas, deben caer dentro de la caja de Lima
-    if lat is not None and lon is not None:
-        if not (LIMA_BBOX["south"] <= lat <= LIMA_BBOX["north"] and LIMA_BBOX["west"] <= lon <= LIMA_BBOX["east"]):
-            return jsonify({
-                "ok": False,
-                "error": "Las coordenadas deben ubicarse dentro de Lima Metropolitana."
-            }), 400
-
-    # Timestamps automáticos
-    # Normalización de estado para coincidir con ENUM de la BD ('ABIERTA','EN PROGRESO','ATENDIDA')
-    estado_norm = normalizar_estado(estado)
-    now_utc = datetime.utcnow()
-    fecha_cierre = now_utc if (estado_norm in ESTADOS_CIERRE) else None
+    # Validación (mismas reglas que la importación masiva) y timestamps automáticos
+    try:
+        valores = validar_emergencia(data, datetime.utcnow())
+    except ValueError as ex:
+        return jsonify({"ok": False, "error": str(ex)}), 400
 
     try:
-        with next(get_db()) as db:
-            e = Emergencia(
-                Nombre_emergencia=nombre,
-                descripcion=descripcion or None,
-                tipo=tipo or None,
-                estado=estado_norm or None,
-                fecha_reporte=now_utc,
-                fecha_cierre=fecha_cierre,
-                lat=lat,
-                lon=lon,
-                direccion=direccion or None,
-                distrito=distrito or None,
-                usuario_municipal_id_usuario=(g.user.usuario_municipal_id if getattr(g, 'user', None) else None)
-            )
-            db.add(e)
-            db.commit()
-            db.refresh(e)
-            return jsonify({
-                "ok": True,
-                "id": e.id_emergencias,
-                "fecha_reporte": e.fecha_reporte.isoformat(sep=' ', timespec='seconds') if e.fecha_reporte else None,
-                "fecha_cierre": e.fecha_cierre.isoformat(sep=' ', timespec='seconds') if e.fecha_cierre else None
-            }), 201
+        db = get_session()
+        e = Emergencia(
+            **valores,
+            usuario_municipal_id_usuario=(g.user.usuario_municipal_id if getattr(g, 'user', None) else None)
+        )
+        db.add(e)
+        # Conteo agregado de /api/estadisticas, en la misma transacción
+        estadisticas_repo.registrar_alta(db, e)
+        # Versión del listado (ETag de GET /api/emergencias)
+        versiones_repo.incrementar(db, versiones_repo.EMERGENCIAS)
+        db.commit()
+        db.refresh(e)
+        # Aviso en vivo a los paneles abiertos (GET /api/emergencias/stream)
+        canal_emergencias.publicar("creada", datos_emergencia(e))
+        return jsonify({
+            "ok": True,
+            "id": e.id_emergencias,
+            "fecha_reporte": e.fecha_reporte.isoformat(sep=' ', timespec='seconds') if e.fecha_reporte else None,
+            "fecha_cierre": e.fecha_cierre.isoformat(sep=' ', timespec='seconds') if e.fecha_cierre else None
+        }), 201
     except SQLAlchemyError as ex:
         # En caso de error de BD
         return jsonify({"ok": False, "error": str(ex)}), 500
 
 
+# Content-Type aceptados por la importación masiva
+TIPOS_IMPORTACION = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+}
+
+
+@emergencia_bp.route("/api/emergencias/bulk", methods=["POST"])
+@login_required
+@permission_required("puede_crear_emergencias")
+def api_importar_emergencias():
+    """Crea muchas emergencias en una sola llamada (migraciones, simulacros).
+
+    Cuerpo (según Content-Type):
+        - application/json: lista de emergencias (o {"emergencias": [...]})
+        - text/csv: CSV con encabezado
+        - application/x-ndjson: una emergencia JSON por línea
+    Cada emergencia lleva los mismos campos que POST /api/emergencias y,
+    opcionalmente, fecha_reporte y fecha_cierre (YYYY-MM-DD HH:MM:SS, UTC).
+
+    Las filas inválidas no detienen la importación: se devuelven en "errores"
+    con su número (posición en la lista, fila de datos del CSV o línea). Si el
+    archivo deja de poder leerse se responde 400 con error_archivo y las filas
+    ya insertadas (insertadas), que no hay que volver a enviar.
+    """
+    if request.mimetype == "application/json":
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            data = data.get("emergencias")
+        if not isinstance(data, list):
+            return jsonify({"ok": False, "error": "Se esperaba una lista de emergencias"}), 400
+        filas = enumerate(data, start=1)
+    elif request.mimetype in TIPOS_IMPORTACION:
+        filas = importacion.leer(importacion.lineas_utf8(request.stream), TIPOS_IMPORTACION[request.mimetype])
+    else:
+        return jsonify({
+            "ok": False,
+            "error": "Content-Type debe ser application/json, text/csv o application/x-ndjson"
+        }), 415
+
+    resultado = importacion.importar(
+        get_session(), filas,
+        usuario_id=(g.user.usuario_municipal_id if getattr(g, 'user', None) else None),
+    )
+    if resultado.insertadas:
+        # Un solo aviso para todo el lote: los paneles recargan el listado
+        canal_emergencias.publicar("importadas", {"insertadas": resultado.insertadas})
+    if resultado.error_archivo:
+        # Las filas anteriores al error ya quedaron guardadas: se informan para no
+        # reenviarlas
+        return jsonify({"ok": False, "error": resultado.error_archivo, **resultado.a_dict()}), 400
+    return jsonify({"ok": True, **resultado.a_dict()}), 200
+
+
+@emergencia_bp.route("/api/emergencias/stream", methods=["GET"])
+@login_required
+def api_stream_emergencias():
+    """Cambios de emergencias en vivo (Server-Sent Events), para el mapa de /inicio.
+
+    Eventos (data en JSON):
+        - creada, actualizada: {"emergencia": ..., "marcador": ...}
+        - estado: ídem más "estado_anterior"
+        - importadas: {"insertadas": n} tras una importación masiva
+        - recargar: no se pudieron reenviar los eventos perdidos; hay que recargar
+
+    Al reconectarse, el navegador envía Last-Event-ID y recibe los eventos que
+    se perdió (si siguen en el buffer). No consulta la BD.
+    """
+    ultimo_id = request.headers.get("Last-Event-ID") or request.args.get("ultimo_id")
+    return Response(
+        canal_emergencias.flujo(ultimo_id),
+        mimetype="text/event-stream",
+        # Sin buffer en proxies (nginx) para que cada evento salga al instante
+        headers={"X-Accel-Buffering": "no"},
+    )
+
+
 @emergencia_bp.route("/identificar-recursos/<int:emergencia_id>")
 @login_required
 def identificar_recursos(emergencia_id: int):
@@ -124,57 +311,61 @@ def identificar_recursos(emergencia_id: int):
 def desplegar_recursos(emergencia_id: int):
     """Vista para seleccionar y desplegar recursos a una emergencia."""
     # Verificar que la emergencia existe
-    with next(get_db()) as db:
-        emergencia = db.get(Emergencia, emergencia_id)
-        if not emergencia:
-            return render_template("crear_emer.html", error="Emergencia no encontrada"), 404
+    db = get_session()
+    emergencia = db.get(Emergencia, emergencia_id)
+    if not emergencia:
+        return render_template("crear_emer.html", error="Emergencia no encontrada"), 404
     
     return render_template("acciones_recursos_despla.html", emergencia_id=emergencia_id)
 
 
+def _version_reporte(emergencia_id: int):
+    # La vista la reutiliza como clave de cache_reportes
+    g.marca_reporte = emergencias_repo.marca_reporte(get_session(), emergencia_id)
+    return g.marca_reporte
+
+
 @emergencia_bp.route("/emergencias/<int:emergencia_id>")
 @login_required
+@solo_lectura
+@con_etag(_version_reporte)
 def detalle_emergencia(emergencia_id: int):
-    """Detalle de una emergencia específica con recursos y acciones."""
-    from app.models.models import Recurso, RecursoDesplazado, Accion
-    
-    with next(get_db()) as db:
-        e = db.get(Emergencia, emergencia_id)
-        if not e:
-            return render_template("reporte.html", emergencia=None), 404
-
-        # Cargar recursos identificados
-        recursos = db.query(Recurso).filter(Recurso.emergencias_id_emergencias == emergencia_id).all()
-        
-        # Cargar recursos desplazados
-        recursos_desplazados = db.query(RecursoDesplazado).filter(
-            RecursoDesplazado.emergencias_id_emergencias == emergencia_id
-        ).all()
-        
-        # Cargar acciones realizadas
-        acciones = db.query(Accion).filter(
-            Accion.emergencias_id_emergencias == emergencia_id
-        ).order_by(Accion.fecha_hora.desc()).all()
-        
-        # Separar recursos por tipo
-        bomberos = [r for r in recursos if r.tipo_recurso == 'bombero']
-        hidrantes = [r for r in recursos if r.tipo_recurso == 'hidrante']
-
-        # Preparar valores de presentación
-        from app.constants.status import ESTADO_DISPLAY, ESTADO_STYLES, estado_display as _disp
-        estado_txt = _disp(e.estado) or (e.estado or "Sin estado")
-        estilos = ESTADO_STYLES.get(e.estado or "", ("bg-gray-100 text-gray-700", "bg-gray-500"))
-
-        ctx = {
-            "emergencia": e,
-            "estado_display": estado_txt,
-            "estado_badge_classes": estilos[0],
-            "estado_dot_class": estilos[1],
-            "recursos_bomberos": bomberos,
-            "recursos_hidrantes": hidrantes,
-            "recursos_desplazados": recursos_desplazados,
-            "acciones": acciones,
-            "total_bomberos": len(bomberos),
-            "total_hidrantes": len(hidrantes),
-        }
-        return render_template("reporte.html", **ctx)
+    """Detalle de una emergencia específica con recursos y acciones.
+
+    Con If-None-Match responde 304 mientras la emergencia no cambie de estado
+    ni registre despliegues (ver emergencias_repo.marca_reporte).
+    """
+    # Las emergencias cerradas casi no cambian: su reporte se sirve ya
+    # renderizado mientras la marca (la del ETag) sea la misma
+    marca = g.get("marca_reporte")
+    clave = (emergencia_id, marca)
+    html = cache_reportes.buscar(clave) if marca is not None else None
+    if html is not None:
+        return html
+
+    db = get_session()
+    reporte = emergencias_repo.reporte(db, emergencia_id)
+    if reporte is None:
+        return render_template("reporte.html", emergencia=None), 404
+    e = reporte.emergencia
+
+    # Preparar valores de presentación
+    estado_txt = estado_display(e.estado) or (e.estado or "Sin estado")
+    estilos = ESTADO_STYLES.get(e.estado or "", ("bg-gray-100 text-gray-700", "bg-gray-500"))
+
+    ctx = {
+        "emergencia": e,
+        "estado_display": estado_txt,
+        "estado_badge_classes": estilos[0],
+        "estado_dot_class": estilos[1],
+        "recursos_bomberos": e.recursos_bomberos,
+        "recursos_hidrantes": e.recursos_hidrantes,
+        "recursos_desplazados": e.recursos_desplazados,
+        "acciones": e.acciones_recientes,
+        "total_bomberos": reporte.total_bomberos,
+        "total_hidrantes": reporte.total_hidrantes,
+    }
+    html = render_template("reporte.html", **ctx)
+    if e.estado in ESTADOS_CIERRE and marca is not None:
+        cache_reportes.guardar(clave, html)
+    return html
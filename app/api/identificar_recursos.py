@@ -1,86 +1,335 @@
-from flask import Blueprint, jsonify, request
+import base64
+import binascii
 import json
 import os
-from typing import List, Dict, Any
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from typing import List, Dict, Any, Hashable, Iterator, Optional, Tuple
 from datetime import datetime
-from decimal import Decimal
+from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
-from app.api.auth import login_required, permission_required
-from app.repositories.db import get_db
-from app.models.models import Emergencia, Recurso, RecursoDesplazado, Accion
+from app.api.auth import con_etag, login_required, permission_required
+from app.repositories.db import get_session, solo_lectura
+from app.models.models import Emergencia
+from app.services.catalogo_recursos import catalogo, TablaRecursos
+from app.services.cache_recursos import cache_recursos
+from app.services.distancias import haversine_km
+from app.services.eventos_emergencias import canal_emergencias, datos_emergencia
+from app.repositories import recursos_espaciales
+from app.repositories.despliegues import registrar_despliegue
+from app.repositories import estadisticas as estadisticas_repo
+from app.repositories import versiones as versiones_repo
 
 identificar_recursos_bp = Blueprint("identificar_recursos", __name__)
 
+# Cantidad de recursos más cercanos que se devuelven por tipo
+K_BOMBEROS_DEFAULT = 20
+K_HIDRANTES_DEFAULT = 50
+K_MAXIMO = 500
 
-def cargar_json(nombre_archivo: str) -> List[Dict[str, Any]]:
-    """Carga un archivo JSON desde la carpeta JSON de la aplicación."""
-    ruta = os.path.join(os.path.dirname(os.path.dirname(__file__)), "JSON", nombre_archivo)
-    try:
-        with open(ruta, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Error cargando {nombre_archivo}: {e}")
-        return []
+# Emergencias + ubicaciones admitidas por request en /api/recursos/batch
+MAX_LOTE = 500
+
+# Origen de las búsquedas por cercanía: "catalogo" (JSON en memoria) o "bd"
+# (tablas hidrantes/companias_bomberos con índice espacial, ver scripts/importar_recursos_bd.py)
+RECURSOS_FUENTE = os.getenv("RECURSOS_FUENTE", "catalogo").lower()
 
 
 def calcular_distancia(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calcula la distancia aproximada en km usando la fórmula haversine simplificada."""
-    from math import radians, sin, cos, sqrt, atan2
-    
-    R = 6371  # Radio de la Tierra en km
-    
-    lat1_rad = radians(lat1)
-    lat2_rad = radians(lat2)
-    delta_lat = radians(lat2 - lat1)
-    delta_lon = radians(lon2 - lon1)
-    
-    a = sin(delta_lat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lon/2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1-a))
-    
-    return R * c
+    return haversine_km(lat1, lon1, lat2, lon2)
 
 
-def filtrar_recursos_por_distrito(recursos: List[Dict], lat_emergencia: float, lon_emergencia: float, radio_km: float = 5.0) -> List[Dict]:
+def filtrar_recursos_por_distrito(recursos: TablaRecursos, lat_emergencia: float, lon_emergencia: float, radio_km: float = 5.0) -> List[Dict]:
     """
     Filtra recursos que estén dentro de un radio específico desde la ubicación de la emergencia.
     
     Args:
-        recursos: Lista de recursos (bomberos o hidrantes)
+        recursos: Tabla del catálogo (bomberos o hidrantes)
         lat_emergencia: Latitud de la emergencia
         lon_emergencia: Longitud de la emergencia
         radio_km: Radio en kilómetros para filtrar (por defecto 5 km)
     
     Returns:
-        Lista de recursos filtrados con distancia agregada
+        Lista de recursos filtrados con distancia agregada, del más cercano al más lejano
     """
     recursos_filtrados = []
     
-    for recurso in recursos:
-        lat_recurso = recurso.get('lat')
-        lon_recurso = recurso.get('lng')
-        
-        if lat_recurso is None or lon_recurso is None:
-            continue
-        
-        try:
-            distancia = calcular_distancia(lat_emergencia, lon_emergencia, lat_recurso, lon_recurso)
-            
-            if distancia <= radio_km:
-                recurso_con_distancia = recurso.copy()
-                recurso_con_distancia['distancia_km'] = round(distancia, 2)
-                recursos_filtrados.append(recurso_con_distancia)
-        except Exception as e:
-            print(f"Error calculando distancia para recurso {recurso.get('nombre', 'desconocido')}: {e}")
-            continue
-    
-    # Ordenar por distancia (más cercano primero)
-    recursos_filtrados.sort(key=lambda x: x.get('distancia_km', float('inf')))
+    # Índice espacial + distancias por lotes; a igual distancia se respeta el orden del catálogo
+    for distancia_km, pos in recursos.en_radio(lat_emergencia, lon_emergencia, radio_km):
+        recurso_con_distancia = recursos[pos].a_dict()
+        recurso_con_distancia['distancia_km'] = distancia_km
+        recursos_filtrados.append(recurso_con_distancia)
     
     return recursos_filtrados
 
 
+def codificar_cursor(tipo: str, distancia_km: float, id_recurso: Any) -> str:
+    """Cursor opaco con el tipo, la distancia y el id del último recurso entregado."""
+    contenido = json.dumps([tipo, distancia_km, id_recurso], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[str, Tuple[float, Any]]:
+    """(tipo, (distancia_km, id)) a partir del cursor; lanza ValueError si es inválido."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        tipo, distancia_km, id_recurso = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if tipo not in ("bomberos", "hidrantes") or not isinstance(id_recurso, (int, str)):
+            raise ValueError(tipo)
+        return tipo, (float(distancia_km), id_recurso)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("cursor inválido")
+
+
+def _posicion_cursor(recursos: TablaRecursos, despues: Optional[Tuple[float, Any]]) -> Optional[Tuple[float, int]]:
+    """(distancia_km, posición) del cursor en el catálogo; ValueError si el recurso ya no está"""
+    if despues is None:
+        return None
+    pos = recursos.posicion_por_id.get(despues[1])
+    if pos is None:
+        raise ValueError("cursor inválido: el recurso ya no está en el catálogo")
+    return (despues[0], pos)
+
+
+def recursos_mas_cercanos(recursos: TablaRecursos, lat: float, lon: float, radio_km: float, k: int,
+                          despues: Optional[Tuple[float, Any]] = None) -> Dict[str, Any]:
+    """
+    Los k recursos más cercanos dentro del radio y el total exacto de coincidencias.
+    
+    Solo se copian (a_dict) los k registros devueltos; el resto de coincidencias
+    únicamente se cuenta.
+    
+    Args:
+        despues: (distancia_km, id) del último recurso de la página anterior
+    
+    Returns:
+        {"total", "data", "siguiente"}; "siguiente" es el (distancia_km, id) desde
+        el que continúa la próxima página, o None si no quedan más
+    """
+    despues_pos = _posicion_cursor(recursos, despues)
+    
+    # Se pide uno más para saber si hay otra página
+    total, cercanos = recursos.k_cercanos(lat, lon, k + 1, radio_km, despues_pos)
+    return _pagina_catalogo(recursos, total, cercanos, k)
+
+
+def _pagina_catalogo(recursos: TablaRecursos, total: int, cercanos: List[Tuple[float, int]], k: int) -> Dict[str, Any]:
+    """Arma {"total", "data", "siguiente"} a partir de hasta k + 1 pares (distancia_km, posición)."""
+    data = []
+    for distancia_km, pos in cercanos[:k]:
+        recurso_con_distancia = recursos[pos].a_dict()
+        recurso_con_distancia['distancia_km'] = distancia_km
+        data.append(recurso_con_distancia)
+    siguiente = None
+    if len(cercanos) > k:
+        distancia_km, pos = cercanos[k - 1]
+        siguiente = (distancia_km, recursos[pos].id)
+    return {"total": total, "data": data, "siguiente": siguiente}
+
+
+def recursos_mas_cercanos_bd(db, tipo: str, lat: float, lon: float, radio_km: float, k: int,
+                             despues: Optional[Tuple[float, Any]] = None) -> Dict[str, Any]:
+    """Igual que `recursos_mas_cercanos`, pero resuelto en la base de datos."""
+    total, cercanos = recursos_espaciales.k_mas_cercanos(db, tipo, lat, lon, k + 1, radio_km, despues)
+    data = []
+    for distancia_km, fila in cercanos[:k]:
+        recurso_con_distancia = fila.a_dict()
+        recurso_con_distancia['distancia_km'] = distancia_km
+        data.append(recurso_con_distancia)
+    siguiente = None
+    if len(cercanos) > k:
+        distancia_km, fila = cercanos[k - 1]
+        siguiente = (distancia_km, recursos_espaciales.id_recurso(fila))
+    return {"total": total, "data": data, "siguiente": siguiente}
+
+
+def _con_cursor(tipo: str, resultado: Dict[str, Any]) -> Dict[str, Any]:
+    siguiente = resultado.pop("siguiente")
+    resultado["siguiente_cursor"] = codificar_cursor(tipo, *siguiente) if siguiente else None
+    return resultado
+
+
+def _tipos_solicitados(tipo_recurso: str, k_bomberos: int, k_hidrantes: int) -> List[Tuple[str, int]]:
+    return [
+        (tipo, k) for tipo, k in (("bomberos", k_bomberos), ("hidrantes", k_hidrantes))
+        if tipo_recurso in (tipo, 'todos')
+    ]
+
+
+def buscar_recursos(tipo_recurso: str, lat: float, lon: float, radio_km: float,
+                    k_bomberos: int, k_hidrantes: int,
+                    despues: Optional[Tuple[float, Any]] = None) -> Dict[str, Any]:
+    """
+    Recursos cercanos por tipo ('bomberos', 'hidrantes' o 'todos') según RECURSOS_FUENTE.
+    
+    Cada tipo trae su `siguiente_cursor` para pedir la página siguiente; con
+    `despues` (ya decodificado del cursor) tipo_recurso debe ser un solo tipo.
+    
+    El resultado se guarda en la caché de recursos; la clave incluye las
+    coordenadas (así un cambio de ubicación de la emergencia no reutiliza
+    resultados) y la versión de los datos (catálogo o versiones_datos)
+    invalida todo al cambiar.
+    Lanza ValueError si el cursor no corresponde a los datos vigentes.
+    """
+    tipos = _tipos_solicitados(tipo_recurso, k_bomberos, k_hidrantes)
+    # Las coordenadas de las emergencias tienen 6 decimales (DECIMAL(9,6))
+    clave = (round(lat, 6), round(lon, 6), radio_km, tuple(tipos), despues)
+    
+    if RECURSOS_FUENTE == "bd":
+        def calcular():
+            db = get_session()
+            return {
+                tipo: _con_cursor(tipo, recursos_mas_cercanos_bd(db, tipo, lat, lon, radio_km, k, despues))
+                for tipo, k in tipos
+            }
+        # La misma versión que los ETag (_version_fuente): importar_recursos_bd
+        # la incrementa y descarta lo calculado con los datos anteriores
+        version = ("bd", versiones_repo.leer(get_session(), versiones_repo.RECURSOS))
+        return cache_recursos.obtener(clave, calcular, version=version)
+    
+    # Catálogo residente en memoria (se recarga solo si cambian los JSON)
+    snap = catalogo.actual()
+    
+    def calcular():
+        return {
+            tipo: _con_cursor(tipo, recursos_mas_cercanos(getattr(snap, tipo), lat, lon, radio_km, k, despues))
+            for tipo, k in tipos
+        }
+    return cache_recursos.obtener(clave, calcular, version=snap.version)
+
+
+def _lineas_ndjson(encabezado: Dict[str, Any], tipos: List[Tuple[str, Optional[int]]],
+                   lat: float, lon: float, radio_km: float,
+                   despues: Optional[Tuple[float, Any]] = None, snap=None) -> Iterator[str]:
+    """
+    Genera la respuesta en NDJSON, un objeto por línea:
+        - el encabezado ({"ok", "emergencia"/"ubicacion", "filtros"})
+        - por tipo: {"tipo", "total"}, luego {"tipo", "recurso"} del más cercano
+          al más lejano (a lo sumo k si se indicó) y al final
+          {"tipo", "fin", "enviados", "siguiente_cursor"}
+    
+    Los recursos se extraen de a uno (heap en memoria o cursor de la BD), así
+    el cliente recibe los primeros sin esperar al resto. `snap` es el catálogo
+    con el que ya se validó el cursor (None con RECURSOS_FUENTE=bd).
+    """
+    def linea(obj: Dict[str, Any]) -> str:
+        return json.dumps(obj, ensure_ascii=False, default=str) + "\n"
+    
+    yield linea(encabezado)
+    
+    # Sesión del request: stream_with_context la mantiene abierta mientras se genera
+    db = get_session() if snap is None else None
+    for tipo, k in tipos:
+        if db is not None:
+            total, pares = recursos_espaciales.iterar_en_radio(
+                db, recursos_espaciales.MODELOS[tipo], lat, lon, radio_km, despues
+            )
+            registros = ((d, fila, recursos_espaciales.id_recurso(fila)) for d, fila in pares)
+        else:
+            tabla = getattr(snap, tipo)
+            total, pares = tabla.iterar_cercanos(lat, lon, radio_km, _posicion_cursor(tabla, despues))
+            registros = ((d, tabla[pos], tabla[pos].id) for d, pos in pares)
+        
+        yield linea({"tipo": tipo, "total": total})
+        enviados = 0
+        ultimo = None
+        siguiente_cursor = None
+        for distancia_km, registro, id_recurso in registros:
+            if k is not None and enviados == k:
+                siguiente_cursor = codificar_cursor(tipo, *ultimo)
+                break
+            recurso = registro.a_dict()
+            recurso['distancia_km'] = distancia_km
+            yield linea({"tipo": tipo, "recurso": recurso})
+            enviados += 1
+            ultimo = (distancia_km, id_recurso)
+        yield linea({"tipo": tipo, "fin": True, "enviados": enviados, "siguiente_cursor": siguiente_cursor})
+
+
+def _leer_k(default: Optional[int] = None) -> Optional[int]:
+    """Lee el parámetro `k` (1..K_MAXIMO); lanza ValueError si es inválido."""
+    valor = request.args.get('k')
+    if valor is None or valor == '':
+        return default
+    k = int(valor)
+    if k < 1 or k > K_MAXIMO:
+        raise ValueError(f"k debe estar entre 1 y {K_MAXIMO}")
+    return k
+
+
+def _leer_cursor(tipo_recurso: str) -> Tuple[str, Optional[Tuple[float, Any]]]:
+    """
+    Lee el parámetro `cursor`; devuelve (tipo efectivo, despues).
+    
+    El cursor es de un solo tipo de recurso: si se indica, la respuesta trae
+    solo ese tipo. Lanza ValueError si es inválido o contradice `tipo`.
+    """
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return tipo_recurso, None
+    tipo_cursor, despues = decodificar_cursor(cursor)
+    if tipo_recurso not in (tipo_cursor, 'todos'):
+        raise ValueError(f"el cursor corresponde a '{tipo_cursor}', no a '{tipo_recurso}'")
+    return tipo_cursor, despues
+
+
+def _responder_recursos(encabezado: Dict[str, Any], tipo_recurso: str, lat: float, lon: float,
+                        radio_km: float, k: Optional[int], despues: Optional[Tuple[float, Any]]):
+    """Respuesta JSON paginada (por defecto) o NDJSON en streaming (formato=ndjson)."""
+    if request.args.get('formato', 'json').lower() == 'ndjson':
+        # Sin k se envían todos los recursos dentro del radio
+        tipos = _tipos_solicitados(tipo_recurso, k, k)
+        # El cursor se valida antes de empezar la respuesta (mismo 400 que en JSON)
+        snap = None if RECURSOS_FUENTE == "bd" else catalogo.actual()
+        if snap is not None:
+            try:
+                for tipo, _ in tipos:
+                    _posicion_cursor(getattr(snap, tipo), despues)
+            except ValueError as e:
+                return jsonify({"ok": False, "error": str(e)}), 400
+        return Response(
+            stream_with_context(_lineas_ndjson(encabezado, tipos, lat, lon, radio_km, despues, snap)),
+            mimetype="application/x-ndjson"
+        )
+    
+    try:
+        recursos = buscar_recursos(
+            tipo_recurso, lat, lon, radio_km, k or K_BOMBEROS_DEFAULT, k or K_HIDRANTES_DEFAULT, despues
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    
+    return jsonify({**encabezado, "recursos": recursos}), 200
+
+
+def _version_fuente() -> Optional[Hashable]:
+    """
+    Versión de los recursos para los ETag de /api/recursos/*: la del catálogo en
+    memoria o, con RECURSOS_FUENTE=bd, la de versiones_datos (None sin la tabla).
+    """
+    if RECURSOS_FUENTE == "bd":
+        version = versiones_repo.leer(get_session(), versiones_repo.RECURSOS)
+        return None if version is None else ("bd", version)
+    return catalogo.actual().version
+
+
+def _version_recursos_emergencia(emergencia_id: int) -> Optional[Hashable]:
+    """Versión de los recursos más los datos de la emergencia que van en la respuesta"""
+    fuente = _version_fuente()
+    if fuente is None:
+        return None
+    # La vista vuelve a pedir la emergencia con db.get: sale del identity map, sin consulta
+    emergencia = get_session().get(Emergencia, emergencia_id)
+    if emergencia is None:
+        return None
+    return (fuente, emergencia.Nombre_emergencia, emergencia.distrito, emergencia.direccion,
+            emergencia.lat, emergencia.lon)
+
+
 @identificar_recursos_bp.route("/api/recursos/<int:emergencia_id>", methods=["GET"])
 @login_required
+@solo_lectura
+@con_etag(_version_recursos_emergencia)
 def obtener_recursos(emergencia_id: int):
     """
     Obtiene los recursos (bomberos e hidrantes) cercanos a una emergencia específica.
@@ -88,10 +337,18 @@ def obtener_recursos(emergencia_id: int):
     Query parameters opcionales:
         - radio: Radio en km para filtrar recursos (default: 5.0)
         - tipo: Tipo de recursos a retornar ('bomberos', 'hidrantes', 'todos' - default: 'todos')
+        - k: Cantidad de recursos más cercanos por tipo (default: 20 bomberos / 50 hidrantes)
+        - cursor: `siguiente_cursor` de una respuesta anterior, para la página siguiente
+        - formato: 'json' (default) o 'ndjson' (streaming, del más cercano al más lejano;
+          sin k se envían todos los recursos del radio)
     """
     # Obtener parámetros opcionales
-    radio_km = float(request.args.get('radio', 5.0))
-    tipo_recurso = request.args.get('tipo', 'todos').lower()
+    try:
+        radio_km = float(request.args.get('radio', 5.0))
+        k = _leer_k()
+        tipo_recurso, despues = _leer_cursor(request.args.get('tipo', 'todos').lower())
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Parámetros inválidos: {e}"}), 400
     
     # Validar el radio
     if radio_km <= 0 or radio_km > 50:
@@ -101,39 +358,27 @@ def obtener_recursos(emergencia_id: int):
         }), 400
     
     # Obtener la emergencia de la base de datos
-    with next(get_db()) as db:
-        emergencia = db.get(Emergencia, emergencia_id)
-        
-        if not emergencia:
-            return jsonify({
-                "ok": False,
-                "error": "Emergencia no encontrada"
-            }), 404
-        
-        # Verificar que la emergencia tenga coordenadas
-        if emergencia.lat is None or emergencia.lon is None:
-            return jsonify({
-                "ok": False,
-                "error": "La emergencia no tiene coordenadas definidas"
-            }), 400
-        
-        lat_emergencia = float(emergencia.lat)
-        lon_emergencia = float(emergencia.lon)
-        distrito = emergencia.distrito
+    db = get_session()
+    emergencia = db.get(Emergencia, emergencia_id)
     
-    # Cargar los datos de recursos
-    bomberos_data = []
-    hidrantes_data = []
+    if not emergencia:
+        return jsonify({
+            "ok": False,
+            "error": "Emergencia no encontrada"
+        }), 404
     
-    if tipo_recurso in ['bomberos', 'todos']:
-        bomberos_raw = cargar_json("bomberos.json")
-        bomberos_data = filtrar_recursos_por_distrito(bomberos_raw, lat_emergencia, lon_emergencia, radio_km)
+    # Verificar que la emergencia tenga coordenadas
+    if emergencia.lat is None or emergencia.lon is None:
+        return jsonify({
+            "ok": False,
+            "error": "La emergencia no tiene coordenadas definidas"
+        }), 400
     
-    if tipo_recurso in ['hidrantes', 'todos']:
-        hidrantes_raw = cargar_json("hidrantes.json")
-        hidrantes_data = filtrar_recursos_por_distrito(hidrantes_raw, lat_emergencia, lon_emergencia, radio_km)
+    lat_emergencia = float(emergencia.lat)
+    lon_emergencia = float(emergencia.lon)
+    distrito = emergencia.distrito
     
-    # Preparar respuesta
+    # Preparar respuesta (los recursos se agregan en _responder_recursos)
     respuesta = {
         "ok": True,
         "emergencia": {
@@ -147,23 +392,10 @@ def obtener_recursos(emergencia_id: int):
         "filtros": {
             "radio_km": radio_km,
             "tipo": tipo_recurso
-        },
-        "recursos": {}
-    }
-    
-    if tipo_recurso in ['bomberos', 'todos']:
-        respuesta["recursos"]["bomberos"] = {
-            "total": len(bomberos_data),
-            "data": bomberos_data[:20]  # Limitar a los 20 más cercanos
-        }
-    
-    if tipo_recurso in ['hidrantes', 'todos']:
-        respuesta["recursos"]["hidrantes"] = {
-            "total": len(hidrantes_data),
-            "data": hidrantes_data[:50]  # Limitar a los 50 más cercanos
         }
+    }
     
-    return jsonify(respuesta), 200
+    return _responder_recursos(respuesta, tipo_recurso, lat_emergencia, lon_emergencia, radio_km, k, despues)
 
 
 @identificar_recursos_bp.route("/api/desplegar-recursos", methods=["POST"])
@@ -204,136 +436,75 @@ def guardar_recursos_desplegados():
     if not bomberos_ids and not hidrantes_ids:
         return jsonify({"ok": False, "error": "Debe seleccionar al menos un recurso"}), 400
     
+    # Datos completos de los recursos seleccionados: búsqueda por id en el catálogo en memoria
+    snap = catalogo.actual()
+    bomberos, bomberos_desconocidos = snap.bomberos.get_many(bomberos_ids)
+    hidrantes, hidrantes_desconocidos = snap.hidrantes.get_many(hidrantes_ids)
+    
+    if bomberos_desconocidos or hidrantes_desconocidos:
+        return jsonify({
+            "ok": False,
+            "error": "Algunos recursos seleccionados no existen en el catálogo",
+            "ids_desconocidos": {
+                "bomberos": bomberos_desconocidos,
+                "hidrantes": hidrantes_desconocidos
+            }
+        }), 400
+    
     try:
-        with next(get_db()) as db:
-            # Verificar que la emergencia existe
-            emergencia = db.get(Emergencia, emergencia_id)
-            if not emergencia:
-                return jsonify({"ok": False, "error": "Emergencia no encontrada"}), 404
-            
-            now_utc = datetime.utcnow()
-            
-            # Cargar datos completos de los recursos seleccionados
-            bomberos_data = cargar_json("bomberos.json") if bomberos_ids else []
-            hidrantes_data = cargar_json("hidrantes.json") if hidrantes_ids else []
-            
-            # 1. Guardar recursos identificados en la tabla 'recursos'
-            recursos_guardados = []
-            
-            for bombero_id in bomberos_ids:
-                bombero = next((b for b in bomberos_data if b.get('idCompaniaBomberos') == bombero_id), None)
-                if bombero:
-                    # Calcular distancia
-                    distancia = calcular_distancia(
-                        float(emergencia.lat), float(emergencia.lon),
-                        bombero.get('lat'), bombero.get('lng')
-                    )
-                    
-                    # Convertir valores a Decimal para compatibilidad con DECIMAL de SQL
-                    lat_decimal = Decimal(str(bombero.get('lat'))) if bombero.get('lat') is not None else None
-                    lon_decimal = Decimal(str(bombero.get('lng'))) if bombero.get('lng') is not None else None
-                    
-                    recurso = Recurso(
-                        tipo_recurso='bombero',
-                        entidad_recurso=str(bombero_id),
-                        lat=lat_decimal,
-                        lon=lon_decimal,
-                        direccion=bombero.get('nombre', ''),
-                        distancia_recurso=f"{round(distancia, 2)} km",
-                        emergencias_id_emergencias=emergencia_id
-                    )
-                    db.add(recurso)
-                    recursos_guardados.append({
-                        'tipo': 'bombero',
-                        'nombre': bombero.get('nombre'),
-                        'distancia': round(distancia, 2)
-                    })
-            
-            for hidrante_id in hidrantes_ids:
-                hidrante = next((h for h in hidrantes_data if h.get('ID') == hidrante_id), None)
-                if hidrante:
-                    # Calcular distancia
-                    distancia = calcular_distancia(
-                        float(emergencia.lat), float(emergencia.lon),
-                        hidrante.get('lat'), hidrante.get('lng')
-                    )
-                    
-                    # Convertir valores a Decimal para compatibilidad con DECIMAL de SQL
-                    lat_decimal = Decimal(str(hidrante.get('lat'))) if hidrante.get('lat') is not None else None
-                    lon_decimal = Decimal(str(hidrante.get('lng'))) if hidrante.get('lng') is not None else None
-                    
-                    recurso = Recurso(
-                        tipo_recurso='hidrante',
-                        entidad_recurso=str(hidrante_id),
-                        lat=lat_decimal,
-                        lon=lon_decimal,
-                        direccion=hidrante.get('nombre', ''),
-                        distancia_recurso=f"{round(distancia, 2)} km",
-                        emergencias_id_emergencias=emergencia_id
-                    )
-                    db.add(recurso)
-                    recursos_guardados.append({
-                        'tipo': 'hidrante',
-                        'nombre': hidrante.get('nombre'),
-                        'distancia': round(distancia, 2)
-                    })
-            
-            # 2. Guardar recursos desplegados en la tabla 'recursos_desplazados'
-            # Por ahora, guardamos un registro por cada bombero desplegado
-            for bombero_id in bomberos_ids:
-                recurso_desplegado = RecursoDesplazado(
-                    tipo_recurso_deplazado=1,  # 1 = bombero, 2 = hidrante (por ejemplo)
-                    hora_salida=now_utc,
-                    estado='EN_CAMINO',
-                    emergencias_id_emergencias=emergencia_id
-                )
-                db.add(recurso_desplegado)
-            
-            for hidrante_id in hidrantes_ids:
-                recurso_desplegado = RecursoDesplazado(
-                    tipo_recurso_deplazado=2,  # 2 = hidrante
-                    hora_salida=now_utc,
-                    estado='IDENTIFICADO',
-                    emergencias_id_emergencias=emergencia_id
-                )
-                db.add(recurso_desplegado)
-            
-            # 3. Guardar acción realizada en la tabla 'acciones'
-            descripcion_completa = acciones_texto
-            if observaciones:
-                descripcion_completa += f"\n\nObservaciones: {observaciones}"
-            
-            accion = Accion(
-                tipo_accion='DESPLIEGUE_RECURSOS',
-                descripcion_durante_emer=descripcion_completa,
-                fecha_hora=now_utc,
-                emergencias_id_emergencias=emergencia_id
-            )
-            db.add(accion)
-            
-            # 4. Actualizar estado de la emergencia a 'EN CURSO' (estado normalizado en BD)
-            if emergencia.estado not in ['CERRADO', 'ATENDIDA']:
-                emergencia.estado = 'EN CURSO'
-            
-            # Commit de todas las operaciones
-            db.commit()
-            
-            return jsonify({
-                "ok": True,
-                "message": "Recursos desplegados exitosamente",
-                "emergencia_id": emergencia_id,
-                "recursos_guardados": {
-                    "total": len(recursos_guardados),
-                    "bomberos": len(bomberos_ids),
-                    "hidrantes": len(hidrantes_ids),
-                    "detalles": recursos_guardados
-                },
-                "accion_registrada": {
-                    "tipo": "DESPLIEGUE_RECURSOS",
-                    "fecha_hora": now_utc.isoformat()
-                }
-            }), 201
-            
+        db = get_session()
+        # Verificar que la emergencia existe
+        emergencia = db.get(Emergencia, emergencia_id)
+        if not emergencia:
+            return jsonify({"ok": False, "error": "Emergencia no encontrada"}), 404
+        
+        now_utc = datetime.utcnow()
+        
+        descripcion_completa = acciones_texto
+        if observaciones:
+            descripcion_completa += f"\n\nObservaciones: {observaciones}"
+        
+        # 1-3. Recursos identificados ('recursos'), desplegados ('recursos_desplazados')
+        # y la acción realizada ('acciones'): un INSERT por tabla para todas las filas
+        recursos_guardados = registrar_despliegue(
+            db, emergencia, {"bomberos": bomberos, "hidrantes": hidrantes},
+            descripcion_completa, now_utc
+        )
+        
+        # 4. Actualizar estado de la emergencia a 'EN CURSO' (estado normalizado en BD)
+        estado_anterior = emergencia.estado
+        if emergencia.estado not in ['CERRADO', 'ATENDIDA']:
+            antes = estadisticas_repo.clave(emergencia)
+            emergencia.estado = 'EN CURSO'
+            estadisticas_repo.registrar_cambio(db, antes, emergencia)
+            # El listado muestra el estado (el reporte se versiona por sus propias filas)
+            versiones_repo.incrementar(db, versiones_repo.EMERGENCIAS)
+        # Evento para los paneles abiertos; se arma antes del commit (que expira el objeto)
+        if emergencia.estado != estado_anterior:
+            evento = ("estado", datos_emergencia(emergencia, estado_anterior=estado_anterior))
+        else:
+            evento = ("actualizada", datos_emergencia(emergencia))
+        
+        # Commit de todas las operaciones
+        db.commit()
+        canal_emergencias.publicar(*evento)
+        
+        return jsonify({
+            "ok": True,
+            "message": "Recursos desplegados exitosamente",
+            "emergencia_id": emergencia_id,
+            "recursos_guardados": {
+                "total": len(recursos_guardados),
+                "bomberos": len(bomberos),
+                "hidrantes": len(hidrantes),
+                "detalles": recursos_guardados
+            },
+            "accion_registrada": {
+                "tipo": "DESPLIEGUE_RECURSOS",
+                "fecha_hora": now_utc.isoformat()
+            }
+        }), 201
+        
     except SQLAlchemyError as e:
         return jsonify({
             "ok": False,
@@ -348,6 +519,8 @@ def guardar_recursos_desplegados():
 
 @identificar_recursos_bp.route("/api/recursos/distrito", methods=["GET"])
 @login_required
+@solo_lectura
+@con_etag(_version_fuente)
 def obtener_recursos_por_coordenadas():
     """
     Obtiene recursos por coordenadas directas (sin necesidad de emergencia creada).
@@ -359,6 +532,10 @@ def obtener_recursos_por_coordenadas():
     Query parameters opcionales:
         - radio: Radio en km (default: 5.0)
         - tipo: Tipo de recursos ('bomberos', 'hidrantes', 'todos')
+        - k: Cantidad de recursos más cercanos por tipo (default: 20 bomberos / 50 hidrantes)
+        - cursor: `siguiente_cursor` de una respuesta anterior, para la página siguiente
+        - formato: 'json' (default) o 'ndjson' (streaming, del más cercano al más lejano;
+          sin k se envían todos los recursos del radio)
     """
     try:
         lat = float(request.args.get('lat'))
@@ -369,20 +546,12 @@ def obtener_recursos_por_coordenadas():
             "error": "Parámetros lat y lon son requeridos y deben ser numéricos"
         }), 400
     
-    radio_km = float(request.args.get('radio', 5.0))
-    tipo_recurso = request.args.get('tipo', 'todos').lower()
-    
-    # Cargar los datos de recursos
-    bomberos_data = []
-    hidrantes_data = []
-    
-    if tipo_recurso in ['bomberos', 'todos']:
-        bomberos_raw = cargar_json("bomberos.json")
-        bomberos_data = filtrar_recursos_por_distrito(bomberos_raw, lat, lon, radio_km)
-    
-    if tipo_recurso in ['hidrantes', 'todos']:
-        hidrantes_raw = cargar_json("hidrantes.json")
-        hidrantes_data = filtrar_recursos_por_distrito(hidrantes_raw, lat, lon, radio_km)
+    try:
+        radio_km = float(request.args.get('radio', 5.0))
+        k = _leer_k()
+        tipo_recurso, despues = _leer_cursor(request.args.get('tipo', 'todos').lower())
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Parámetros inválidos: {e}"}), 400
     
     respuesta = {
         "ok": True,
@@ -393,20 +562,198 @@ def obtener_recursos_por_coordenadas():
         "filtros": {
             "radio_km": radio_km,
             "tipo": tipo_recurso
-        },
-        "recursos": {}
+        }
     }
     
-    if tipo_recurso in ['bomberos', 'todos']:
-        respuesta["recursos"]["bomberos"] = {
-            "total": len(bomberos_data),
-            "data": bomberos_data[:20]
-        }
+    return _responder_recursos(respuesta, tipo_recurso, lat, lon, radio_km, k, despues)
+
+
+@identificar_recursos_bp.route("/api/recursos/cercanos", methods=["GET"])
+@login_required
+@solo_lectura
+@con_etag(_version_fuente)
+def obtener_recursos_cercanos():
+    """
+    Consulta de k vecinos más cercanos sobre el catálogo.
+    
+    Query parameters requeridos:
+        - lat: Latitud
+        - lon: Longitud
+    
+    Query parameters opcionales:
+        - k: Cantidad de recursos por tipo (default: 10, máximo 500)
+        - radio: Radio máximo de búsqueda en km (default: 5.0, máximo 50)
+        - tipo: Tipo de recursos ('bomberos', 'hidrantes', 'todos')
+    """
+    try:
+        lat = float(request.args.get('lat'))
+        lon = float(request.args.get('lon'))
+    except (TypeError, ValueError):
+        return jsonify({
+            "ok": False,
+            "error": "Parámetros lat y lon son requeridos y deben ser numéricos"
+        }), 400
     
-    if tipo_recurso in ['hidrantes', 'todos']:
-        respuesta["recursos"]["hidrantes"] = {
-            "total": len(hidrantes_data),
-            "data": hidrantes_data[:50]
+    try:
+        radio_km = float(request.args.get('radio', 5.0))
+        k = _leer_k(default=10)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Parámetros inválidos: {e}"}), 400
+    tipo_recurso = request.args.get('tipo', 'todos').lower()
+    
+    if radio_km <= 0 or radio_km > 50:
+        return jsonify({
+            "ok": False,
+            "error": "El radio debe estar entre 0 y 50 km"
+        }), 400
+    
+    recursos = buscar_recursos(tipo_recurso, lat, lon, radio_km, k, k)
+    
+    return jsonify({
+        "ok": True,
+        "ubicacion": {"lat": lat, "lon": lon},
+        "filtros": {"radio_km": radio_km, "tipo": tipo_recurso, "k": k},
+        "recursos": recursos
+    }), 200
+
+
+def buscar_recursos_lote(tipo_recurso: str, origenes: List[Tuple[float, float]], radio_km: float,
+                         k_bomberos: int, k_hidrantes: int) -> List[Dict[str, Any]]:
+    """
+    `buscar_recursos` para varios orígenes (lat, lon) en una sola pasada.
+    
+    Con el catálogo en memoria todas las distancias de un tipo se calculan
+    juntas (TablaRecursos.k_cercanos_lote); con RECURSOS_FUENTE=bd se reutiliza
+    una única sesión para todas las consultas. No usa la caché.
+    """
+    tipos = _tipos_solicitados(tipo_recurso, k_bomberos, k_hidrantes)
+    resultados: List[Dict[str, Any]] = [{} for _ in origenes]
+    
+    if RECURSOS_FUENTE == "bd":
+        db = get_session()
+        for tipo, k in tipos:
+            for resultado, (lat, lon) in zip(resultados, origenes):
+                resultado[tipo] = _con_cursor(tipo, recursos_mas_cercanos_bd(db, tipo, lat, lon, radio_km, k))
+        return resultados
+    
+    snap = catalogo.actual()
+    for tipo, k in tipos:
+        tabla = getattr(snap, tipo)
+        # Uno más por origen para saber si hay otra página
+        for resultado, (total, cercanos) in zip(resultados, tabla.k_cercanos_lote(origenes, k + 1, radio_km)):
+            resultado[tipo] = _con_cursor(tipo, _pagina_catalogo(tabla, total, cercanos, k))
+    return resultados
+
+
+@identificar_recursos_bp.route("/api/recursos/batch", methods=["POST"])
+@login_required
+@solo_lectura
+def obtener_recursos_lote():
+    """
+    Recursos cercanos para varias emergencias y/o ubicaciones en un solo request.
+    
+    Payload esperado:
+    {
+        "emergencias": [ids...],                      (opcional)
+        "ubicaciones": [{"lat": float, "lon": float}], (opcional)
+        "radio": float,   (default: 5.0, máximo 50)
+        "tipo": str,      ('bomberos', 'hidrantes', 'todos' - default: 'todos')
+        "k": int          (default: 20 bomberos / 50 hidrantes)
+    }
+    
+    Las emergencias se cargan con una sola consulta. La respuesta trae
+    "emergencias" indexado por id, "ubicaciones" en el orden recibido y las
+    listas "no_encontradas" y "sin_coordenadas".
+    """
+    data = request.get_json(silent=True) or {}
+    
+    ids = data.get('emergencias') or []
+    ubicaciones = data.get('ubicaciones') or []
+    if not isinstance(ids, list) or not isinstance(ubicaciones, list):
+        return jsonify({"ok": False, "error": "emergencias y ubicaciones deben ser listas"}), 400
+    if not ids and not ubicaciones:
+        return jsonify({"ok": False, "error": "Debe indicar al menos una emergencia o ubicación"}), 400
+    if len(ids) + len(ubicaciones) > MAX_LOTE:
+        return jsonify({"ok": False, "error": f"Se permiten hasta {MAX_LOTE} emergencias/ubicaciones por request"}), 400
+    
+    try:
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        origenes_ubicaciones = [(float(u['lat']), float(u['lon'])) for u in ubicaciones]
+        radio_km = float(data.get('radio', 5.0))
+        k = data.get('k')
+        if k is not None:
+            k = int(k)
+            if k < 1 or k > K_MAXIMO:
+                raise ValueError(f"k debe estar entre 1 y {K_MAXIMO}")
+    except (TypeError, ValueError, KeyError) as e:
+        return jsonify({"ok": False, "error": f"Parámetros inválidos: {e}"}), 400
+    tipo_recurso = str(data.get('tipo', 'todos')).lower()
+    
+    if radio_km <= 0 or radio_km > 50:
+        return jsonify({
+            "ok": False,
+            "error": "El radio debe estar entre 0 y 50 km"
+        }), 400
+    
+    emergencias = []
+    sin_coordenadas = []
+    no_encontradas = []
+    if ids:
+        db = get_session()
+        filas = db.scalars(select(Emergencia).where(Emergencia.id_emergencias.in_(ids))).all()
+        por_id = {e.id_emergencias: e for e in filas}
+        for id_emergencia in ids:
+            emergencia = por_id.get(id_emergencia)
+            if emergencia is None:
+                no_encontradas.append(id_emergencia)
+            elif emergencia.lat is None or emergencia.lon is None:
+                sin_coordenadas.append(id_emergencia)
+            else:
+                emergencias.append(emergencia)
+    
+    origenes = [(float(e.lat), float(e.lon)) for e in emergencias] + origenes_ubicaciones
+    recursos = buscar_recursos_lote(
+        tipo_recurso, origenes, radio_km, k or K_BOMBEROS_DEFAULT, k or K_HIDRANTES_DEFAULT
+    )
+    
+    respuesta_emergencias = {}
+    for emergencia, (lat, lon), recursos_emergencia in zip(emergencias, origenes, recursos):
+        respuesta_emergencias[str(emergencia.id_emergencias)] = {
+            "emergencia": {
+                "id": emergencia.id_emergencias,
+                "nombre": emergencia.Nombre_emergencia,
+                "distrito": emergencia.distrito,
+                "lat": lat,
+                "lon": lon,
+                "direccion": emergencia.direccion
+            },
+            "recursos": recursos_emergencia
         }
     
-    return jsonify(respuesta), 200
+    respuesta_ubicaciones = [
+        {"lat": lat, "lon": lon, "recursos": recursos_ubicacion}
+        for (lat, lon), recursos_ubicacion in zip(origenes_ubicaciones, recursos[len(emergencias):])
+    ]
+    
+    return jsonify({
+        "ok": True,
+        "filtros": {"radio_km": radio_km, "tipo": tipo_recurso, "k": k},
+        "emergencias": respuesta_emergencias,
+        "ubicaciones": respuesta_ubicaciones,
+        "no_encontradas": no_encontradas,
+        "sin_coordenadas": sin_coordenadas
+    }), 200
+
+
+@identificar_recursos_bp.route("/api/recursos/catalogo", methods=["GET"])
+@login_required
+def estado_catalogo():
+    """Versión, tiempo de carga y número de registros del catálogo en memoria."""
+    return jsonify({"ok": True, "catalogo": catalogo.estadisticas()}), 200
+
+
+@identificar_recursos_bp.route("/api/recursos/cache", methods=["GET"])
+@login_required
+def estado_cache_recursos():
+    """Aciertos, fallos, desalojos y tamaño de la caché de recursos cercanos."""
+    return jsonify({"ok": True, "cache": cache_recursos.estadisticas()}), 200
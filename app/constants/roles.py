@@ -17,6 +17,18 @@ PERMISSION_MANAGE_RESOURCES = "puede_gestionar_recursos"
 PERMISSION_MANAGE_USERS = "puede_gestionar_usuarios"
 PERMISSION_VIEW_REPORTS = "puede_ver_reportes"
 
+# Bit de cada permiso en las máscaras de permisos (Rol.permisos_mask y
+# UsuarioMunicipal.permisos_mask); el nombre es el de la columna booleana del rol
+PERMISSION_BITS = {
+    PERMISSION_CREATE_EMERGENCY: 1 << 0,
+    PERMISSION_EDIT_EMERGENCY: 1 << 1,
+    PERMISSION_DELETE_EMERGENCY: 1 << 2,
+    PERMISSION_MANAGE_RESOURCES: 1 << 3,
+    PERMISSION_MANAGE_USERS: 1 << 4,
+    PERMISSION_VIEW_REPORTS: 1 << 5,
+}
+ALL_PERMISSIONS_MASK = sum(PERMISSION_BITS.values())
+
 # Definición de roles con sus permisos
 ROLES_DEFINITION = {
     ROLE_ADMIN: {
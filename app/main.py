@@ -1,11 +1,11 @@
 # app/main.py
 import os
 from functools import wraps
-from flask import render_template, request, redirect, url_for, session, g, flash
+from flask import render_template, request, redirect, url_for, session, g, flash, jsonify
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 
-from app.repositories.db import get_db
+from app.repositories.db import init_app, estadisticas_pool
 from app.models.models import UsuarioMunicipal, Emergencia
 
 load_dotenv()
@@ -14,7 +14,10 @@ from flask import Flask
 app = Flask(__name__, template_folder="templates", static_folder="static")
 app.secret_key = os.getenv("FLASK_SECRET", "dev-secret")
 
-from app.api.auth import auth_bp
+# Una sesión de BD por request (app/repositories/db.py:get_session)
+init_app(app)
+
+from app.api.auth import auth_bp, admin_required
 app.register_blueprint(auth_bp)
 
 from app.api.crear_emergencia import emergencia_bp
@@ -26,8 +29,20 @@ app.register_blueprint(identificar_recursos_bp)
 from app.api.gestionar_usuarios import gestionar_usuarios_bp
 app.register_blueprint(gestionar_usuarios_bp)
 
+# Catálogo de bomberos/hidrantes: se carga una vez al iniciar el proceso
+from app.services.catalogo_recursos import catalogo
+catalogo.cargar()
+
 
 @app.route("/")
 def root():
     # endpoints del blueprint
-    return redirect(url_for("auth.inicio" if session.get("user_id") else "auth.login"))
\ No newline at end of file
+    return redirect(url_for("auth.inicio" if session.get("user_id") else "auth.login"))
+
+
+
+@app.route("/api/db/pool")
+@admin_required
+def estado_pool():
+    """Estado del pool de conexiones (libres, en uso y overflow)."""
+    return jsonify({"ok": True, "pool": estadisticas_pool()}), 200
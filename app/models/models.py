@@ -1,7 +1,9 @@
 # app/models/models.py
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey, BIGINT, Boolean, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DECIMAL, TIMESTAMP, ForeignKey, BIGINT, Boolean, Table, Float, Index, DDL, event
+from sqlalchemy.orm import relationship, reconstructor
 from app.repositories.db import Base
+from app.constants.roles import PERMISSION_BITS, ALL_PERMISSIONS_MASK
+from app.constants.status import estado_display
 
 # Tabla intermedia para la relación muchos-a-muchos entre usuarios y roles
 usuario_roles = Table(
@@ -28,6 +30,17 @@ class Rol(Base):
     # Relación con usuarios
     usuarios = relationship("UsuarioMunicipal", secondary=usuario_roles, back_populates="roles")
 
+    @reconstructor
+    def _compilar_permisos(self):
+        """Al cargar el rol, compila sus permisos booleanos en una máscara de bits"""
+        self._permisos_mask = sum(bit for permiso, bit in PERMISSION_BITS.items() if getattr(self, permiso))
+
+    @property
+    def permisos_mask(self) -> int:
+        if getattr(self, "_permisos_mask", None) is None:
+            self._compilar_permisos()
+        return self._permisos_mask
+
 class UsuarioMunicipal(Base):
     __tablename__ = "usuario_municipal"
 
@@ -50,21 +63,53 @@ class UsuarioMunicipal(Base):
     # Relación con roles
     roles = relationship("Rol", secondary=usuario_roles, back_populates="usuarios")
     
+    @property
+    def permisos_mask(self) -> int:
+        """Unión de las máscaras de sus roles (todos los bits si es super admin).
+
+        Se calcula una vez por instancia y requiere los roles cargados; el
+        usuario en caché de load_current_user ya la trae calculada.
+        """
+        mascara = getattr(self, "_permisos_mask", None)
+        if mascara is None:
+            mascara = ALL_PERMISSIONS_MASK if self.is_admin else 0
+            for rol in self.roles:
+                mascara |= rol.permisos_mask
+            self._permisos_mask = mascara
+        return mascara
+
     def has_permission(self, permission: str) -> bool:
         """Verifica si el usuario tiene un permiso específico a través de sus roles"""
-        if self.is_admin:
-            return True
-        for rol in self.roles:
-            if getattr(rol, permission, False):
-                return True
-        return False
+        return bool(self.permisos_mask & PERMISSION_BITS.get(permission, 0))
     
     def has_role(self, role_name: str) -> bool:
         """Verifica si el usuario tiene un rol específico"""
         return any(rol.nombre_rol == role_name for rol in self.roles)
 
+# Las tablas que se archivan (app/repositories/archivo.py) no pueden reutilizar
+# ids: una emergencia nueva con el id de una archivada se mezclaría con ella en
+# el listado y chocaría con la clave primaria del archivo al archivarse. SQLite
+# sin AUTOINCREMENT reutiliza el id más alto al borrarlo y MySQL antes de 8.0
+# recalcula el contador al reiniciar (scripts/archivar_emergencias.py verifica
+# ambos casos).
+_SIN_REUTILIZAR_IDS = {"sqlite_autoincrement": True}
+
+
 class Emergencia(Base):
     __tablename__ = "emergencias"
+    # Índices para los filtros + orden del listado de /inicio (ver app/repositories/emergencias.py).
+    # En MySQL/SQLite cada índice secundario ya termina en la clave primaria; id_emergencias
+    # se declara igual para que el orden (columna, id) de la paginación quede explícito.
+    # Bases existentes: scripts/migrate_add_emergencia_indexes.py
+    __table_args__ = (
+        Index("ix_emergencias_fecha_id", "fecha_reporte", "id_emergencias"),
+        Index("ix_emergencias_estado_id", "estado", "id_emergencias"),
+        Index("ix_emergencias_distrito_id", "distrito", "id_emergencias"),
+        Index("ix_emergencias_tipo_id", "tipo", "id_emergencias"),
+        Index("ix_emergencias_estado_fecha", "estado", "fecha_reporte", "id_emergencias"),
+        Index("ix_emergencias_distrito_fecha", "distrito", "fecha_reporte", "id_emergencias"),
+        _SIN_REUTILIZAR_IDS,
+    )
 
     id_emergencias = Column(Integer, primary_key=True)
     Nombre_emergencia = Column(String(160), nullable=False)
@@ -97,10 +142,55 @@ class Emergencia(Base):
     recursos_desplazados = relationship("RecursoDesplazado", back_populates="emergencia", cascade="all, delete-orphan")
     acciones = relationship("Accion", back_populates="emergencia", cascade="all, delete-orphan")
 
+    # Solo lectura, para el reporte (app/repositories/emergencias.py:reporte): recursos
+    # separados por tipo en SQL y acciones de la más reciente a la más antigua
+    recursos_bomberos = relationship(
+        "Recurso", viewonly=True, order_by="Recurso.id_recursos",
+        primaryjoin="and_(Recurso.emergencias_id_emergencias == Emergencia.id_emergencias, "
+                    "Recurso.tipo_recurso == 'bombero')",
+    )
+    recursos_hidrantes = relationship(
+        "Recurso", viewonly=True, order_by="Recurso.id_recursos",
+        primaryjoin="and_(Recurso.emergencias_id_emergencias == Emergencia.id_emergencias, "
+                    "Recurso.tipo_recurso == 'hidrante')",
+    )
+    acciones_recientes = relationship("Accion", viewonly=True, order_by="Accion.fecha_hora.desc()")
+
+    def a_dict(self):
+        """Representación para las respuestas JSON del listado"""
+        return {
+            "id": self.id_emergencias,
+            "nombre": self.Nombre_emergencia,
+            "descripcion": self.descripcion,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "fecha_reporte": self.fecha_reporte.isoformat(sep=' ', timespec='seconds') if self.fecha_reporte else None,
+            "fecha_cierre": self.fecha_cierre.isoformat(sep=' ', timespec='seconds') if self.fecha_cierre else None,
+            "lat": float(self.lat) if self.lat is not None else None,
+            "lon": float(self.lon) if self.lon is not None else None,
+            "direccion": self.direccion,
+            "distrito": self.distrito,
+        }
+
+    def a_marcador(self):
+        """Marcador para el mapa de /inicio, o None si no tiene coordenadas"""
+        if self.lat is None or self.lon is None:
+            return None
+        return {
+            "id": self.id_emergencias,
+            "nombre": self.Nombre_emergencia,
+            "distrito": self.distrito or "",
+            # Mostrar etiqueta amigable en el popup del mapa
+            "estado": estado_display(self.estado) or self.estado,
+            "lat": float(self.lat),
+            "lon": float(self.lon),
+        }
+
 
 class Recurso(Base):
     """Tabla para almacenar recursos identificados cercanos a la emergencia"""
     __tablename__ = "recursos"
+    __table_args__ = _SIN_REUTILIZAR_IDS
     
     id_recursos = Column(Integer, primary_key=True)
     tipo_recurso = Column(String(50), nullable=True)  # 'bombero' o 'hidrante'
@@ -117,8 +207,10 @@ class Recurso(Base):
 class RecursoDesplazado(Base):
     """Tabla para almacenar recursos que fueron efectivamente desplegados"""
     __tablename__ = "recursos_desplazados"
+    __table_args__ = _SIN_REUTILIZAR_IDS
     
-    id_recursos_desplazado = Column(BIGINT, primary_key=True, autoincrement=True)
+    # En SQLite solo INTEGER PRIMARY KEY es autoincremental
+    id_recursos_desplazado = Column(BIGINT().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     tipo_recurso_deplazado = Column(Integer)  # Podría ser un enum o referencia
     hora_salida = Column(TIMESTAMP)
     hora_llegada = Column(TIMESTAMP)
@@ -131,6 +223,7 @@ class RecursoDesplazado(Base):
 class Accion(Base):
     """Tabla para almacenar las acciones realizadas durante la emergencia"""
     __tablename__ = "acciones"
+    __table_args__ = _SIN_REUTILIZAR_IDS
     
     id_acciones = Column(Integer, primary_key=True)
     tipo_accion = Column(String(80), nullable=True)
@@ -140,3 +233,230 @@ class Accion(Base):
     
     emergencia = relationship("Emergencia", back_populates="acciones")
 
+
+# Archivo de emergencias cerradas: scripts/archivar_emergencias.py mueve las
+# emergencias cerradas antiguas (con sus recursos, despliegues y acciones) a
+# tablas <tabla>_archivo con las mismas columnas, así las tablas que consultan
+# los paneles quedan chicas. El listado solo las lee cuando el filtro de fechas
+# llega a lo archivado (app/repositories/archivo.py).
+
+def _tabla_archivo(tabla: Table, *indices: Index) -> Table:
+    """Copia de `tabla` como <tabla>_archivo: mismas columnas y tipos, sin claves
+    foráneas ni autoincremento (las filas conservan su id original)"""
+    return Table(
+        f"{tabla.name}_archivo",
+        Base.metadata,
+        *(Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+          for c in tabla.columns),
+        *indices,
+    )
+
+
+class EmergenciaArchivada(Base):
+    """Emergencia cerrada movida al archivo (mismos atributos que Emergencia)"""
+    __table__ = _tabla_archivo(
+        Emergencia.__table__,
+        Index("ix_emergencias_archivo_fecha_id", "fecha_reporte", "id_emergencias"),
+        Index("ix_emergencias_archivo_estado_fecha", "estado", "fecha_reporte", "id_emergencias"),
+        Index("ix_emergencias_archivo_distrito_fecha", "distrito", "fecha_reporte", "id_emergencias"),
+    )
+
+    # Las mismas colecciones de solo lectura que usa el reporte de Emergencia
+    recursos_bomberos = relationship(
+        "RecursoArchivado", viewonly=True, order_by="RecursoArchivado.id_recursos",
+        primaryjoin="and_(foreign(RecursoArchivado.emergencias_id_emergencias) == EmergenciaArchivada.id_emergencias, "
+                    "RecursoArchivado.tipo_recurso == 'bombero')",
+    )
+    recursos_hidrantes = relationship(
+        "RecursoArchivado", viewonly=True, order_by="RecursoArchivado.id_recursos",
+        primaryjoin="and_(foreign(RecursoArchivado.emergencias_id_emergencias) == EmergenciaArchivada.id_emergencias, "
+                    "RecursoArchivado.tipo_recurso == 'hidrante')",
+    )
+    recursos_desplazados = relationship(
+        "RecursoDesplazadoArchivado", viewonly=True,
+        primaryjoin="foreign(RecursoDesplazadoArchivado.emergencias_id_emergencias) == EmergenciaArchivada.id_emergencias",
+    )
+    acciones_recientes = relationship(
+        "AccionArchivada", viewonly=True, order_by="AccionArchivada.fecha_hora.desc()",
+        primaryjoin="foreign(AccionArchivada.emergencias_id_emergencias) == EmergenciaArchivada.id_emergencias",
+    )
+
+    a_dict = Emergencia.a_dict
+    a_marcador = Emergencia.a_marcador
+
+
+class RecursoArchivado(Base):
+    __table__ = _tabla_archivo(Recurso.__table__, Index("ix_recursos_archivo_emergencia", "emergencias_id_emergencias"))
+
+
+class RecursoDesplazadoArchivado(Base):
+    __table__ = _tabla_archivo(RecursoDesplazado.__table__,
+                               Index("ix_recursos_desplazados_archivo_emergencia", "emergencias_id_emergencias"))
+
+
+class AccionArchivada(Base):
+    __table__ = _tabla_archivo(Accion.__table__, Index("ix_acciones_archivo_emergencia", "emergencias_id_emergencias"))
+
+
+class EstadisticaEmergencias(Base):
+    """Conteo de emergencias por día de reporte, estado, distrito y tipo.
+
+    Se mantiene de forma incremental (app/repositories/estadisticas.py) en la misma
+    transacción que crea o cambia la emergencia. Reconstrucción completa:
+    scripts/reconstruir_estadisticas.py
+    """
+    __tablename__ = "estadisticas_emergencias"
+
+    # 'YYYY-MM-DD' de fecha_reporte; '' (como en las demás columnas) si falta el dato
+    dia = Column(String(10), primary_key=True)
+    estado = Column(String(30), primary_key=True)
+    distrito = Column(String(80), primary_key=True)
+    tipo = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+
+
+class VersionDatos(Base):
+    """Contador de cambios por conjunto de datos ('emergencias', 'recursos').
+
+    Las escrituras lo incrementan en su misma transacción
+    (app/repositories/versiones.py); las respuestas condicionales (ETag) de
+    los listados lo leen en lugar de volver a calcular el resultado.
+    Migración: scripts/migrate_add_versiones_datos.py
+    """
+    __tablename__ = "versiones_datos"
+
+    nombre = Column(String(40), primary_key=True)
+    version = Column(BIGINT().with_variant(Integer, "sqlite"), nullable=False, default=0)
+
+
+class CompaniaBomberos(Base):
+    """Compañías de bomberos del catálogo (importadas desde app/JSON/bomberos.json)"""
+    __tablename__ = "companias_bomberos"
+    __table_args__ = (Index("ix_companias_bomberos_lat_lng", "lat", "lng"),)
+
+    id_compania_bomberos = Column(Integer, primary_key=True, autoincrement=False)  # idCompaniaBomberos del JSON
+    nombre = Column(String(200), nullable=False)
+    lat = Column(Float(precision=53), nullable=False)
+    lng = Column(Float(precision=53), nullable=False)
+    bomberos_disponibles = Column(Integer, nullable=True)
+    vehiculos_disponibles = Column(Integer, nullable=True)
+    nombre_responsable = Column(String(160), nullable=True)
+    cargo_responsable = Column(String(80), nullable=True)
+
+    def a_dict(self):
+        """Mismas claves que bomberos.json"""
+        return {
+            "idCompaniaBomberos": self.id_compania_bomberos,
+            "nombre": self.nombre,
+            "lat": self.lat,
+            "lng": self.lng,
+            "bomberos_disponibles": self.bomberos_disponibles,
+            "vehiculos_disponibles": self.vehiculos_disponibles,
+            "nombre_responsable": self.nombre_responsable,
+            "cargo_responsable": self.cargo_responsable,
+        }
+
+
+class Hidrante(Base):
+    """Hidrantes del catálogo (importados desde app/JSON/hidrantes.json)"""
+    __tablename__ = "hidrantes"
+    __table_args__ = (Index("ix_hidrantes_lat_lng", "lat", "lng"),)
+
+    id_hidrante = Column(Integer, primary_key=True, autoincrement=False)  # ID del JSON
+    nis = Column(String(20), nullable=True)
+    nombre = Column(String(200), nullable=False)
+    estado = Column(String(30), nullable=True)
+    lat = Column(Float(precision=53), nullable=False)
+    lng = Column(Float(precision=53), nullable=False)
+
+    def a_dict(self):
+        """Mismas claves que hidrantes.json"""
+        return {
+            "ID": self.id_hidrante,
+            "NIS": self.nis,
+            "nombre": self.nombre,
+            "estado": self.estado,
+            "lat": self.lat,
+            "lng": self.lng,
+        }
+
+
+# Índices espaciales de las tablas de recursos (no expresables como Column/Index):
+# - SQLite: tabla virtual R*Tree por tabla, sincronizada con triggers
+# - MySQL: columna POINT generada (SRID 4326, orden lat/lng) con índice SPATIAL
+def _ddl_indice_espacial(tabla: str, pk: str):
+    rtree = f"{tabla}_rtree"
+    sentencias_sqlite = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_rtree_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {rtree} VALUES (new.{pk}, new.lat, new.lat, new.lng, new.lng);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_rtree_au AFTER UPDATE OF lat, lng, {pk} ON {tabla} BEGIN
+            DELETE FROM {rtree} WHERE id = old.{pk};
+            INSERT INTO {rtree} VALUES (new.{pk}, new.lat, new.lat, new.lng, new.lng);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_rtree_ad AFTER DELETE ON {tabla} BEGIN
+            DELETE FROM {rtree} WHERE id = old.{pk};
+        END""",
+    ]
+    # MySQL 8.0+ (atributo SRID). Con SRID 4326 el primer eje de POINT es la latitud.
+    # La columna es NOT NULL (requisito del índice SPATIAL): lat/lng también lo son
+    # y scripts/importar_recursos_bd.py omite las filas sin coordenadas válidas
+    sentencias_mysql = [
+        f"""ALTER TABLE {tabla}
+            ADD COLUMN ubicacion POINT GENERATED ALWAYS AS (ST_SRID(POINT(lat, lng), 4326)) STORED SRID 4326 NOT NULL,
+            ADD SPATIAL INDEX sx_{tabla}_ubicacion (ubicacion)""",
+    ]
+    return (
+        [DDL(sql).execute_if(dialect="sqlite") for sql in sentencias_sqlite]
+        + [DDL(sql).execute_if(dialect="mysql") for sql in sentencias_mysql]
+    )
+
+
+for _tabla, _pk in ((CompaniaBomberos.__table__, "id_compania_bomberos"), (Hidrante.__table__, "id_hidrante")):
+    for _ddl in _ddl_indice_espacial(_tabla.name, _pk):
+        event.listen(_tabla, "after_create", _ddl)
+    event.listen(_tabla, "before_drop", DDL(f"DROP TABLE IF EXISTS {_tabla.name}_rtree").execute_if(dialect="sqlite"))
+
+
+# Índice de texto completo del buscador de /inicio (nombre, descripción y dirección):
+# - SQLite: tabla FTS5 externa `emergencias_fts` (sin tildes, remove_diacritics),
+#   sincronizada con triggers
+# - MySQL: índice FULLTEXT; la insensibilidad a tildes la da la collation de las
+#   columnas (utf8mb4_0900_ai_ci / utf8mb4_general_ci)
+# Bases existentes: scripts/migrate_add_emergencia_fulltext.py
+COLUMNAS_TEXTO_EMERGENCIA = ("Nombre_emergencia", "descripcion", "direccion")
+
+
+def _ddl_texto_completo():
+    columnas = ", ".join(COLUMNAS_TEXTO_EMERGENCIA)
+    nuevos = ", ".join(f"new.{c}" for c in COLUMNAS_TEXTO_EMERGENCIA)
+    viejos = ", ".join(f"old.{c}" for c in COLUMNAS_TEXTO_EMERGENCIA)
+    sentencias_sqlite = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS emergencias_fts USING fts5(
+            {columnas}, content='emergencias', content_rowid='id_emergencias',
+            tokenize='unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS emergencias_fts_ai AFTER INSERT ON emergencias BEGIN
+            INSERT INTO emergencias_fts(rowid, {columnas}) VALUES (new.id_emergencias, {nuevos});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS emergencias_fts_au AFTER UPDATE OF {columnas}, id_emergencias ON emergencias BEGIN
+            INSERT INTO emergencias_fts(emergencias_fts, rowid, {columnas}) VALUES ('delete', old.id_emergencias, {viejos});
+            INSERT INTO emergencias_fts(rowid, {columnas}) VALUES (new.id_emergencias, {nuevos});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS emergencias_fts_ad AFTER DELETE ON emergencias BEGIN
+            INSERT INTO emergencias_fts(emergencias_fts, rowid, {columnas}) VALUES ('delete', old.id_emergencias, {viejos});
+        END""",
+    ]
+    sentencias_mysql = [
+        f"ALTER TABLE emergencias ADD FULLTEXT INDEX ft_emergencias_texto ({columnas})",
+    ]
+    return sentencias_sqlite, sentencias_mysql
+
+
+SENTENCIAS_TEXTO_SQLITE, SENTENCIAS_TEXTO_MYSQL = _ddl_texto_completo()
+
+for _sql in SENTENCIAS_TEXTO_SQLITE:
+    event.listen(Emergencia.__table__, "after_create", DDL(_sql).execute_if(dialect="sqlite"))
+for _sql in SENTENCIAS_TEXTO_MYSQL:
+    event.listen(Emergencia.__table__, "after_create", DDL(_sql).execute_if(dialect="mysql"))
+event.listen(Emergencia.__table__, "before_drop", DDL("DROP TABLE IF EXISTS emergencias_fts").execute_if(dialect="sqlite"))
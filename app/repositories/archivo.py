@@ -0,0 +1,179 @@
+# app/repositories/archivo.py
+"""Archivo de emergencias cerradas (tablas <tabla>_archivo, ver app/models/models.py).
+
+archivar_lote() mueve un lote de emergencias cerradas hace más de N días, con
+sus recursos, despliegues y acciones: copia las filas con INSERT ... SELECT y
+las borra de las tablas activas en la misma transacción. Cada lote se
+confirma por separado, así que un archivado interrumpido se retoma volviendo
+a ejecutar scripts/archivar_emergencias.py.
+
+Se usan tablas aparte y no particiones por rango de MySQL porque InnoDB no
+admite particionar tablas con claves foráneas (recursos, despliegues y
+acciones referencian a emergencias) y SQLite no tiene particiones.
+
+Solo se archivan emergencias con fecha_reporte: el listado lee el archivo
+cuando el filtro de fechas llega a lo archivado (llega_al_archivo) y una
+emergencia sin fecha no se alcanzaría nunca. Los conteos de
+estadisticas_emergencias no cambian al archivar.
+"""
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.constants.status import ESTADOS_CIERRE
+from app.models.models import (
+    Accion, AccionArchivada, Emergencia, EmergenciaArchivada, Recurso, RecursoArchivado,
+    RecursoDesplazado, RecursoDesplazadoArchivado,
+)
+from app.repositories import versiones as versiones_repo
+
+# Antigüedad (días desde fecha_cierre) a partir de la cual se archiva
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "365"))
+# Emergencias por transacción
+ARCHIVO_LOTE = int(os.getenv("ARCHIVO_LOTE", "500"))
+
+# (tabla activa, tabla de archivo) de las filas hijas de una emergencia
+TABLAS_HIJAS = [
+    (Recurso, RecursoArchivado),
+    (RecursoDesplazado, RecursoDesplazadoArchivado),
+    (Accion, AccionArchivada),
+]
+TABLAS_ARCHIVO = [EmergenciaArchivada.__table__] + [archivo.__table__ for _, archivo in TABLAS_HIJAS]
+
+_disponible: Dict[str, bool] = {}
+
+
+def disponible(db: Session) -> bool:
+    """True si la base ya tiene las tablas de archivo.
+
+    Solo se recuerda el resultado positivo: una base que todavía no las tiene
+    las ve en cuanto se crean, sin reiniciar.
+    """
+    bind = db.get_bind()
+    clave = str(bind.url)
+    if not _disponible.get(clave):
+        _disponible[clave] = inspect(db.connection()).has_table(EmergenciaArchivada.__table__.name)
+    return _disponible[clave]
+
+
+def ultima_fecha_archivada(db: Session) -> Optional[datetime]:
+    """fecha_reporte más reciente del archivo; None si está vacío o no existe"""
+    if not disponible(db):
+        return None
+    return db.scalar(select(func.max(EmergenciaArchivada.fecha_reporte)))
+
+
+def llega_al_archivo(db: Session, desde: Optional[datetime], hasta: Optional[datetime]) -> bool:
+    """True si el rango de fechas de reporte [desde, hasta] incluye días archivados.
+
+    Sin filtro de fechas el listado solo lee las tablas activas.
+    """
+    if desde is None and hasta is None:
+        return False
+    ultima = ultima_fecha_archivada(db)
+    return ultima is not None and (desde is None or desde <= ultima)
+
+
+def candidatas(antes_de: datetime):
+    """Emergencias a archivar: cerradas antes de `antes_de` y con fecha de reporte"""
+    return select(Emergencia.id_emergencias).where(
+        Emergencia.estado.in_(ESTADOS_CIERRE),
+        Emergencia.fecha_cierre < antes_de,
+        Emergencia.fecha_reporte.is_not(None),
+    )
+
+
+def contar_candidatas(db: Session, antes_de: datetime) -> int:
+    return db.scalar(select(func.count()).select_from(candidatas(antes_de).subquery()))
+
+
+def reutiliza_ids(db: Session) -> Optional[str]:
+    """Motivo por el que la base puede reutilizar ids de filas archivadas, o None.
+
+    Archivar borra filas de las tablas activas; si el motor vuelve a asignar
+    esos ids, una emergencia nueva se confunde con una archivada (ver
+    _SIN_REUTILIZAR_IDS en app/models/models.py).
+    """
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        tablas = [Emergencia] + [activa for activa, _ in TABLAS_HIJAS]
+        for modelo in tablas:
+            sql = db.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+                            {"nombre": modelo.__tablename__})
+            if sql and "AUTOINCREMENT" not in sql.upper():
+                return (f"la tabla {modelo.__tablename__} no tiene AUTOINCREMENT "
+                        "(base creada antes de esta versión: hay que recrearla)")
+    elif dialecto == "mysql":
+        version = db.scalar(text("SELECT VERSION()"))
+        numeros = tuple(int(n) for n in re.findall(r"\d+", version)[:3])
+        minimo = (10, 2, 4) if "mariadb" in version.lower() else (8, 0, 0)
+        if numeros < minimo:
+            return (f"el servidor {version} recalcula el AUTO_INCREMENT al reiniciar "
+                    f"(se requiere {'.'.join(map(str, minimo))} o superior)")
+    return None
+
+
+def _verificar_ids_libres(db: Session, activa, archivo, columna_emergencia: str, ids: List[int]) -> None:
+    """Lanza RuntimeError si alguna fila a copiar ya tiene su id en el archivo"""
+    pk = activa.__mapper__.primary_key[0]
+    pk_archivo = archivo.__table__.c[pk.name]
+    repetidos = list(db.scalars(
+        select(pk_archivo).where(pk_archivo.in_(
+            select(pk).where(activa.__table__.c[columna_emergencia].in_(ids))
+        )).limit(10)
+    ))
+    if repetidos:
+        raise RuntimeError(
+            f"{archivo.__table__.name} ya tiene filas con los ids {repetidos}: la tabla "
+            f"{activa.__tablename__} reutilizó ids de filas archivadas. Hay que resolver los "
+            "ids duplicados a mano antes de seguir archivando"
+        )
+
+
+def _copiar(db: Session, activa, archivo, columna_emergencia: str, ids: List[int]) -> None:
+    origen = activa.__table__
+    db.execute(
+        insert(archivo.__table__).from_select(
+            [c.name for c in origen.columns],
+            select(*origen.columns).where(origen.c[columna_emergencia].in_(ids)),
+        )
+    )
+
+
+def archivar_lote(db: Session, antes_de: datetime, lote: int = ARCHIVO_LOTE) -> List[int]:
+    """
+    Mueve al archivo hasta `lote` emergencias candidatas (las de menor id) con
+    sus filas hijas, sin commit. Devuelve los ids movidos; lista vacía cuando
+    no queda nada por archivar. Lanza RuntimeError si algún id ya está en el
+    archivo (ver reutiliza_ids).
+    """
+    ids = list(db.scalars(candidatas(antes_de).order_by(Emergencia.id_emergencias).limit(lote)))
+    if not ids:
+        return ids
+
+    # Un id repetido haría fallar el INSERT con un error de clave primaria poco claro
+    _verificar_ids_libres(db, Emergencia, EmergenciaArchivada, "id_emergencias", ids)
+    for activa, archivo in TABLAS_HIJAS:
+        _verificar_ids_libres(db, activa, archivo, "emergencias_id_emergencias", ids)
+
+    _copiar(db, Emergencia, EmergenciaArchivada, "id_emergencias", ids)
+    for activa, archivo in TABLAS_HIJAS:
+        _copiar(db, activa, archivo, "emergencias_id_emergencias", ids)
+
+    # Primero las hijas, por las claves foráneas hacia emergencias
+    for activa, _ in TABLAS_HIJAS:
+        db.execute(
+            delete(activa).where(activa.emergencias_id_emergencias.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+    db.execute(
+        delete(Emergencia).where(Emergencia.id_emergencias.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+    # Las emergencias movidas salen del listado sin filtro de fechas
+    versiones_repo.incrementar(db, versiones_repo.EMERGENCIAS)
+    return ids
@@ -1,16 +1,98 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import re
+import time
+from functools import wraps
+from typing import Any, Dict
+
+from flask import g, has_request_context, session as sesion_http
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.elements import TextClause
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Réplica de solo lectura (opcional) para las vistas marcadas con @solo_lectura
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+# Segundos tras una escritura en que el mismo usuario sigue leyendo del primario
+# (debe cubrir el retraso de replicación)
+REPLICA_VENTANA_S = float(os.getenv("DB_REPLICA_VENTANA_S", "10"))
+
+
+def _crear_engine(url: str):
+    # Pool de conexiones (configurable por entorno). DB_POOL_RECYCLE debe ser menor
+    # que el wait_timeout de MySQL para no reutilizar conexiones ya cortadas.
+    # SQLite usa el pool por defecto de SQLAlchemy.
+    if url.startswith("sqlite"):
+        opciones_pool = {}
+    else:
+        opciones_pool = {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+            "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        }
+
+    nuevo = create_engine(
+        url,
+        pool_pre_ping=True,
+        future=True,
+        connect_args=({"check_same_thread": False} if url.startswith("sqlite") else {}),
+        **opciones_pool
+    )
+
+    if url.startswith("sqlite"):
+        from app.services.distancias import haversine_km
+
+        @event.listens_for(nuevo, "connect")
+        def _registrar_funciones_sqlite(dbapi_connection, connection_record):
+            # SQLite no trae trigonometría: la distancia se calcula con la misma función que el catálogo
+            dbapi_connection.create_function("haversine_km", 4, haversine_km, deterministic=True)
+
+    return nuevo
+
+
+engine = _crear_engine(DATABASE_URL)
+engine_replica = _crear_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+
+
+def _leer_de_replica() -> bool:
+    """Lecturas a la réplica: solo en vistas @solo_lectura y fuera de la ventana
+    posterior a una escritura del mismo usuario (read-your-writes)"""
+    if engine_replica is None or not has_request_context() or not g.get("solo_lectura"):
+        return False
+    return time.time() >= sesion_http.get("leer_primaria_hasta", 0)
+
+
+# SQL textual que se puede leer de la réplica; cualquier otro text() va al primario
+_TEXTO_LECTURA = re.compile(r"\s*(SELECT|SHOW|EXPLAIN|DESCRIBE)\b", re.IGNORECASE)
+
+
+def _es_lectura(clause) -> bool:
+    """True si la sentencia solo lee: un SELECT (sin FOR UPDATE si es text()),
+    o ninguna sentencia (Session.connection())"""
+    if clause is None:
+        return True
+    if isinstance(clause, TextClause):
+        return bool(_TEXTO_LECTURA.match(clause.text)) and "FOR UPDATE" not in clause.text.upper()
+    return bool(getattr(clause, "is_select", False))
+
+
+class SesionEnrutada(Session):
+    """Sesión que envía las escrituras (flush, INSERT/UPDATE/DELETE, DDL, SQL
+    textual que no es un SELECT) al primario y, cuando corresponde, las lecturas
+    a la réplica"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        # Receta "custom vertical partitioning" de la documentación de SQLAlchemy:
+        # el flush pide el bind de cada tabla con su mapper
+        if (mapper is not None and self._flushing) or not _es_lectura(clause):
+            self.info["escribio"] = True
+            return engine
+        if _leer_de_replica():
+            return engine_replica
+        return engine
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    future=True,
-    connect_args=({"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {})
-)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+SessionLocal = sessionmaker(class_=SesionEnrutada, bind=engine, autoflush=False, autocommit=False, future=True)
 
 Base = declarative_base()
 
@@ -20,3 +102,64 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_session() -> Session:
+    """Sesión del request actual, creada al primer uso.
+
+    La sesión toma una conexión del pool recién con la primera consulta, así
+    los requests que no usan la BD no ocupan ninguna. Se cierra al terminar el
+    request (cerrar_sesion, registrada con init_app).
+    """
+    if "db" not in g:
+        g.db = SessionLocal()
+    return g.db
+
+
+def solo_lectura(f):
+    """Decorador para vistas que solo leen: sus consultas pueden ir a la réplica"""
+    @wraps(f)
+    def _wrap(*args, **kwargs):
+        g.solo_lectura = True
+        return f(*args, **kwargs)
+    return _wrap
+
+
+def marcar_escritura(resp):
+    # Tras escribir, el usuario lee del primario durante la ventana de replicación
+    db = g.get("db")
+    if engine_replica is not None and db is not None and db.info.get("escribio"):
+        sesion_http["leer_primaria_hasta"] = time.time() + REPLICA_VENTANA_S
+    return resp
+
+
+def cerrar_sesion(exc=None):
+    db = g.pop("db", None)
+    if db is not None:
+        db.close()
+
+
+def init_app(app):
+    app.after_request(marcar_escritura)
+    app.teardown_appcontext(cerrar_sesion)
+
+
+def _estadisticas(motor) -> Dict[str, Any]:
+    pool = motor.pool
+    estadisticas = {"tipo": type(pool).__name__, "estado": pool.status()}
+    for nombre, metodo in (("tamano", "size"), ("libres", "checkedin"),
+                           ("en_uso", "checkedout"), ("overflow", "overflow")):
+        if hasattr(pool, metodo):
+            estadisticas[nombre] = getattr(pool, metodo)()
+    return estadisticas
+
+
+def estadisticas_pool() -> Dict[str, Any]:
+    """Conexiones del pool: tamaño, libres (checked-in), en uso (checked-out) y overflow.
+
+    Con réplica configurada, su pool aparece aparte en "replica".
+    """
+    estadisticas = _estadisticas(engine)
+    if engine_replica is not None:
+        estadisticas["replica"] = _estadisticas(engine_replica)
+    return estadisticas
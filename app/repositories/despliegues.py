@@ -0,0 +1,75 @@
+# app/repositories/despliegues.py
+"""Escritura de un despliegue de recursos (POST /api/desplegar-recursos).
+
+Cada tabla se inserta con una sola sentencia para todas sus filas
+(insert(...) con lista de parámetros: executemany / insertmanyvalues), sin
+crear objetos ORM ni esperar el id generado de cada fila.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Accion, Emergencia, Recurso, RecursoDesplazado
+from app.services.distancias import haversine_km
+
+# tipo_recurso de la tabla recursos, tipo_recurso_deplazado y estado inicial de recursos_desplazados
+TIPOS_DESPLIEGUE = {
+    "bomberos": ("bombero", 1, "EN_CAMINO"),
+    "hidrantes": ("hidrante", 2, "IDENTIFICADO"),
+}
+
+
+def registrar_despliegue(db: Session, emergencia: Emergencia, recursos: Dict[str, Sequence[Any]],
+                         descripcion: str, ahora: datetime) -> List[Dict[str, Any]]:
+    """
+    Inserta los recursos identificados, los recursos desplazados y la acción
+    del despliegue (sin commit).
+
+    Args:
+        recursos: {"bomberos": [registros], "hidrantes": [registros]} del catálogo
+
+    Returns:
+        [{"tipo", "nombre", "distancia"}] de cada recurso, en el orden recibido
+    """
+    # Las coordenadas de la emergencia se convierten una sola vez
+    lat_emergencia = float(emergencia.lat)
+    lon_emergencia = float(emergencia.lon)
+    id_emergencia = emergencia.id_emergencias
+
+    filas_recursos = []
+    filas_desplazados = []
+    guardados = []
+    for clave, registros in recursos.items():
+        tipo, tipo_desplazado, estado = TIPOS_DESPLIEGUE[clave]
+        for r in registros:
+            distancia = round(haversine_km(lat_emergencia, lon_emergencia, r.lat, r.lng), 2)
+            filas_recursos.append({
+                "tipo_recurso": tipo,
+                "entidad_recurso": str(r.id),
+                # Los float del catálogo van directo a las columnas DECIMAL(9,6)
+                "lat": r.lat,
+                "lon": r.lng,
+                "direccion": r.nombre or '',
+                "distancia_recurso": f"{distancia} km",
+                "emergencias_id_emergencias": id_emergencia,
+            })
+            filas_desplazados.append({
+                "tipo_recurso_deplazado": tipo_desplazado,
+                "hora_salida": ahora,
+                "estado": estado,
+                "emergencias_id_emergencias": id_emergencia,
+            })
+            guardados.append({"tipo": tipo, "nombre": r.nombre, "distancia": distancia})
+
+    if filas_recursos:
+        db.execute(insert(Recurso), filas_recursos)
+        db.execute(insert(RecursoDesplazado), filas_desplazados)
+    db.execute(insert(Accion), [{
+        "tipo_accion": 'DESPLIEGUE_RECURSOS',
+        "descripcion_durante_emer": descripcion,
+        "fecha_hora": ahora,
+        "emergencias_id_emergencias": id_emergencia,
+    }])
+    return guardados
@@ -0,0 +1,609 @@
+# app/repositories/emergencias.py
+"""Listado de emergencias con filtros y paginación por keyset (seek).
+
+Lo usan la vista /inicio y GET /api/emergencias, así ambas devuelven
+exactamente las mismas páginas para los mismos parámetros.
+
+La paginación no usa OFFSET: el cursor guarda el valor de la columna de orden
+y el id de la última (o primera) fila mostrada, y la página siguiente se pide
+con un WHERE sobre esos valores. El id desempata filas con el mismo valor.
+Los NULL se ordenan como el valor más chico (orden por defecto de MySQL y
+SQLite): primero en orden ascendente y al final en descendente.
+
+El filtro `q` busca en nombre, descripción y dirección con el índice de texto
+completo (FTS5 en SQLite, FULLTEXT en MySQL; ver app/models/models.py), sin
+distinguir tildes, y por defecto ordena por relevancia. Si la base todavía no
+tiene el índice se usa LIKE sobre las mismas columnas.
+
+Cuando el filtro de fechas llega a emergencias archivadas (ver
+app/repositories/archivo.py) las consultas se hacen sobre las tablas activas
+y las de archivo juntas (UNION ALL). El archivo no tiene índice de texto:
+ahí `q` usa LIKE y, al ordenar por relevancia, sus filas van al final.
+"""
+import base64
+import binascii
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    DECIMAL, TIMESTAMP, and_, column, func, literal, literal_column, null, or_, select, table, text, union_all,
+)
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.models import (
+    COLUMNAS_TEXTO_EMERGENCIA, Accion, AccionArchivada, Emergencia, EmergenciaArchivada, Recurso,
+    RecursoArchivado, RecursoDesplazado,
+)
+from app.repositories import archivo as archivo_repo
+
+# Columnas de orden admitidas (parámetro sort)
+COLUMNAS_ORDEN = {
+    'id': Emergencia.id_emergencias,
+    'nombre': Emergencia.Nombre_emergencia,
+    'distrito': Emergencia.distrito,
+    'estado': Emergencia.estado,
+    'fecha': Emergencia.fecha_reporte,
+}
+# Orden por relevancia de la búsqueda de texto (default cuando hay `q`)
+ORDEN_RELEVANCIA = 'relevancia'
+
+LIMITE_DEFAULT = 50
+LIMITE_MAXIMO = 200
+
+
+def leer_limite(valor: Optional[str]) -> int:
+    """Tamaño de página pedido (parámetro limite), acotado a 1..LIMITE_MAXIMO."""
+    try:
+        limite = int(valor) if valor else LIMITE_DEFAULT
+    except ValueError:
+        return LIMITE_DEFAULT
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+@dataclass(frozen=True)
+class FiltrosEmergencias:
+    """Parámetros del listado tal como llegan en la query string"""
+    q: str = ''
+    distrito: str = ''
+    estado: str = ''
+    tipo: str = ''
+    desde: str = ''
+    hasta: str = ''
+    sort: str = 'id'
+    dir: str = 'desc'
+
+    @classmethod
+    def desde_args(cls, args) -> "FiltrosEmergencias":
+        q = (args.get('q') or '').strip()
+        sort = (args.get('sort') or '').strip()
+        if sort not in COLUMNAS_ORDEN and sort != ORDEN_RELEVANCIA:
+            sort = ORDEN_RELEVANCIA if terminos_busqueda(q) else 'id'
+        direccion = (args.get('dir') or 'desc').lower()
+        return cls(
+            q=q,
+            distrito=(args.get('distrito') or '').strip(),
+            estado=(args.get('estado') or '').strip(),
+            tipo=(args.get('tipo') or '').strip(),
+            desde=(args.get('desde') or '').strip(),
+            hasta=(args.get('hasta') or '').strip(),
+            sort=sort,
+            dir='asc' if direccion == 'asc' else 'desc',
+        )
+
+    def a_dict(self) -> Dict[str, str]:
+        return {
+            "q": self.q,
+            "distrito": self.distrito,
+            "estado": self.estado,
+            "tipo": self.tipo,
+            "desde": self.desde,
+            "hasta": self.hasta,
+            "sort": self.sort,
+            "dir": self.dir,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Búsqueda de texto
+# ---------------------------------------------------------------------------
+
+_FTS = table("emergencias_fts", column("rowid"))
+_motor_texto: Dict[str, Optional[str]] = {}
+
+
+def motor_texto(db: Session) -> Optional[str]:
+    """'sqlite' o 'mysql' si la base tiene el índice de texto completo; None si no.
+
+    Se consulta una vez por proceso y base (tras migrar hay que reiniciar).
+    """
+    bind = db.get_bind()
+    clave = str(bind.url)
+    if clave not in _motor_texto:
+        dialecto = bind.dialect.name
+        if dialecto == "sqlite":
+            existe = db.scalar(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'emergencias_fts'"))
+        elif dialecto == "mysql":
+            existe = db.scalar(text("""
+                SELECT 1 FROM INFORMATION_SCHEMA.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'emergencias'
+                AND INDEX_NAME = 'ft_emergencias_texto' LIMIT 1
+            """))
+        else:
+            existe = None
+        _motor_texto[clave] = dialecto if existe else None
+    return _motor_texto[clave]
+
+
+def terminos_busqueda(q: str) -> List[str]:
+    """Palabras de `q` (letras y dígitos); los signos se descartan"""
+    return re.findall(r"\w+", q.lower())
+
+
+def _coincide_texto(q: str, motor: Optional[str], E=Emergencia):
+    """Condición de búsqueda de todas las palabras de `q` (como prefijo)"""
+    terminos = terminos_busqueda(q)
+    if motor == "sqlite" and terminos:
+        consulta = " ".join(f'"{t}"*' for t in terminos)
+        return Emergencia.id_emergencias.in_(
+            select(_FTS.c.rowid).where(literal_column("emergencias_fts").op("MATCH")(consulta))
+        )
+    if motor == "mysql" and terminos:
+        return _match_mysql(terminos)
+    columnas = [getattr(E, c) for c in COLUMNAS_TEXTO_EMERGENCIA]
+    return or_(*(c.ilike(f"%{q}%") for c in columnas))
+
+
+def _match_mysql(terminos: List[str]):
+    columnas = [getattr(Emergencia, c) for c in COLUMNAS_TEXTO_EMERGENCIA]
+    return mysql.match(*columnas, against=" ".join(f"+{t}*" for t in terminos)).in_boolean_mode()
+
+
+def _relevancia(q: str, motor: Optional[str]):
+    """Puntaje de relevancia de cada fila para `q` (mayor es mejor), o None sin índice"""
+    terminos = terminos_busqueda(q)
+    if not terminos:
+        return None
+    if motor == "sqlite":
+        # bm25() es menor cuanto más relevante: se invierte el signo. Las filas
+        # que solo coinciden por id quedan con NULL (al final en orden desc)
+        fts = literal_column("emergencias_fts")
+        return (
+            select(-func.bm25(fts))
+            .select_from(_FTS)
+            .where(fts.op("MATCH")(" ".join(f'"{t}"*' for t in terminos)),
+                   _FTS.c.rowid == Emergencia.id_emergencias)
+            .scalar_subquery()
+        )
+    if motor == "mysql":
+        return _match_mysql(terminos)
+    return None
+
+
+def condiciones(filtros: FiltrosEmergencias, motor: Optional[str] = None, E=Emergencia) -> List[Any]:
+    """Condiciones WHERE para los filtros del listado sobre la tabla E
+    (Emergencia o EmergenciaArchivada).
+
+    `motor` es el de motor_texto(db); sin índice de texto la búsqueda usa LIKE.
+    """
+    condiciones = []
+    q = filtros.q
+    if q:
+        if q.isdigit():
+            condiciones.append(or_(E.id_emergencias == int(q), _coincide_texto(q, motor, E)))
+        else:
+            condiciones.append(_coincide_texto(q, motor, E))
+
+    if filtros.distrito:
+        condiciones.append(E.distrito == filtros.distrito)
+
+    if filtros.estado:
+        condiciones.append(E.estado == filtros.estado)
+
+    if filtros.tipo:
+        condiciones.append(E.tipo == filtros.tipo)
+
+    # Rango de fechas por fecha_reporte (YYYY-MM-DD, ambos días incluidos) como
+    # intervalo semiabierto [desde 00:00, hasta + 1 día 00:00): la columna queda
+    # sin envolver en funciones y se puede usar su índice
+    desde = _leer_fecha(filtros.desde)
+    if desde is not None:
+        condiciones.append(E.fecha_reporte >= desde)
+    hasta = _leer_fecha(filtros.hasta)
+    if hasta is not None:
+        condiciones.append(E.fecha_reporte < hasta + timedelta(days=1))
+    return condiciones
+
+
+def _leer_fecha(valor: str) -> Optional[datetime]:
+    """Fecha YYYY-MM-DD a las 00:00; None si falta o es inválida (el filtro se ignora)."""
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def entidades(db: Session, filtros: FiltrosEmergencias) -> List[Any]:
+    """Tablas que cubre el listado: Emergencia y, si el rango de fechas llega a
+    lo archivado, también EmergenciaArchivada."""
+    if archivo_repo.llega_al_archivo(db, _leer_fecha(filtros.desde), _leer_fecha(filtros.hasta)):
+        return [Emergencia, EmergenciaArchivada]
+    return [Emergencia]
+
+
+def _motor(E, motor: Optional[str]) -> Optional[str]:
+    # Solo la tabla activa tiene índice de texto completo
+    return motor if E is Emergencia else None
+
+
+def contar(db: Session, filtros: FiltrosEmergencias) -> int:
+    """Total de emergencias que cumplen los filtros (COUNT aparte de la página)."""
+    motor = motor_texto(db)
+    return sum(
+        db.scalar(select(func.count(E.id_emergencias)).where(*condiciones(filtros, _motor(E, motor), E)))
+        for E in entidades(db, filtros)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Cursor
+# ---------------------------------------------------------------------------
+
+def _valor_cursor(valor: Any) -> Any:
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+
+def codificar_cursor(filtros: FiltrosEmergencias, valor: Any, id_emergencia: int, sentido: str,
+                     tabla: Optional[int] = None) -> str:
+    """Cursor opaco: orden, sentido ('sig' o 'ant'), valor de orden e id de la fila
+    y, en el listado con archivo, la tabla de la fila (desempata ids repetidos)."""
+    partes = [filtros.sort, filtros.dir, sentido, _valor_cursor(valor), id_emergencia]
+    if tabla is not None:
+        partes.append(tabla)
+    contenido = json.dumps(partes, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(contenido.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, filtros: FiltrosEmergencias) -> Tuple[str, Any, int, int]:
+    """(sentido, valor, id, tabla) del cursor; lanza ValueError si es inválido o de otro orden.
+
+    Un cursor sin tabla (de una página solo de tablas activas) corresponde a la tabla 0.
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        partes = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(partes, list) or len(partes) not in (5, 6):
+            raise ValueError(partes)
+        sort, direccion, sentido, valor, id_emergencia = partes[:5]
+        tabla = partes[5] if len(partes) == 6 else 0
+        if sentido not in ('sig', 'ant') or not isinstance(id_emergencia, int) or not isinstance(tabla, int):
+            raise ValueError(sentido)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("cursor inválido")
+    if (sort, direccion) != (filtros.sort, filtros.dir):
+        raise ValueError("el cursor corresponde a otro orden")
+    if sort == 'fecha' and valor is not None:
+        valor = datetime.fromisoformat(valor)
+    if sort == ORDEN_RELEVANCIA and not (valor is None or isinstance(valor, (int, float))):
+        raise ValueError("cursor inválido")
+    return sentido, valor, id_emergencia, tabla
+
+
+# ---------------------------------------------------------------------------
+# Páginas
+# ---------------------------------------------------------------------------
+
+def _posteriores(columna, ascendente: bool, valor: Any, id_emergencia: int, ident=Emergencia.id_emergencias,
+                 tabla: Optional[Tuple[Any, int]] = None):
+    """Filas ubicadas después de (valor, id) en el orden (columna, id) indicado.
+
+    tabla: (columna, valor) de la tabla de la fila en el UNION con el archivo,
+    como último desempate (orden (columna, id, tabla)).
+    """
+    if tabla is None:
+        despues_id = ident > id_emergencia if ascendente else ident < id_emergencia
+    else:
+        columna_tabla, valor_tabla = tabla
+        siguiente_tabla = columna_tabla > valor_tabla if ascendente else columna_tabla < valor_tabla
+        despues_id = or_(ident > id_emergencia if ascendente else ident < id_emergencia,
+                         and_(ident == id_emergencia, siguiente_tabla))
+    if columna is ident:
+        return despues_id
+    if ascendente:
+        if valor is None:
+            return or_(columna.is_not(None), and_(columna.is_(None), despues_id))
+        return or_(columna > valor, and_(columna == valor, despues_id))
+    if valor is None:
+        return and_(columna.is_(None), despues_id)
+    return or_(columna < valor, and_(columna == valor, despues_id), columna.is_(None))
+
+
+def _columna_orden(filtros: FiltrosEmergencias, motor: Optional[str], E=Emergencia):
+    if filtros.sort == ORDEN_RELEVANCIA:
+        relevancia = _relevancia(filtros.q, motor)
+        # Sin índice de texto no hay puntaje: se ordena por id
+        return E.id_emergencias if relevancia is None else relevancia
+    return getattr(E, COLUMNAS_ORDEN[filtros.sort].key)
+
+
+def _orden(columna, ascendente: bool, ident=Emergencia.id_emergencias, tabla=None) -> List[Any]:
+    columnas = [columna] if columna is ident else [columna, ident]
+    if tabla is not None:
+        columnas.append(tabla)
+    return [c.asc() if ascendente else c.desc() for c in columnas]
+
+
+def _union(filtros: FiltrosEmergencias, motor: Optional[str], tablas: List[Any], columnas_de):
+    """
+    UNION ALL de las tablas del listado con los filtros aplicados. Cada rama
+    trae columnas_de(E) (debe incluir el id con label "id"), el valor de orden
+    ("orden") y la posición de su tabla en `tablas` ("tabla").
+    """
+    por_relevancia = (filtros.sort == ORDEN_RELEVANCIA
+                      and _columna_orden(filtros, motor) is not Emergencia.id_emergencias)
+    ramas = []
+    for posicion, E in enumerate(tablas):
+        motor_e = _motor(E, motor)
+        orden = _columna_orden(filtros, motor_e, E)
+        if por_relevancia and motor_e is None:
+            # Sin índice de texto no hay puntaje (NULL: al final en orden desc)
+            orden = null()
+        ramas.append(
+            select(*columnas_de(E), orden.label("orden"), literal(posicion).label("tabla"))
+            .where(*condiciones(filtros, motor_e, E))
+        )
+    return union_all(*ramas).subquery()
+
+
+def _cargar(db: Session, tablas: List[Any], filas) -> List[Tuple[Any, Any, int]]:
+    """Filas (id, tabla, orden) del UNION a (emergencia, orden, tabla), en el mismo orden"""
+    objetos = {}
+    for posicion, E in enumerate(tablas):
+        ids = [fila.id for fila in filas if fila.tabla == posicion]
+        if ids:
+            for emergencia in db.scalars(select(E).where(E.id_emergencias.in_(ids))):
+                objetos[posicion, emergencia.id_emergencias] = emergencia
+    return [(objetos[fila.tabla, fila.id], fila.orden, fila.tabla) for fila in filas]
+
+
+@dataclass
+class PaginaEmergencias:
+    filas: List[Emergencia]
+    siguiente_cursor: Optional[str]
+    anterior_cursor: Optional[str]
+
+
+def pagina(db: Session, filtros: FiltrosEmergencias, limite: int = LIMITE_DEFAULT,
+           cursor: Optional[str] = None) -> PaginaEmergencias:
+    """
+    Una página del listado.
+
+    Sin cursor devuelve la primera página. Con el `siguiente_cursor` o el
+    `anterior_cursor` de una página devuelve la que sigue o la que precede.
+    Lanza ValueError si el cursor es inválido.
+    """
+    motor = motor_texto(db)
+    ascendente = filtros.dir == 'asc'
+    tablas = entidades(db, filtros)
+    if len(tablas) == 1:
+        columna = _columna_orden(filtros, motor)
+        ident = Emergencia.id_emergencias
+        columna_tabla = None
+        consulta = select(Emergencia, columna.label("orden")).where(*condiciones(filtros, motor))
+    else:
+        union = _union(filtros, motor, tablas, lambda E: [E.id_emergencias.label("id")])
+        # Una base que reutilizó ids puede tener el mismo id en ambas tablas:
+        # la tabla completa la clave del orden
+        columna, ident, columna_tabla = union.c.orden, union.c.id, union.c.tabla
+        consulta = select(union.c.id, union.c.tabla, union.c.orden)
+
+    sentido = 'sig'
+    if cursor:
+        sentido, valor, id_emergencia, tabla = decodificar_cursor(cursor, filtros)
+        # Hacia atrás se recorre el orden invertido y luego se dan vuelta las filas
+        consulta = consulta.where(_posteriores(
+            columna, ascendente == (sentido == 'sig'), valor, id_emergencia, ident,
+            None if columna_tabla is None else (columna_tabla, tabla),
+        ))
+
+    consulta = consulta.order_by(
+        *_orden(columna, ascendente == (sentido == 'sig'), ident, columna_tabla)).limit(limite + 1)
+    resultado = list(db.execute(consulta))
+    if len(tablas) > 1:
+        resultado = _cargar(db, tablas, resultado)
+    else:
+        resultado = [(emergencia, valor, None) for emergencia, valor in resultado]
+    hay_mas = len(resultado) > limite
+    resultado = resultado[:limite]
+
+    if sentido == 'sig':
+        hay_siguiente, hay_anterior = hay_mas, cursor is not None
+    else:
+        resultado.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+
+    def cursor_de(fila, sentido):
+        emergencia, valor, tabla = fila
+        return codificar_cursor(filtros, valor, emergencia.id_emergencias, sentido, tabla)
+
+    return PaginaEmergencias(
+        filas=[emergencia for emergencia, _, _ in resultado],
+        siguiente_cursor=cursor_de(resultado[-1], 'sig') if resultado and hay_siguiente else None,
+        anterior_cursor=cursor_de(resultado[0], 'ant') if resultado and hay_anterior else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Exportación
+# ---------------------------------------------------------------------------
+
+# Columnas exportadas (mismas claves que Emergencia.a_dict)
+COLUMNAS_EXPORTACION = [
+    ('id', Emergencia.id_emergencias),
+    ('nombre', Emergencia.Nombre_emergencia),
+    ('descripcion', Emergencia.descripcion),
+    ('tipo', Emergencia.tipo),
+    ('estado', Emergencia.estado),
+    ('fecha_reporte', Emergencia.fecha_reporte),
+    ('fecha_cierre', Emergencia.fecha_cierre),
+    ('lat', Emergencia.lat),
+    ('lon', Emergencia.lon),
+    ('direccion', Emergencia.direccion),
+    ('distrito', Emergencia.distrito),
+]
+COLUMNAS_CONTEOS = ['recursos', 'acciones']
+
+
+# Tablas de recursos y acciones de cada tabla de emergencias
+_HIJAS_CONTADAS = {
+    Emergencia: (Recurso, Accion),
+    EmergenciaArchivada: (RecursoArchivado, AccionArchivada),
+}
+
+
+def _contar_por_emergencia(modelo, pk, E=Emergencia):
+    return (
+        select(func.count(pk))
+        .where(modelo.emergencias_id_emergencias == E.id_emergencias)
+        .scalar_subquery()
+    )
+
+
+def _columnas_exportacion(E, con_conteos: bool) -> List[Any]:
+    columnas = [getattr(E, c.key).label(nombre) for nombre, c in COLUMNAS_EXPORTACION]
+    if con_conteos:
+        recursos, acciones = _HIJAS_CONTADAS[E]
+        columnas += [
+            _contar_por_emergencia(recursos, recursos.id_recursos, E).label('recursos'),
+            _contar_por_emergencia(acciones, acciones.id_acciones, E).label('acciones'),
+        ]
+    return columnas
+
+
+def exportar(db: Session, filtros: FiltrosEmergencias, con_conteos: bool = False,
+             lote: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Todas las emergencias que cumplen los filtros, en el orden del listado, como
+    dicts (claves de COLUMNAS_EXPORTACION y, con `con_conteos`, COLUMNAS_CONTEOS).
+
+    Las filas se leen con un cursor del lado del servidor de a `lote`
+    (stream_results + yield_per) y como columnas sueltas, sin objetos ORM: la
+    memoria no depende de la cantidad exportada. La sesión debe seguir abierta
+    mientras se consume el iterador.
+    """
+    motor = motor_texto(db)
+    ascendente = filtros.dir == 'asc'
+    tablas = entidades(db, filtros)
+    if len(tablas) == 1:
+        columnas = _columnas_exportacion(Emergencia, con_conteos)
+        consulta = (
+            select(*columnas)
+            .where(*condiciones(filtros, motor))
+            .order_by(*_orden(_columna_orden(filtros, motor), ascendente))
+        )
+    else:
+        union = _union(filtros, motor, tablas, lambda E: _columnas_exportacion(E, con_conteos))
+        columnas = [union.c[c.name] for c in _columnas_exportacion(Emergencia, con_conteos)]
+        consulta = select(*columnas).order_by(*_orden(union.c.orden, ascendente, union.c.id, union.c.tabla))
+    consulta = consulta.execution_options(stream_results=True, yield_per=lote)
+    nombres = [c.name for c in columnas]
+    fechas = [i for i, c in enumerate(columnas) if isinstance(c.type, TIMESTAMP)]
+    decimales = [i for i, c in enumerate(columnas) if isinstance(c.type, DECIMAL)]
+    # Core (sin la capa ORM de carga de filas): los valores se convierten por posición
+    for fila in db.connection().execute(consulta):
+        valores = list(fila)
+        for i in fechas:
+            if valores[i] is not None:
+                valores[i] = valores[i].isoformat(sep=' ', timespec='seconds')
+        for i in decimales:
+            if valores[i] is not None:
+                valores[i] = float(valores[i])
+        yield dict(zip(nombres, valores))
+
+
+# ---------------------------------------------------------------------------
+# Reporte
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ReporteEmergencia:
+    emergencia: Emergencia
+    total_bomberos: int
+    total_hidrantes: int
+
+
+def _contar_recursos(tipo: str, E=Emergencia, R=Recurso):
+    return (
+        select(func.count(R.id_recursos))
+        .where(R.emergencias_id_emergencias == E.id_emergencias,
+               R.tipo_recurso == tipo)
+        .scalar_subquery()
+    )
+
+
+def _ultimo_id(modelo, pk, emergencia_id: int):
+    return (
+        select(func.max(pk))
+        .where(modelo.emergencias_id_emergencias == emergencia_id)
+        .scalar_subquery()
+    )
+
+
+def marca_reporte(db: Session, emergencia_id: int) -> Optional[Tuple[Any, ...]]:
+    """
+    Lo que cambia el reporte de una emergencia, para su ETag: estado, fecha de
+    cierre y el id del último recurso, despliegue y acción registrados (un
+    despliegue agrega filas nuevas). None si la emergencia no existe.
+
+    Una consulta por clave primaria y por los índices de las claves foráneas;
+    las emergencias archivadas ya no cambian.
+    """
+    E = Emergencia
+    fila = db.execute(
+        select(
+            E.estado, E.fecha_cierre,
+            _ultimo_id(Recurso, Recurso.id_recursos, emergencia_id),
+            _ultimo_id(RecursoDesplazado, RecursoDesplazado.id_recursos_desplazado, emergencia_id),
+            _ultimo_id(Accion, Accion.id_acciones, emergencia_id),
+        ).where(E.id_emergencias == emergencia_id)
+    ).first()
+    if fila is not None:
+        return tuple(fila)
+    if archivo_repo.disponible(db) and db.get(EmergenciaArchivada, emergencia_id) is not None:
+        return ("archivo",)
+    return None
+
+
+def reporte(db: Session, emergencia_id: int) -> Optional[ReporteEmergencia]:
+    """
+    Emergencia con todo lo que muestra su reporte, o None si no existe.
+
+    Una consulta trae la emergencia y los totales por tipo de recurso; las
+    colecciones (recursos_bomberos, recursos_hidrantes, recursos_desplazados y
+    acciones_recientes) se cargan con selectinload, una consulta por colección.
+    Si no está en las tablas activas se busca en el archivo.
+    """
+    tablas = [(Emergencia, Recurso)]
+    if archivo_repo.disponible(db):
+        tablas.append((EmergenciaArchivada, RecursoArchivado))
+    for E, R in tablas:
+        fila = db.execute(
+            select(E, _contar_recursos('bombero', E, R), _contar_recursos('hidrante', E, R))
+            .where(E.id_emergencias == emergencia_id)
+            .options(
+                selectinload(E.recursos_bomberos),
+                selectinload(E.recursos_hidrantes),
+                selectinload(E.recursos_desplazados),
+                selectinload(E.acciones_recientes),
+            )
+        ).first()
+        if fila is not None:
+            emergencia, total_bomberos, total_hidrantes = fila
+            return ReporteEmergencia(emergencia, total_bomberos, total_hidrantes)
+    return None
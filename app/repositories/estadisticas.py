@@ -0,0 +1,155 @@
+# app/repositories/estadisticas.py
+"""Conteos agregados de emergencias (tabla estadisticas_emergencias).
+
+Cada fila cuenta las emergencias de un día de reporte con un mismo estado,
+distrito y tipo. Las vistas que crean una emergencia o cambian esos datos
+llaman a registrar_alta / registrar_cambio antes del commit, así el conteo se
+actualiza en la misma transacción. reconstruir() lo recalcula desde cero.
+Las emergencias archivadas (app/repositories/archivo.py) siguen contando.
+
+GET /api/estadisticas responde solo desde esta tabla: su tamaño depende de
+los días y combinaciones distintas, no de la cantidad de emergencias.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, union_all, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import Emergencia, EmergenciaArchivada, EstadisticaEmergencias
+from app.repositories import archivo as archivo_repo
+
+T = EstadisticaEmergencias
+
+# (dia, estado, distrito, tipo)
+Clave = Tuple[str, str, str, str]
+
+
+def _clave(fecha_reporte, estado, distrito, tipo) -> Clave:
+    dia = fecha_reporte.date().isoformat() if fecha_reporte else ''
+    return (dia, estado or '', distrito or '', tipo or '')
+
+
+def clave(emergencia: Emergencia) -> Clave:
+    """Fila de estadisticas_emergencias en que cuenta la emergencia"""
+    return _clave(emergencia.fecha_reporte, emergencia.estado, emergencia.distrito, emergencia.tipo)
+
+
+def ajustar(db: Session, cambios: Iterable[Tuple[Clave, int]]) -> None:
+    """Suma cada delta al conteo de su clave (upsert, sin commit)"""
+    deltas: Dict[Clave, int] = defaultdict(int)
+    for c, delta in cambios:
+        deltas[c] += delta
+    filas = [
+        {"dia": c[0], "estado": c[1], "distrito": c[2], "tipo": c[3], "total": delta}
+        for c, delta in deltas.items() if delta
+    ]
+    if not filas:
+        return
+
+    # Un upsert con lista de parámetros (executemany): la sentencia se compila una
+    # vez aunque sean muchas claves, como en una importación masiva
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        consulta = sqlite_insert(T)
+        db.execute(consulta.on_conflict_do_update(
+            index_elements=["dia", "estado", "distrito", "tipo"],
+            set_={"total": T.total + consulta.excluded.total},
+        ), filas)
+    elif dialecto == "mysql":
+        consulta = mysql_insert(T)
+        db.execute(consulta.on_duplicate_key_update(total=T.total + consulta.inserted.total), filas)
+    else:
+        for fila in filas:
+            condicion = [T.dia == fila["dia"], T.estado == fila["estado"],
+                         T.distrito == fila["distrito"], T.tipo == fila["tipo"]]
+            if db.execute(update(T).where(*condicion).values(total=T.total + fila["total"])).rowcount == 0:
+                db.execute(insert(T).values(**fila))
+
+
+def registrar_alta(db: Session, emergencia: Emergencia) -> None:
+    ajustar(db, [(clave(emergencia), 1)])
+
+
+def registrar_altas(db: Session, filas: Iterable[Dict[str, Any]]) -> None:
+    """Altas insertadas como dicts de columnas (importación masiva)"""
+    ajustar(db, [
+        (_clave(f.get("fecha_reporte"), f.get("estado"), f.get("distrito"), f.get("tipo")), 1)
+        for f in filas
+    ])
+
+
+def registrar_cambio(db: Session, antes: Clave, emergencia: Emergencia) -> None:
+    """La emergencia pasó de la clave `antes` a su clave actual"""
+    despues = clave(emergencia)
+    if despues != antes:
+        ajustar(db, [(antes, -1), (despues, 1)])
+
+
+def reconstruir(db: Session) -> int:
+    """Recalcula toda la tabla desde emergencias y el archivo (sin commit);
+    devuelve las filas escritas"""
+    tablas = [Emergencia]
+    if archivo_repo.disponible(db):
+        tablas.append(EmergenciaArchivada)
+    origen = union_all(*(
+        select(E.fecha_reporte, E.estado, E.distrito, E.tipo) for E in tablas
+    )).subquery()
+    columnas = (
+        func.coalesce(func.date(origen.c.fecha_reporte), ''),
+        func.coalesce(origen.c.estado, ''),
+        func.coalesce(origen.c.distrito, ''),
+        func.coalesce(origen.c.tipo, ''),
+    )
+    agregado = select(*columnas, func.count()).group_by(*columnas)
+    db.execute(delete(T))
+    resultado = db.execute(
+        insert(T).from_select(["dia", "estado", "distrito", "tipo", "total"], agregado)
+    )
+    return resultado.rowcount
+
+
+def resumen(db: Session, estado: str = '', distrito: str = '', tipo: str = '',
+            desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+    """Total y conteos por estado, distrito y tipo para los filtros dados
+    (desde/hasta: días de reporte, ambos incluidos)"""
+    condiciones = []
+    if estado:
+        condiciones.append(T.estado == estado)
+    if distrito:
+        condiciones.append(T.distrito == distrito)
+    if tipo:
+        condiciones.append(T.tipo == tipo)
+    if desde is not None:
+        condiciones.append(T.dia >= desde.isoformat())
+    if hasta is not None:
+        # '' (sin fecha) queda fuera de cualquier rango
+        condiciones += [T.dia != '', T.dia <= hasta.isoformat()]
+
+    por_estado: Dict[str, int] = defaultdict(int)
+    por_distrito: Dict[str, int] = defaultdict(int)
+    por_tipo: Dict[str, int] = defaultdict(int)
+    total = 0
+    consulta = (
+        select(T.estado, T.distrito, T.tipo, func.sum(T.total))
+        .where(*condiciones)
+        .group_by(T.estado, T.distrito, T.tipo)
+    )
+    for fila_estado, fila_distrito, fila_tipo, cantidad in db.execute(consulta):
+        cantidad = int(cantidad or 0)
+        if not cantidad:
+            continue
+        por_estado[fila_estado] += cantidad
+        por_distrito[fila_distrito] += cantidad
+        por_tipo[fila_tipo] += cantidad
+        total += cantidad
+
+    return {
+        "total": total,
+        "por_estado": dict(por_estado),
+        "por_distrito": dict(por_distrito),
+        "por_tipo": dict(por_tipo),
+    }
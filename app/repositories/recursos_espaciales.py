@@ -0,0 +1,172 @@
+# app/repositories/recursos_espaciales.py
+"""Consultas por radio y de vecinos más cercanos sobre las tablas de recursos.
+
+La búsqueda se resuelve dentro de la base de datos usando su índice espacial:
+    - SQLite: tabla virtual R*Tree `<tabla>_rtree` + función `haversine_km`
+      (registrada en app/repositories/db.py)
+    - MySQL: columna `ubicacion` (POINT SRID 4326) con índice SPATIAL,
+      MBRContains para la caja y ST_Distance_Sphere para la distancia
+    - Otros motores: caja sobre el índice (lat, lng) y distancia en Python
+
+Los resultados se ordenan por distancia redondeada a 2 decimales y, a igual
+distancia, por id. El catálogo en memoria desempata por posición en el JSON:
+los empates solo salen en el mismo orden si el JSON está ordenado por id.
+"""
+from typing import Any, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from app.models.models import CompaniaBomberos, Hidrante
+from app.services.distancias import RADIO_TIERRA_KM, haversine_km
+from app.services.indice_espacial import caja_envolvente
+
+MODELOS = {"bomberos": CompaniaBomberos, "hidrantes": Hidrante}
+
+
+def _clave_primaria(modelo):
+    return modelo.__mapper__.primary_key[0]
+
+
+def id_recurso(fila) -> Any:
+    """Id del catálogo de una fila de Hidrante o CompaniaBomberos"""
+    return getattr(fila, _clave_primaria(type(fila)).key)
+
+
+def _filtro_caja_rtree(modelo, caja):
+    rtree = table(
+        f"{modelo.__tablename__}_rtree",
+        column("id"), column("min_lat"), column("max_lat"), column("min_lng"), column("max_lng"),
+    )
+    lat_min, lat_max, lng_min, lng_max = caja
+    condicion = and_(
+        rtree.c.min_lat <= lat_max, rtree.c.max_lat >= lat_min,
+        rtree.c.min_lng <= lng_max, rtree.c.max_lng >= lng_min,
+    )
+    return rtree, condicion
+
+
+def _consulta_sqlite(modelo, lat: float, lon: float, radio_km: float):
+    pk = _clave_primaria(modelo)
+    distancia = func.haversine_km(lat, lon, modelo.lat, modelo.lng)
+    consulta = select(modelo, distancia.label("distancia_km")).where(distancia <= radio_km)
+    caja = caja_envolvente(lat, lon, radio_km)
+    if caja is not None:
+        rtree, condicion = _filtro_caja_rtree(modelo, caja)
+        consulta = consulta.join(rtree, rtree.c.id == pk).where(condicion)
+    return consulta, distancia
+
+
+def _consulta_mysql(modelo, lat: float, lon: float, radio_km: float):
+    ubicacion = literal_column(f"{modelo.__tablename__}.ubicacion")
+    origen = func.ST_SRID(func.POINT(lat, lon), 4326)
+    distancia = func.ST_Distance_Sphere(ubicacion, origen, RADIO_TIERRA_KM * 1000) / 1000
+    consulta = select(modelo, distancia.label("distancia_km")).where(distancia <= radio_km)
+    caja = caja_envolvente(lat, lon, radio_km)
+    if caja is not None:
+        # Con SRID 4326 MySQL interpreta los ejes como (lat, lng)
+        lat_min, lat_max, lng_min, lng_max = caja
+        poligono = (
+            f"POLYGON(({lat_min} {lng_min}, {lat_max} {lng_min}, {lat_max} {lng_max}, "
+            f"{lat_min} {lng_max}, {lat_min} {lng_min}))"
+        )
+        consulta = consulta.where(func.MBRContains(func.ST_GeomFromText(poligono, 4326), ubicacion))
+    return consulta, distancia
+
+
+def _filas_generico(db: Session, modelo, lat: float, lon: float, radio_km: float) -> List[Tuple[float, int, Any]]:
+    consulta = select(modelo)
+    caja = caja_envolvente(lat, lon, radio_km)
+    if caja is not None:
+        lat_min, lat_max, lng_min, lng_max = caja
+        consulta = consulta.where(modelo.lat.between(lat_min, lat_max), modelo.lng.between(lng_min, lng_max))
+
+    pk = _clave_primaria(modelo).key
+    encontrados = []
+    for fila in db.scalars(consulta):
+        distancia = haversine_km(lat, lon, fila.lat, fila.lng)
+        if distancia <= radio_km:
+            encontrados.append((round(distancia, 2), getattr(fila, pk), fila))
+    encontrados.sort(key=lambda e: (e[0], e[1]))
+    return encontrados
+
+
+def _consulta_ordenada(db: Session, modelo, lat: float, lon: float, radio_km: float,
+                       despues: Optional[Tuple[float, int]]):
+    """(consulta sin cursor, consulta ordenada desde el cursor); None si el motor no tiene índice espacial"""
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        consulta, distancia = _consulta_sqlite(modelo, lat, lon, radio_km)
+    elif dialecto == "mysql":
+        consulta, distancia = _consulta_mysql(modelo, lat, lon, radio_km)
+    else:
+        return None
+
+    pk = _clave_primaria(modelo)
+    redondeada = func.round(distancia, 2)
+    ordenada = consulta
+    if despues is not None:
+        d, id_recurso = despues
+        ordenada = ordenada.where(or_(redondeada > d, and_(redondeada == d, pk > id_recurso)))
+    return consulta, ordenada.order_by(redondeada, pk)
+
+
+def buscar_en_radio(db: Session, modelo, lat: float, lon: float, radio_km: float,
+                    limite: Optional[int] = None,
+                    despues: Optional[Tuple[float, int]] = None) -> Tuple[int, List[Tuple[float, Any]]]:
+    """
+    Recursos de `modelo` (Hidrante o CompaniaBomberos) dentro del radio.
+
+    Args:
+        despues: (distancia_km, id) del último recurso ya entregado; se devuelven
+            solo los siguientes (paginación por cursor)
+
+    Returns:
+        (total de coincidencias, [(distancia_km redondeada, fila)]) con a lo sumo
+        `limite` filas, de la más cercana a la más lejana
+    """
+    consultas = _consulta_ordenada(db, modelo, lat, lon, radio_km, despues)
+    if consultas is None:
+        encontrados = _filas_generico(db, modelo, lat, lon, radio_km)
+        total = len(encontrados)
+        if despues is not None:
+            encontrados = [e for e in encontrados if (e[0], e[1]) > despues]
+        if limite is not None:
+            encontrados = encontrados[:limite]
+        return total, [(d, fila) for d, _, fila in encontrados]
+
+    consulta, ordenada = consultas
+    if limite is not None:
+        ordenada = ordenada.limit(limite)
+    filas = [(round(d, 2), fila) for fila, d in db.execute(ordenada)]
+
+    if despues is None and (limite is None or len(filas) < limite):
+        total = len(filas)
+    else:
+        total = db.scalar(select(func.count()).select_from(consulta.subquery()))
+    return total, filas
+
+
+def iterar_en_radio(db: Session, modelo, lat: float, lon: float, radio_km: float,
+                    despues: Optional[Tuple[float, int]] = None,
+                    lote: int = 200) -> Tuple[int, Iterator[Tuple[float, Any]]]:
+    """Total dentro del radio y un iterador (distancia_km, fila) del más cercano al más lejano.
+
+    Las filas se leen de a `lote` (yield_per), sin cargar todo el resultado.
+    La sesión debe seguir abierta mientras se consume el iterador.
+    """
+    consultas = _consulta_ordenada(db, modelo, lat, lon, radio_km, despues)
+    if consultas is None:
+        total, filas = buscar_en_radio(db, modelo, lat, lon, radio_km, despues=despues)
+        return total, iter(filas)
+
+    consulta, ordenada = consultas
+    total = db.scalar(select(func.count()).select_from(consulta.subquery()))
+    resultado = db.execute(ordenada.execution_options(yield_per=lote))
+    return total, ((round(d, 2), fila) for fila, d in resultado)
+
+
+def k_mas_cercanos(db: Session, tipo: str, lat: float, lon: float, k: int, radio_km: float,
+                   despues: Optional[Tuple[float, int]] = None) -> Tuple[int, List[Tuple[float, Any]]]:
+    """Los k recursos de `tipo` ('bomberos' o 'hidrantes') más cercanos dentro del radio"""
+    return buscar_en_radio(db, MODELOS[tipo], lat, lon, radio_km, limite=k, despues=despues)
@@ -0,0 +1,59 @@
+# app/repositories/versiones.py
+"""Versiones de los datos (tabla versiones_datos) para las respuestas condicionales.
+
+Cada escritura sobre un conjunto de datos llama a incrementar() antes del
+commit, en la misma transacción:
+
+    - 'emergencias': alta (POST /api/emergencias e importación masiva),
+      despliegue de recursos y archivado
+    - 'recursos': importación del catálogo a la BD (scripts/importar_recursos_bd.py)
+
+leer() es una consulta por clave primaria. Como la versión está en la base,
+todos los procesos ven la misma. Si la tabla todavía no existe, leer()
+devuelve None (las respuestas salen sin ETag) e incrementar() no hace nada.
+"""
+from typing import Dict, Optional
+
+from sqlalchemy import inspect, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.models import VersionDatos
+
+V = VersionDatos
+
+EMERGENCIAS = "emergencias"
+RECURSOS = "recursos"
+
+_disponible: Dict[str, bool] = {}
+
+
+def disponible(db: Session) -> bool:
+    """True si la base ya tiene la tabla versiones_datos (solo se recuerda el resultado positivo)"""
+    clave = str(db.get_bind().url)
+    if not _disponible.get(clave):
+        _disponible[clave] = inspect(db.connection()).has_table(V.__tablename__)
+    return _disponible[clave]
+
+
+def leer(db: Session, nombre: str) -> Optional[int]:
+    """Versión vigente de `nombre` (0 si nunca cambió), o None sin la tabla"""
+    if not disponible(db):
+        return None
+    return db.scalar(select(V.version).where(V.nombre == nombre)) or 0
+
+
+def incrementar(db: Session, nombre: str) -> None:
+    """Suma 1 a la versión de `nombre` (upsert, sin commit)"""
+    if not disponible(db):
+        return
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "sqlite":
+        consulta = sqlite_insert(V).values(nombre=nombre, version=1)
+        db.execute(consulta.on_conflict_do_update(index_elements=["nombre"], set_={"version": V.version + 1}))
+    elif dialecto == "mysql":
+        consulta = mysql_insert(V).values(nombre=nombre, version=1)
+        db.execute(consulta.on_duplicate_key_update(version=V.version + 1))
+    elif db.execute(update(V).where(V.nombre == nombre).values(version=V.version + 1)).rowcount == 0:
+        db.execute(insert(V).values(nombre=nombre, version=1))
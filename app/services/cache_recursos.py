@@ -0,0 +1,152 @@
+# app/services/cache_recursos.py
+"""Caché en proceso (LRU + TTL) de los recursos cercanos ya calculados.
+
+Las entradas se agrupan por versión de los datos (versión del catálogo o, con
+RECURSOS_FUENTE=bd, la de versiones_datos): al cambiar la versión se descarta
+todo lo anterior. Si varios requests piden la misma clave a la vez, solo el
+primero calcula y el resto espera su resultado.
+
+Los valores guardados se comparten entre requests: no deben modificarse.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+CACHE_TAMANO = int(os.getenv("RECURSOS_CACHE_TAMANO", "512"))
+CACHE_TTL_S = float(os.getenv("RECURSOS_CACHE_TTL_S", "300"))
+
+
+class CacheLRU:
+    """LRU acotado por cantidad de entradas, con vencimiento por TTL"""
+
+    def __init__(self, capacidad: int = CACHE_TAMANO, ttl_s: float = CACHE_TTL_S):
+        self.capacidad = capacidad
+        self.ttl_s = ttl_s
+        self._datos: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._en_curso: Dict[Hashable, threading.Event] = {}
+        self._version: Optional[Hashable] = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas = 0
+        self.desalojos = 0
+        self.expiraciones = 0
+        self.invalidaciones = 0
+
+    def _cambiar_version(self, version: Hashable) -> None:
+        # Llamar con el lock tomado
+        if self._datos:
+            self.invalidaciones += len(self._datos)
+        self._datos.clear()
+        self._version = version
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any], version: Optional[Hashable] = None) -> Any:
+        """Valor en caché para `clave`, o el resultado de `calcular()` (que queda guardado)."""
+        if self.capacidad <= 0:
+            return calcular()
+
+        while True:
+            with self._lock:
+                if version != self._version:
+                    self._cambiar_version(version)
+
+                entrada = self._datos.get(clave)
+                if entrada is not None:
+                    vence, valor = entrada
+                    if vence > time.monotonic():
+                        self._datos.move_to_end(clave)
+                        self.aciertos += 1
+                        return valor
+                    del self._datos[clave]
+                    self.expiraciones += 1
+
+                pendiente = self._en_curso.get(clave)
+                if pendiente is None:
+                    pendiente = self._en_curso[clave] = threading.Event()
+                    self.fallos += 1
+                    break
+                self.esperas += 1
+
+            # Otro request está calculando la misma clave: se espera y se vuelve a
+            # buscar (si su cálculo falló, este request lo intenta por su cuenta)
+            pendiente.wait()
+
+        try:
+            valor = calcular()
+        except BaseException:
+            with self._lock:
+                del self._en_curso[clave]
+            pendiente.set()
+            raise
+
+        with self._lock:
+            del self._en_curso[clave]
+            # Si la versión cambió mientras se calculaba, el valor ya no se guarda
+            if version == self._version:
+                self._datos[clave] = (time.monotonic() + self.ttl_s, valor)
+                self._datos.move_to_end(clave)
+                while len(self._datos) > self.capacidad:
+                    self._datos.popitem(last=False)
+                    self.desalojos += 1
+        pendiente.set()
+        return valor
+
+    def buscar(self, clave: Hashable) -> Optional[Any]:
+        """Valor vigente para `clave`, o None (sin calcular nada)"""
+        if self.capacidad <= 0:
+            return None
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                vence, valor = entrada
+                if vence > time.monotonic():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+                self.expiraciones += 1
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave: Hashable, valor: Any) -> None:
+        """Guarda `valor` para `clave` con la versión vigente"""
+        if self.capacidad <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl_s, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def descartar(self, clave: Hashable) -> None:
+        with self._lock:
+            if self._datos.pop(clave, None) is not None:
+                self.invalidaciones += 1
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._cambiar_version(self._version)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "capacidad": self.capacidad,
+                "ttl_s": self.ttl_s,
+                "version": self._version,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "esperas": self.esperas,
+                "desalojos": self.desalojos,
+                "expiraciones": self.expiraciones,
+                "invalidaciones": self.invalidaciones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+
+# Instancia compartida por los endpoints de /api/recursos
+cache_recursos = CacheLRU()
@@ -0,0 +1,17 @@
+# app/services/cache_reportes.py
+"""Caché en proceso del reporte ya renderizado de las emergencias cerradas.
+
+La página de /emergencias/<id> de una emergencia cerrada (ESTADOS_CIERRE) se
+guarda como HTML (no depende del usuario) y se sirve sin volver a armar el
+reporte. La clave es (id, marca_reporte): un despliegue posterior sobre la
+emergencia cerrada cambia la marca en todos los procesos, así que ninguno
+sirve el reporte anterior. REPORTES_CACHE_TAMANO=0 desactiva la caché.
+"""
+import os
+
+from app.services.cache_recursos import CacheLRU
+
+REPORTES_CACHE_TAMANO = int(os.getenv("REPORTES_CACHE_TAMANO", "256"))
+REPORTES_CACHE_TTL_S = float(os.getenv("REPORTES_CACHE_TTL_S", "3600"))
+
+cache_reportes = CacheLRU(capacidad=REPORTES_CACHE_TAMANO, ttl_s=REPORTES_CACHE_TTL_S)
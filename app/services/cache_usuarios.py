@@ -0,0 +1,59 @@
+# app/services/cache_usuarios.py
+"""Caché en proceso del usuario de la sesión (con sus roles), por id de usuario.
+
+load_current_user lo consulta en cada request; sin caché era la consulta más
+ejecutada de la base. Las entradas vencen a los pocos segundos (TTL corto) y
+se descartan todas cuando cambia la versión, que suben las vistas de
+administración al editar, desactivar o activar un usuario.
+
+La versión es por proceso: con varios workers, los demás ven el cambio recién
+al vencer el TTL.
+
+Los usuarios guardados están desacoplados de la sesión de SQLAlchemy y se
+comparten entre requests: solo se leen, no deben modificarse.
+"""
+import os
+import threading
+from typing import Optional
+
+from sqlalchemy.orm import joinedload
+
+from app.models.models import UsuarioMunicipal
+from app.repositories.db import get_session
+from app.services.cache_recursos import CacheLRU
+
+USUARIOS_CACHE_TAMANO = int(os.getenv("USUARIOS_CACHE_TAMANO", "1024"))
+USUARIOS_CACHE_TTL_S = float(os.getenv("USUARIOS_CACHE_TTL_S", "30"))
+
+cache_usuarios = CacheLRU(capacidad=USUARIOS_CACHE_TAMANO, ttl_s=USUARIOS_CACHE_TTL_S)
+
+_version = 0
+_lock_version = threading.Lock()
+
+
+def invalidar_usuarios() -> None:
+    """Descarta los usuarios en caché (llamar tras modificar usuarios o roles)"""
+    global _version
+    with _lock_version:
+        _version += 1
+
+
+def _cargar_usuario(uid: int) -> Optional[UsuarioMunicipal]:
+    db = get_session()
+    usuario = db.query(UsuarioMunicipal).options(
+        joinedload(UsuarioMunicipal.roles)
+    ).filter_by(usuario_municipal_id=uid).first()
+    if usuario is not None:
+        # La máscara de permisos queda calculada junto con el usuario en caché
+        usuario.permisos_mask
+        # Se desacopla de la sesión del request: un commit posterior no lo expira
+        # y otros requests pueden leerlo sin tocar esa sesión
+        for rol in usuario.roles:
+            db.expunge(rol)
+        db.expunge(usuario)
+    return usuario
+
+
+def obtener_usuario(uid: int) -> Optional[UsuarioMunicipal]:
+    """Usuario con sus roles (desde la caché si está vigente), o None si no existe"""
+    return cache_usuarios.obtener(uid, lambda: _cargar_usuario(uid), version=_version)
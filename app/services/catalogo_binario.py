@@ -0,0 +1,238 @@
+# app/services/catalogo_binario.py
+"""Formato binario columnar para el catálogo de recursos.
+
+El archivo se genera con scripts/construir_catalogo_binario.py a partir de los
+JSON (que siguen siendo la fuente de verdad) y se abre con mmap: las columnas se
+leen sin copiar y todos los procesos comparten la misma copia en el page cache.
+
+Estructura:
+    b"SISGEMC1" | uint32 largo del encabezado | encabezado JSON (utf-8) | secciones
+
+Cada sección empieza alineada a 8 bytes. Tipos de columna:
+    - "i8": enteros int64
+    - "f8": reales float64 (NaN si falta el valor)
+    - "dict": códigos uint8/uint16 sobre la lista de valores del encabezado
+    - "str": offsets uint32 (filas + 1) sobre un heap de texto utf-8
+Toda columna puede tener una máscara de nulos (uint8, 1 = nulo).
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+MAGIC = b"SISGEMC1"
+FORMATO = 1
+ARCHIVO_BINARIO = "catalogo.bin"
+
+# tabla -> [(campo del registro, clave en el JSON, tipo)]
+COLUMNAS: Dict[str, List[Tuple[str, str, str]]] = {
+    "bomberos": [
+        ("id", "idCompaniaBomberos", "i8"),
+        ("lat", "lat", "f8"),
+        ("lng", "lng", "f8"),
+        ("bomberos_disponibles", "bomberos_disponibles", "i8"),
+        ("vehiculos_disponibles", "vehiculos_disponibles", "i8"),
+        ("nombre", "nombre", "str"),
+        ("nombre_responsable", "nombre_responsable", "str"),
+        ("cargo_responsable", "cargo_responsable", "str"),
+    ],
+    "hidrantes": [
+        ("id", "ID", "i8"),
+        ("lat", "lat", "f8"),
+        ("lng", "lng", "f8"),
+        ("estado", "estado", "dict"),
+        ("nombre", "nombre", "str"),
+        ("nis", "NIS", "str"),
+    ],
+}
+
+_CODIGO_ARRAY = {"i8": "q", "f8": "d"}
+_DTYPE_NUMPY = {"i8": "<i8", "f8": "<f8"}
+
+
+class CatalogoBinarioError(Exception):
+    """El archivo binario no existe, está corrupto o no corresponde a los JSON"""
+
+
+# ---------------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------------
+
+def _columna_bytes(tipo: str, valores: Sequence[Any]) -> Tuple[Dict[str, Any], List[bytes]]:
+    """Serializa una columna; devuelve su descripción (sin offsets) y sus secciones."""
+    nulos = [v is None for v in valores]
+    secciones: List[bytes] = []
+    desc: Dict[str, Any] = {"tipo": tipo}
+
+    if tipo in ("i8", "f8"):
+        relleno = 0 if tipo == "i8" else float("nan")
+        secciones.append(array(_CODIGO_ARRAY[tipo], [relleno if v is None else v for v in valores]).tobytes())
+    elif tipo == "dict":
+        distintos = sorted({v for v in valores if v is not None})
+        codigo = {v: i for i, v in enumerate(distintos)}
+        ancho = "B" if len(distintos) <= 0xFF else "H"
+        desc["valores"] = distintos
+        desc["ancho"] = ancho
+        secciones.append(array(ancho, [0 if v is None else codigo[v] for v in valores]).tobytes())
+    elif tipo == "str":
+        offsets = array("I", [0])
+        heap = bytearray()
+        for v in valores:
+            if v is not None:
+                heap += str(v).encode("utf-8")
+            offsets.append(len(heap))
+        secciones.append(offsets.tobytes())
+        secciones.append(bytes(heap))
+    else:
+        raise ValueError(f"Tipo de columna desconocido: {tipo}")
+
+    if any(nulos):
+        secciones.append(array("B", nulos).tobytes())
+        desc["con_nulos"] = True
+    return desc, secciones
+
+
+def construir(datos: Dict[str, List[Dict[str, Any]]], fuentes: Dict[str, str]) -> bytes:
+    """Construye el archivo binario a partir de los registros JSON de cada tabla.
+
+    `fuentes` mapea nombre de archivo JSON -> sha256 de su contenido; el lector lo
+    usa para detectar si el binario quedó desactualizado.
+    """
+    encabezado: Dict[str, Any] = {
+        "formato": FORMATO,
+        "orden_bytes": sys.byteorder,
+        "fuentes": fuentes,
+        "tablas": {},
+    }
+    cuerpo: List[Tuple[Dict[str, Any], str, bytes]] = []
+
+    for tabla, columnas in COLUMNAS.items():
+        filas = datos.get(tabla, [])
+        desc_tabla = {"filas": len(filas), "columnas": {}}
+        for campo, clave, tipo in columnas:
+            desc, secciones = _columna_bytes(tipo, [f.get(clave) for f in filas])
+            desc_tabla["columnas"][campo] = desc
+            nombres = ["datos"] if tipo != "str" else ["offsets", "heap"]
+            if desc.get("con_nulos"):
+                nombres.append("nulos")
+            for nombre, contenido in zip(nombres, secciones):
+                cuerpo.append((desc, nombre, contenido))
+        encabezado["tablas"][tabla] = desc_tabla
+
+    # Los offsets dependen del largo del encabezado, que a su vez los contiene:
+    # se reserva espacio fijo calculando dos veces
+    largo_reservado = 0
+    for _ in range(2):
+        posicion = _alinear(len(MAGIC) + 4 + largo_reservado)
+        for desc, nombre, contenido in cuerpo:
+            desc[nombre] = [posicion, len(contenido)]
+            posicion = _alinear(posicion + len(contenido))
+        texto = json.dumps(encabezado, ensure_ascii=False).encode("utf-8")
+        if len(texto) <= largo_reservado:
+            break
+        largo_reservado = len(texto) + 256
+
+    salida = bytearray(MAGIC)
+    salida += struct.pack("<I", largo_reservado)
+    salida += texto.ljust(largo_reservado, b" ")
+    for desc, nombre, contenido in cuerpo:
+        salida += b"\0" * (desc[nombre][0] - len(salida))
+        salida += contenido
+    return bytes(salida)
+
+
+def _alinear(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+class ArchivoColumnar:
+    """Archivo binario abierto con mmap; las columnas se exponen sin copiar"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # archivo vacío
+                raise CatalogoBinarioError(f"{ruta}: {e}")
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise CatalogoBinarioError(f"{ruta}: no es un catálogo binario")
+        (largo,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        inicio = len(MAGIC) + 4
+        try:
+            self.encabezado = json.loads(bytes(self._mm[inicio:inicio + largo]).decode("utf-8"))
+        except ValueError as e:
+            raise CatalogoBinarioError(f"{ruta}: encabezado inválido ({e})")
+        if self.encabezado.get("formato") != FORMATO:
+            raise CatalogoBinarioError(f"{ruta}: formato {self.encabezado.get('formato')} no soportado")
+        if self.encabezado.get("orden_bytes") != sys.byteorder:
+            raise CatalogoBinarioError(f"{ruta}: generado en una arquitectura con otro orden de bytes")
+        self._vista = memoryview(self._mm)
+
+    @property
+    def fuentes(self) -> Dict[str, str]:
+        return self.encabezado.get("fuentes", {})
+
+    def filas(self, tabla: str) -> int:
+        return self.encabezado["tablas"][tabla]["filas"]
+
+    def _desc(self, tabla: str, campo: str) -> Dict[str, Any]:
+        return self.encabezado["tablas"][tabla]["columnas"][campo]
+
+    def _seccion(self, desc: Dict[str, Any], nombre: str) -> memoryview:
+        offset, largo = desc[nombre]
+        return self._vista[offset:offset + largo]
+
+    def numerica(self, tabla: str, campo: str):
+        """Columna i8/f8 sin copia: arreglo NumPy de solo lectura o memoryview"""
+        desc = self._desc(tabla, campo)
+        offset, largo = desc["datos"]
+        if np is not None:
+            return np.frombuffer(self._mm, dtype=_DTYPE_NUMPY[desc["tipo"]], count=largo // 8, offset=offset)
+        return self._seccion(desc, "datos").cast(_CODIGO_ARRAY[desc["tipo"]])
+
+    def lector(self, tabla: str, campo: str):
+        """Función pos -> valor para una columna (None si es nulo)"""
+        desc = self._desc(tabla, campo)
+        tipo = desc["tipo"]
+        nulos = self._seccion(desc, "nulos") if desc.get("con_nulos") else None
+
+        if tipo in ("i8", "f8"):
+            datos = self._seccion(desc, "datos").cast(_CODIGO_ARRAY[tipo])
+            leer = datos.__getitem__
+        elif tipo == "dict":
+            codigos = self._seccion(desc, "datos").cast(desc["ancho"])
+            valores = desc["valores"]
+            leer = lambda pos: valores[codigos[pos]]
+        else:
+            offsets = self._seccion(desc, "offsets").cast("I")
+            heap = self._seccion(desc, "heap")
+            leer = lambda pos: str(heap[offsets[pos]:offsets[pos + 1]], "utf-8")
+
+        if nulos is None:
+            return leer
+        return lambda pos: None if nulos[pos] else leer(pos)
+
+
+def abrir(ruta: str, fuentes_esperadas: Optional[Dict[str, str]] = None) -> ArchivoColumnar:
+    """Abre el binario y verifica que corresponda a los JSON indicados (por sha256)."""
+    if not os.path.exists(ruta):
+        raise CatalogoBinarioError(f"{ruta}: no existe")
+    archivo = ArchivoColumnar(ruta)
+    if fuentes_esperadas is not None:
+        for nombre, sha in fuentes_esperadas.items():
+            if archivo.fuentes.get(nombre) != sha:
+                raise CatalogoBinarioError(f"{ruta}: desactualizado respecto a {nombre}")
+    return archivo
@@ -0,0 +1,487 @@
+# app/services/catalogo_recursos.py
+"""Catálogo residente de recursos (compañías de bomberos e hidrantes).
+
+Los archivos de app/JSON se leen una sola vez por proceso y se mantienen en
+memoria como registros inmutables. Cada cierto intervalo se revisa el mtime/tamaño
+de los archivos; si cambiaron y su hash es distinto, el catálogo se vuelve a
+cargar y se reemplaza de forma atómica (los requests en curso siguen usando la
+versión anterior hasta terminar).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+from app.services.catalogo_binario import ARCHIVO_BINARIO, COLUMNAS, ArchivoColumnar, CatalogoBinarioError, abrir as abrir_binario
+from app.services.distancias import (
+    arreglo_coordenadas, distancias_km, distancias_por_pares, dentro_del_radio, k_mas_cercanos, iterar_por_cercania
+)
+from app.services.indice_espacial import IndiceGrilla
+
+RUTA_JSON = os.path.join(os.path.dirname(os.path.dirname(__file__)), "JSON")
+ARCHIVO_BOMBEROS = "bomberos.json"
+ARCHIVO_HIDRANTES = "hidrantes.json"
+
+# Segundos entre verificaciones de cambios en disco
+INTERVALO_VERIFICACION_S = float(os.getenv("CATALOGO_INTERVALO_VERIFICACION", "5"))
+
+
+@dataclass(frozen=True, slots=True)
+class RegistroBombero:
+    """Compañía de bomberos tal como aparece en bomberos.json"""
+    id: int
+    nombre: str
+    lat: Optional[float]
+    lng: Optional[float]
+    bomberos_disponibles: Optional[int]
+    vehiculos_disponibles: Optional[int]
+    nombre_responsable: Optional[str]
+    cargo_responsable: Optional[str]
+
+    @classmethod
+    def desde_json(cls, d: Dict[str, Any]) -> "RegistroBombero":
+        return cls(
+            id=d.get("idCompaniaBomberos"),
+            nombre=d.get("nombre", ""),
+            lat=d.get("lat"),
+            lng=d.get("lng"),
+            bomberos_disponibles=d.get("bomberos_disponibles"),
+            vehiculos_disponibles=d.get("vehiculos_disponibles"),
+            nombre_responsable=d.get("nombre_responsable"),
+            cargo_responsable=d.get("cargo_responsable"),
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Representación con las mismas claves del JSON original (la usa el frontend)"""
+        return {
+            "idCompaniaBomberos": self.id,
+            "nombre": self.nombre,
+            "lat": self.lat,
+            "lng": self.lng,
+            "bomberos_disponibles": self.bomberos_disponibles,
+            "vehiculos_disponibles": self.vehiculos_disponibles,
+            "nombre_responsable": self.nombre_responsable,
+            "cargo_responsable": self.cargo_responsable,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class RegistroHidrante:
+    """Hidrante tal como aparece en hidrantes.json"""
+    id: int
+    nis: Optional[str]
+    nombre: str
+    estado: Optional[str]
+    lat: Optional[float]
+    lng: Optional[float]
+
+    @classmethod
+    def desde_json(cls, d: Dict[str, Any]) -> "RegistroHidrante":
+        return cls(
+            id=d.get("ID"),
+            nis=d.get("NIS"),
+            nombre=d.get("nombre", ""),
+            estado=d.get("estado"),
+            lat=d.get("lat"),
+            lng=d.get("lng"),
+        )
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Representación con las mismas claves del JSON original (la usa el frontend)"""
+        return {
+            "ID": self.id,
+            "NIS": self.nis,
+            "nombre": self.nombre,
+            "estado": self.estado,
+            "lat": self.lat,
+            "lng": self.lng,
+        }
+
+
+Registro = Union[RegistroBombero, RegistroHidrante]
+
+
+# Clave de los ids que no pueden estar en el catálogo (listas, objetos, null...)
+_ID_INVALIDO = object()
+
+
+def _normalizar_id(id_recurso: Any) -> Any:
+    # Los ids del catálogo son enteros; el frontend puede enviarlos como texto
+    if isinstance(id_recurso, str) and id_recurso.strip().lstrip("-").isdigit():
+        return int(id_recurso)
+    if isinstance(id_recurso, float) and id_recurso.is_integer():
+        return int(id_recurso)
+    if isinstance(id_recurso, (int, str)):
+        return id_recurso
+    # Lo demás llega de un payload JSON y puede no ser hashable: nunca coincide
+    return _ID_INVALIDO
+
+
+class TablaRecursos:
+    """Registros de un tipo de recurso con sus coordenadas en arreglos y su índice espacial"""
+
+    def __init__(self, registros: Sequence[Registro]):
+        self.registros: Tuple[Registro, ...] = tuple(registros)
+        self.lats = arreglo_coordenadas(r.lat for r in self.registros)
+        self.lngs = arreglo_coordenadas(r.lng for r in self.registros)
+        self.indice = IndiceGrilla([r.lat for r in self.registros], [r.lng for r in self.registros])
+        self.posicion_por_id: Dict[int, int] = {r.id: pos for pos, r in enumerate(self.registros)}
+
+    def __len__(self) -> int:
+        return len(self.registros)
+
+    def __getitem__(self, pos: int) -> Registro:
+        return self.registros[pos]
+
+    def __iter__(self) -> Iterator[Registro]:
+        return iter(self.registros)
+
+    def get(self, id_recurso: Any) -> Optional[Registro]:
+        """Registro por id (acepta el id como int o como texto numérico)"""
+        pos = self.posicion_por_id.get(_normalizar_id(id_recurso))
+        return None if pos is None else self[pos]
+
+    def get_many(self, ids: Iterable[Any]) -> Tuple[List[Registro], List[Any]]:
+        """Registros para una lista de ids (sin repetidos, en el orden recibido) y los ids desconocidos"""
+        encontrados: List[Registro] = []
+        desconocidos: List[Any] = []
+        vistos = set()
+        for id_recurso in ids:
+            clave = _normalizar_id(id_recurso)
+            if clave is _ID_INVALIDO:
+                desconocidos.append(id_recurso)
+                continue
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            pos = self.posicion_por_id.get(clave)
+            if pos is None:
+                desconocidos.append(id_recurso)
+            else:
+                encontrados.append(self[pos])
+        return encontrados, desconocidos
+
+    def en_radio(self, lat: float, lon: float, radio_km: float) -> List[Tuple[float, int]]:
+        """Pares (distancia_km, posición) dentro del radio, del más cercano al más lejano"""
+        posiciones = self.indice.candidatos(lat, lon, radio_km)
+        if not posiciones:
+            return []
+        distancias = distancias_km(lat, lon, self.lats, self.lngs, posiciones)
+        return dentro_del_radio(distancias, radio_km, posiciones)
+
+    def k_cercanos(self, lat: float, lon: float, k: int, radio_km: float,
+                   despues: Optional[Tuple[float, int]] = None) -> Tuple[int, List[Tuple[float, int]]]:
+        """Total de recursos dentro del radio y los k más cercanos como (distancia_km, posición).
+
+        `despues` = (distancia_km, posición) del último par ya entregado (paginación).
+        """
+        posiciones = self.indice.candidatos(lat, lon, radio_km)
+        if not posiciones:
+            return 0, []
+        distancias = distancias_km(lat, lon, self.lats, self.lngs, posiciones)
+        return k_mas_cercanos(distancias, radio_km, k, posiciones, despues)
+
+    def k_cercanos_lote(self, origenes: Sequence[Tuple[float, float]], k: int, radio_km: float,
+                        pares_por_bloque: int = 65536) -> List[Tuple[int, List[Tuple[float, int]]]]:
+        """`k_cercanos` para varios orígenes (lat, lon) a la vez, en el mismo orden.
+
+        Se consulta el índice por cada origen y las distancias (origen, candidato)
+        se calculan en bloques vectorizados de hasta `pares_por_bloque` pares (así
+        los arreglos intermedios siguen siendo chicos); solo la selección de los
+        k más cercanos se hace por origen.
+        """
+        resultados: List[Tuple[int, List[Tuple[float, int]]]] = []
+        bloque: List[Tuple[float, float, List[int]]] = []
+        pares = 0
+        for lat, lon in origenes:
+            posiciones = self.indice.candidatos(lat, lon, radio_km)
+            bloque.append((lat, lon, posiciones))
+            pares += len(posiciones)
+            if pares >= pares_por_bloque:
+                resultados.extend(self._k_cercanos_bloque(bloque, k, radio_km))
+                bloque, pares = [], 0
+        if bloque:
+            resultados.extend(self._k_cercanos_bloque(bloque, k, radio_km))
+        return resultados
+
+    def _k_cercanos_bloque(self, bloque: List[Tuple[float, float, List[int]]], k: int,
+                           radio_km: float) -> List[Tuple[int, List[Tuple[float, int]]]]:
+        cantidades = [len(posiciones) for _, _, posiciones in bloque]
+        if np is not None:
+            lats_origen = np.repeat(np.asarray([lat for lat, _, _ in bloque], dtype=np.float64), cantidades)
+            lons_origen = np.repeat(np.asarray([lon for _, lon, _ in bloque], dtype=np.float64), cantidades)
+            todas = np.fromiter(chain.from_iterable(p for _, _, p in bloque), dtype=np.intp, count=sum(cantidades))
+        else:
+            lats_origen = [lat for (lat, _, _), n in zip(bloque, cantidades) for _ in range(n)]
+            lons_origen = [lon for (_, lon, _), n in zip(bloque, cantidades) for _ in range(n)]
+            todas = list(chain.from_iterable(p for _, _, p in bloque))
+        distancias = distancias_por_pares(lats_origen, lons_origen, self.lats, self.lngs, todas)
+
+        resultados = []
+        inicio = 0
+        for _, _, posiciones in bloque:
+            fin = inicio + len(posiciones)
+            if posiciones:
+                # Con NumPy se pasa la vista del arreglo ya armado (evita reconvertir la lista)
+                resultados.append(k_mas_cercanos(distancias[inicio:fin], radio_km, k, todas[inicio:fin]))
+            else:
+                resultados.append((0, []))
+            inicio = fin
+        return resultados
+
+    def iterar_cercanos(self, lat: float, lon: float, radio_km: float,
+                        despues: Optional[Tuple[float, int]] = None) -> Tuple[int, Iterator[Tuple[float, int]]]:
+        """Total dentro del radio y un iterador (distancia_km, posición) del más cercano al más lejano"""
+        posiciones = self.indice.candidatos(lat, lon, radio_km)
+        if not posiciones:
+            return 0, iter(())
+        distancias = distancias_km(lat, lon, self.lats, self.lngs, posiciones)
+        return iterar_por_cercania(distancias, radio_km, posiciones, despues)
+
+
+class TablaColumnar(TablaRecursos):
+    """Tabla respaldada por el archivo binario mapeado en memoria (ver catalogo_binario).
+
+    Las coordenadas se leen sin copiar desde el mmap y los registros se arman
+    solo cuando se piden (por ejemplo, los k devueltos en una consulta).
+    """
+
+    def __init__(self, archivo: ArchivoColumnar, tabla: str, clase: type):
+        self.archivo = archivo
+        self.clase = clase
+        self._filas = archivo.filas(tabla)
+        self._lectores = [(campo, archivo.lector(tabla, campo)) for campo, _, _ in COLUMNAS[tabla]]
+        self.lats = archivo.numerica(tabla, "lat")
+        self.lngs = archivo.numerica(tabla, "lng")
+        self.indice = IndiceGrilla(self.lats.tolist(), self.lngs.tolist())
+        self.posicion_por_id = {id_recurso: pos for pos, id_recurso in enumerate(archivo.numerica(tabla, "id").tolist())}
+
+    def __len__(self) -> int:
+        return self._filas
+
+    def __getitem__(self, pos: int) -> Registro:
+        if pos < 0:
+            pos += self._filas
+        if not 0 <= pos < self._filas:
+            raise IndexError(pos)
+        return self.clase(**{campo: leer(pos) for campo, leer in self._lectores})
+
+    def __iter__(self) -> Iterator[Registro]:
+        return (self[pos] for pos in range(self._filas))
+
+    @property
+    def registros(self) -> Tuple[Registro, ...]:
+        return tuple(self)
+
+
+@dataclass(frozen=True, slots=True)
+class FirmaArchivo:
+    """Identifica el contenido de un archivo para detectar cambios"""
+    mtime_ns: int
+    tamano: int
+    sha256: str
+
+
+@dataclass(frozen=True)
+class CatalogoSnapshot:
+    """Versión inmutable del catálogo; se reemplaza completa en cada recarga"""
+    version: str
+    bomberos: TablaRecursos
+    hidrantes: TablaRecursos
+    firmas: Dict[str, FirmaArchivo]
+    cargado_en: float
+    duracion_carga_ms: float
+    origen: str = "json"  # "json" o "binario"
+    firma_binario: Optional[Tuple[int, int]] = None
+
+
+def _leer_archivo(ruta: str) -> Tuple[bytes, FirmaArchivo]:
+    st = os.stat(ruta)
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    firma = FirmaArchivo(st.st_mtime_ns, st.st_size, hashlib.sha256(contenido).hexdigest())
+    return contenido, firma
+
+
+class CatalogoRecursos:
+    """Mantiene en memoria el catálogo vigente y lo recarga cuando cambia en disco"""
+
+    def __init__(self, directorio: str = RUTA_JSON, intervalo_s: float = INTERVALO_VERIFICACION_S):
+        self.directorio = directorio
+        self.intervalo_s = intervalo_s
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogoSnapshot] = None
+        self._ultima_verificacion = 0.0
+        self._recargas = 0
+        self._ultimo_error: Optional[str] = None
+
+    def _ruta(self, nombre: str) -> str:
+        return os.path.join(self.directorio, nombre)
+
+    def actual(self) -> CatalogoSnapshot:
+        """Devuelve el snapshot vigente, verificando cambios como máximo una vez por intervalo"""
+        snap = self._snapshot
+        if snap is None or time.monotonic() - self._ultima_verificacion >= self.intervalo_s:
+            self._verificar()
+            snap = self._snapshot
+        return snap
+
+    def cargar(self) -> CatalogoSnapshot:
+        """Fuerza una carga completa desde disco (usado al iniciar la aplicación)"""
+        with self._lock:
+            self._cargar()
+            return self._snapshot
+
+    def _verificar(self) -> None:
+        with self._lock:
+            self._ultima_verificacion = time.monotonic()
+            snap = self._snapshot
+            if snap is None:
+                self._cargar()
+                return
+            for nombre in (ARCHIVO_BOMBEROS, ARCHIVO_HIDRANTES):
+                firma = snap.firmas.get(nombre)
+                try:
+                    st = os.stat(self._ruta(nombre))
+                except OSError:
+                    continue
+                if firma is None or (st.st_mtime_ns, st.st_size) != (firma.mtime_ns, firma.tamano):
+                    self._cargar()
+                    return
+            if self._firma_binario() != snap.firma_binario:
+                self._cargar()
+
+    def _firma_binario(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self._ruta(ARCHIVO_BINARIO))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _cargar(self) -> None:
+        # Se asume que el llamador tiene tomado self._lock
+        inicio = time.perf_counter()
+        anterior = self._snapshot
+        firmas: Dict[str, FirmaArchivo] = {}
+        contenidos: Dict[str, Optional[bytes]] = {}
+        self._ultimo_error = None
+
+        for nombre in (ARCHIVO_BOMBEROS, ARCHIVO_HIDRANTES):
+            try:
+                contenidos[nombre], firmas[nombre] = _leer_archivo(self._ruta(nombre))
+            except Exception as e:
+                self._ultimo_error = f"{nombre}: {e}"
+                print(f"Error cargando {nombre}: {e}")
+                contenidos[nombre] = None
+                if anterior and nombre in anterior.firmas:
+                    # Mantener la versión anterior si la nueva no se puede leer
+                    firmas[nombre] = anterior.firmas[nombre]
+
+        version = hashlib.sha256(
+            "|".join(f.sha256 for _, f in sorted(firmas.items())).encode()
+        ).hexdigest()[:12]
+        firma_binario = self._firma_binario()
+
+        if anterior and anterior.version == version and anterior.firma_binario == firma_binario:
+            # Contenido idéntico: solo se actualizan las firmas para no volver a revisar
+            self._snapshot = CatalogoSnapshot(
+                anterior.version, anterior.bomberos, anterior.hidrantes,
+                firmas, anterior.cargado_en, anterior.duracion_carga_ms,
+                anterior.origen, anterior.firma_binario,
+            )
+            return
+
+        # Si existe el binario columnar y corresponde a los JSON vigentes se usa vía mmap;
+        # si quedó desactualizado se ignora y se parsean los JSON (fuente de verdad)
+        archivo = None
+        if firma_binario is not None and all(c is not None for c in contenidos.values()):
+            try:
+                archivo = abrir_binario(
+                    self._ruta(ARCHIVO_BINARIO),
+                    {nombre: f.sha256 for nombre, f in firmas.items()},
+                )
+            except CatalogoBinarioError as e:
+                print(f"Catálogo binario no utilizado: {e}")
+
+        tablas = {}
+        for nombre, tabla, clase in (
+            (ARCHIVO_BOMBEROS, "bomberos", RegistroBombero),
+            (ARCHIVO_HIDRANTES, "hidrantes", RegistroHidrante),
+        ):
+            previa = getattr(anterior, tabla, None)
+            if archivo is not None:
+                tablas[tabla] = TablaColumnar(archivo, tabla, clase)
+            elif contenidos[nombre] is None:
+                tablas[tabla] = previa if previa is not None else TablaRecursos([])
+            elif (previa is not None and type(previa) is TablaRecursos
+                    and anterior.firmas.get(nombre) and anterior.firmas[nombre].sha256 == firmas[nombre].sha256):
+                # Solo cambió el mtime: se reutilizan los registros ya cargados
+                tablas[tabla] = previa
+            else:
+                try:
+                    tablas[tabla] = TablaRecursos([clase.desde_json(d) for d in json.loads(contenidos[nombre])])
+                except Exception as e:
+                    self._ultimo_error = f"{nombre}: {e}"
+                    print(f"Error cargando {nombre}: {e}")
+                    tablas[tabla] = previa if previa is not None else TablaRecursos([])
+                    if anterior and nombre in anterior.firmas:
+                        firmas[nombre] = anterior.firmas[nombre]
+                    else:
+                        firmas.pop(nombre, None)
+
+        version = hashlib.sha256(
+            "|".join(f.sha256 for _, f in sorted(firmas.items())).encode()
+        ).hexdigest()[:12]
+
+        self._snapshot = CatalogoSnapshot(
+            version=version,
+            bomberos=tablas["bomberos"],
+            hidrantes=tablas["hidrantes"],
+            firmas=firmas,
+            cargado_en=time.time(),
+            duracion_carga_ms=round((time.perf_counter() - inicio) * 1000, 2),
+            origen="binario" if archivo is not None else "json",
+            firma_binario=firma_binario,
+        )
+        self._recargas += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Resumen del catálogo vigente para monitoreo"""
+        snap = self.actual()
+        return {
+            "version": snap.version,
+            "cargado_en": snap.cargado_en,
+            "duracion_carga_ms": snap.duracion_carga_ms,
+            "recargas": self._recargas,
+            "ultimo_error": self._ultimo_error,
+            "origen": snap.origen,
+            "registros": {
+                "bomberos": len(snap.bomberos),
+                "hidrantes": len(snap.hidrantes),
+            },
+            "indices": {
+                "bomberos": snap.bomberos.indice.estadisticas(),
+                "hidrantes": snap.hidrantes.indice.estadisticas(),
+            },
+            "archivos": {
+                nombre: {"tamano": f.tamano, "sha256": f.sha256}
+                for nombre, f in snap.firmas.items()
+            },
+        }
+
+
+# Instancia única por proceso
+catalogo = CatalogoRecursos()
+
+
+def get_catalogo() -> CatalogoRecursos:
+    return catalogo
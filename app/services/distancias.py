@@ -0,0 +1,238 @@
+# app/services/distancias.py
+"""Cálculo de distancias haversine, escalar y por lotes.
+
+Con NumPy instalado los lotes se calculan vectorizados; sin NumPy se usa un
+recorrido en Python puro con la misma fórmula. Ambos caminos dan el mismo
+resultado que la versión escalar (diferencias < 1e-9 km).
+"""
+import heapq
+from math import radians, sin, cos, sqrt, atan2, isnan
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+RADIO_TIERRA_KM = 6371
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia en km entre dos puntos (fórmula haversine)."""
+    lat1_rad = radians(lat1)
+    lat2_rad = radians(lat2)
+    delta_lat = radians(lat2 - lat1)
+    delta_lon = radians(lon2 - lon1)
+
+    a = sin(delta_lat/2)**2 + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lon/2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1-a))
+
+    return RADIO_TIERRA_KM * c
+
+
+def arreglo_coordenadas(valores: Iterable[Optional[float]]):
+    """Convierte coordenadas a un arreglo float64 (NaN donde falte el valor)."""
+    datos = [float("nan") if v is None else float(v) for v in valores]
+    if np is not None:
+        return np.asarray(datos, dtype=np.float64)
+    return datos
+
+
+def distancias_km(lat: float, lon: float, lats, lngs, posiciones: Optional[Sequence[int]] = None):
+    """Distancias desde un origen a todos los puntos (o solo a `posiciones`).
+
+    Devuelve un arreglo NumPy (o una lista sin NumPy) alineado con `posiciones`
+    si se indicaron, o con `lats`/`lngs` en caso contrario. Los puntos sin
+    coordenadas dan NaN.
+    """
+    if np is not None:
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        if posiciones is not None:
+            idx = np.asarray(posiciones, dtype=np.intp)
+            lats = lats[idx]
+            lngs = lngs[idx]
+        lat1_rad = np.radians(lat)
+        lat2_rad = np.radians(lats)
+        delta_lat = np.radians(lats - lat)
+        delta_lon = np.radians(lngs - lon)
+        a = np.sin(delta_lat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon/2)**2
+        return RADIO_TIERRA_KM * (2 * np.arctan2(np.sqrt(a), np.sqrt(1-a)))
+
+    if posiciones is None:
+        posiciones = range(len(lats))
+    nan = float("nan")
+    return [
+        nan if (lats[i] is None or isnan(lats[i]) or lngs[i] is None or isnan(lngs[i]))
+        else haversine_km(lat, lon, lats[i], lngs[i])
+        for i in posiciones
+    ]
+
+
+def matriz_distancias_km(lats_origen: Sequence[float], lons_origen: Sequence[float], lats, lngs,
+                         posiciones: Optional[Sequence[int]] = None):
+    """Distancias desde N orígenes a M puntos: matriz N x M (lista de listas sin NumPy)."""
+    if np is not None:
+        la0 = np.asarray(lats_origen, dtype=np.float64)[:, None]
+        lo0 = np.asarray(lons_origen, dtype=np.float64)[:, None]
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        if posiciones is not None:
+            idx = np.asarray(posiciones, dtype=np.intp)
+            lats = lats[idx]
+            lngs = lngs[idx]
+        lats = lats[None, :]
+        lngs = lngs[None, :]
+        delta_lat = np.radians(lats - la0)
+        delta_lon = np.radians(lngs - lo0)
+        a = np.sin(delta_lat/2)**2 + np.cos(np.radians(la0)) * np.cos(np.radians(lats)) * np.sin(delta_lon/2)**2
+        return RADIO_TIERRA_KM * (2 * np.arctan2(np.sqrt(a), np.sqrt(1-a)))
+
+    return [distancias_km(la, lo, lats, lngs, posiciones) for la, lo in zip(lats_origen, lons_origen)]
+
+
+def distancias_por_pares(lats_origen: Sequence[float], lons_origen: Sequence[float], lats, lngs,
+                         posiciones: Sequence[int]):
+    """Distancia del i-ésimo origen al punto `posiciones[i]`, para todo i (un solo cálculo vectorizado)."""
+    if np is not None:
+        idx = np.asarray(posiciones, dtype=np.intp)
+        la0 = np.asarray(lats_origen, dtype=np.float64)
+        lo0 = np.asarray(lons_origen, dtype=np.float64)
+        la1 = np.asarray(lats, dtype=np.float64)[idx]
+        lo1 = np.asarray(lngs, dtype=np.float64)[idx]
+        delta_lat = np.radians(la1 - la0)
+        delta_lon = np.radians(lo1 - lo0)
+        a = np.sin(delta_lat/2)**2 + np.cos(np.radians(la0)) * np.cos(np.radians(la1)) * np.sin(delta_lon/2)**2
+        return RADIO_TIERRA_KM * (2 * np.arctan2(np.sqrt(a), np.sqrt(1-a)))
+
+    nan = float("nan")
+    return [
+        nan if (lats[i] is None or isnan(lats[i]) or lngs[i] is None or isnan(lngs[i]))
+        else haversine_km(la, lo, lats[i], lngs[i])
+        for la, lo, i in zip(lats_origen, lons_origen, posiciones)
+    ]
+
+
+def _redondear(elegidas):
+    """Redondea a 2 decimales igual que round() de Python (arreglo NumPy)."""
+    redondeadas = np.round(elegidas, 2)
+    # np.round puede diferir de round() de Python justo en el medio (x.xx5);
+    # esos casos se redondean con round() para coincidir con la versión escalar
+    centesimas = elegidas * 100
+    dudosas = np.flatnonzero(np.abs(centesimas - np.floor(centesimas) - 0.5) < 1e-6)
+    for i in dudosas.tolist():
+        redondeadas[i] = round(float(elegidas[i]), 2)
+    return redondeadas
+
+
+def dentro_del_radio(distancias, radio_km: float, posiciones: Optional[Sequence[int]] = None) -> List[tuple]:
+    """Pares (distancia_km redondeada a 2 decimales, posición) dentro del radio,
+    ordenados del más cercano al más lejano (a igual distancia, por posición)."""
+    if np is not None:
+        distancias = np.asarray(distancias, dtype=np.float64)
+        mascara = distancias <= radio_km
+        seleccion = np.flatnonzero(mascara)
+        if posiciones is not None:
+            seleccion = np.asarray(posiciones, dtype=np.intp)[seleccion]
+        redondeadas = _redondear(distancias[mascara])
+        orden = np.lexsort((seleccion, redondeadas))
+        return list(zip(redondeadas[orden].tolist(), seleccion[orden].tolist()))
+
+    if posiciones is None:
+        posiciones = range(len(distancias))
+    encontrados = [(round(d, 2), pos) for d, pos in zip(distancias, posiciones) if d <= radio_km]
+    encontrados.sort()
+    return encontrados
+
+
+def _posterior_a(redondeadas, seleccion, despues: Tuple[float, int]):
+    """Máscara de los pares (distancia redondeada, posición) ubicados después del cursor"""
+    distancia, posicion = despues
+    return (redondeadas > distancia) | ((redondeadas == distancia) & (seleccion > posicion))
+
+
+def k_mas_cercanos(distancias, radio_km: float, k: int, posiciones: Optional[Sequence[int]] = None,
+                   despues: Optional[Tuple[float, int]] = None) -> Tuple[int, List[tuple]]:
+    """Los k pares (distancia_km, posición) más cercanos dentro del radio y el total de coincidencias.
+
+    El orden es el mismo que `dentro_del_radio(...)[:k]`, pero sin ordenar todas
+    las coincidencias: selección parcial con NumPy o un heap acotado a k sin NumPy.
+    Con `despues` (un par ya devuelto) se omiten ese par y los anteriores; el
+    total sigue contando todas las coincidencias del radio.
+    """
+    if np is not None:
+        distancias = np.asarray(distancias, dtype=np.float64)
+        mascara = distancias <= radio_km
+        seleccion = np.flatnonzero(mascara)
+        total = int(seleccion.size)
+        if posiciones is not None:
+            seleccion = np.asarray(posiciones, dtype=np.intp)[seleccion]
+        elegidas = distancias[mascara]
+        if despues is not None:
+            siguientes = _posterior_a(_redondear(elegidas), seleccion, despues)
+            elegidas = elegidas[siguientes]
+            seleccion = seleccion[siguientes]
+        if elegidas.size > k > 0:
+            # Umbral: k-ésima distancia más chica; se conservan las que no lo superan
+            # (un pequeño margen cubre el redondeo a 2 decimales y los empates)
+            umbral = np.partition(elegidas, k - 1)[k - 1]
+            cerca = elegidas <= umbral + 0.01
+            elegidas = elegidas[cerca]
+            seleccion = seleccion[cerca]
+        redondeadas = _redondear(elegidas)
+        orden = np.lexsort((seleccion, redondeadas))[:max(k, 0)]
+        return total, list(zip(redondeadas[orden].tolist(), seleccion[orden].tolist()))
+
+    if posiciones is None:
+        posiciones = range(len(distancias))
+    total = 0
+
+    def en_radio():
+        nonlocal total
+        for d, pos in zip(distancias, posiciones):
+            if d <= radio_km:
+                total += 1
+                par = (round(d, 2), pos)
+                if despues is None or par > despues:
+                    yield par
+
+    candidatos = en_radio()
+    mejores = heapq.nsmallest(max(k, 0), candidatos)
+    # Con k == 0 nsmallest no recorre nada: se termina de contar el total
+    for _ in candidatos:
+        pass
+    return total, mejores
+
+
+def iterar_por_cercania(distancias, radio_km: float, posiciones: Optional[Sequence[int]] = None,
+                        despues: Optional[Tuple[float, int]] = None) -> Tuple[int, Iterator[tuple]]:
+    """Total de coincidencias y un iterador de pares (distancia_km, posición) del más cercano al más lejano.
+
+    Los pares se extraen de un heap a medida que se piden, así el primero está
+    disponible sin ordenar todo el resultado (mismo orden que `dentro_del_radio`).
+    """
+    if posiciones is None:
+        posiciones = range(len(distancias))
+    if np is not None:
+        distancias = np.asarray(distancias, dtype=np.float64)
+        mascara = distancias <= radio_km
+        seleccion = np.asarray(posiciones, dtype=np.intp)[mascara]
+        redondeadas = _redondear(distancias[mascara])
+        total = int(seleccion.size)
+        if despues is not None:
+            siguientes = _posterior_a(redondeadas, seleccion, despues)
+            redondeadas = redondeadas[siguientes]
+            seleccion = seleccion[siguientes]
+        heap = list(zip(redondeadas.tolist(), seleccion.tolist()))
+    else:
+        heap = [(round(d, 2), pos) for d, pos in zip(distancias, posiciones) if d <= radio_km]
+        total = len(heap)
+        if despues is not None:
+            heap = [par for par in heap if par > despues]
+    heapq.heapify(heap)
+
+    def extraer():
+        while heap:
+            yield heapq.heappop(heap)
+
+    return total, extraer()
@@ -0,0 +1,146 @@
+# app/services/eventos_emergencias.py
+"""Eventos de cambios de emergencias para GET /api/emergencias/stream (SSE).
+
+Pub/sub en proceso: las vistas que crean o modifican una emergencia publican
+un evento después del commit y cada conexión SSE abierta lo recibe por su
+propia cola acotada, sin consultar la base. Los últimos EVENTOS_BUFFER
+eventos quedan en un buffer circular: un cliente que se reconecta con
+Last-Event-ID recibe los que se perdió.
+
+Si el Last-Event-ID ya no está en el buffer (o es de otro proceso o de antes
+de un reinicio: los ids llevan un prefijo aleatorio por proceso) no se puede
+completar y el cliente recibe un evento "recargar". Un cliente lento cuya
+cola se llena se desconecta tras recibir lo encolado; al reconectarse
+recupera el resto desde el buffer.
+
+Como los cachés, es por proceso: con varios workers cada uno solo ve lo que
+publica él mismo, así que el stream necesita un único proceso con hilos (o
+gevent). Cada conexión abierta ocupa un hilo, no una conexión a la BD.
+"""
+import json
+import os
+import queue
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+EVENTOS_BUFFER = int(os.getenv("EVENTOS_BUFFER", "500"))
+EVENTOS_COLA = int(os.getenv("EVENTOS_COLA", "100"))
+# Comentario SSE cada tantos segundos sin eventos (mantiene viva la conexión
+# en proxies y detecta clientes desconectados)
+EVENTOS_LATIDO_S = float(os.getenv("EVENTOS_LATIDO_S", "15"))
+# Espera del navegador antes de reconectarse
+EVENTOS_REINTENTO_MS = 3000
+
+
+@dataclass(frozen=True)
+class Evento:
+    numero: int
+    id: str
+    tipo: str
+    datos: Dict[str, Any]
+
+    def a_sse(self) -> str:
+        datos = json.dumps(self.datos, ensure_ascii=False)
+        return f"id: {self.id}\nevent: {self.tipo}\ndata: {datos}\n\n"
+
+
+class Suscripcion:
+    def __init__(self, capacidad: int):
+        self.cola: "queue.Queue[Evento]" = queue.Queue(maxsize=capacidad)
+        self.desbordada = False
+
+
+class CanalEventos:
+    def __init__(self, tamano_buffer: int, tamano_cola: int):
+        self._lock = threading.Lock()
+        self._instancia = secrets.token_hex(4)
+        self._ultimo = 0
+        self._buffer: "deque[Evento]" = deque(maxlen=tamano_buffer)
+        self._tamano_cola = tamano_cola
+        self._suscripciones: Set[Suscripcion] = set()
+
+    def _id(self, numero: int) -> str:
+        return f"{self._instancia}-{numero}"
+
+    def publicar(self, tipo: str, datos: Dict[str, Any]) -> Evento:
+        with self._lock:
+            self._ultimo += 1
+            evento = Evento(self._ultimo, self._id(self._ultimo), tipo, datos)
+            self._buffer.append(evento)
+            for s in self._suscripciones:
+                try:
+                    s.cola.put_nowait(evento)
+                except queue.Full:
+                    s.desbordada = True
+        return evento
+
+    def _pendientes(self, ultimo_id: str) -> Optional[List[Evento]]:
+        """Eventos posteriores a `ultimo_id`, o None si no se pueden completar"""
+        instancia, _, numero = ultimo_id.partition("-")
+        if instancia != self._instancia or not numero.isdigit() or int(numero) > self._ultimo:
+            return None
+        numero = int(numero)
+        primero = self._buffer[0].numero if self._buffer else self._ultimo + 1
+        if numero < primero - 1:
+            return None
+        return [e for e in self._buffer if e.numero > numero]
+
+    def suscribir(self, ultimo_id: Optional[str] = None) -> Tuple[Suscripcion, Optional[List[Evento]], str]:
+        """
+        Registra una suscripción. Devuelve (suscripción, eventos a reenviar o
+        None si hay que recargar, id del último evento publicado). La
+        suscripción y los eventos a reenviar se calculan juntos: no se pierde
+        ni se repite ningún evento.
+        """
+        with self._lock:
+            s = Suscripcion(self._tamano_cola)
+            self._suscripciones.add(s)
+            pendientes = self._pendientes(ultimo_id) if ultimo_id else []
+            return s, pendientes, self._id(self._ultimo)
+
+    def desuscribir(self, s: Suscripcion) -> None:
+        with self._lock:
+            self._suscripciones.discard(s)
+
+    def flujo(self, ultimo_id: Optional[str] = None, latido_s: float = EVENTOS_LATIDO_S) -> Iterator[str]:
+        """Texto SSE para una conexión: reenvío desde `ultimo_id` y luego eventos en vivo"""
+        s, pendientes, id_actual = self.suscribir(ultimo_id)
+        try:
+            yield f"retry: {EVENTOS_REINTENTO_MS}\n\n"
+            if pendientes is None:
+                yield f"id: {id_actual}\nevent: recargar\ndata: {{}}\n\n"
+            else:
+                for evento in pendientes:
+                    yield evento.a_sse()
+            while True:
+                try:
+                    evento = s.cola.get(timeout=latido_s)
+                except queue.Empty:
+                    yield ": latido\n\n"
+                    continue
+                yield evento.a_sse()
+                if s.desbordada and s.cola.empty():
+                    # Se descartaron eventos: el cliente se reconecta con el último
+                    # id recibido y los recupera del buffer
+                    return
+        finally:
+            self.desuscribir(s)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clientes": len(self._suscripciones),
+                "ultimo_id": self._id(self._ultimo),
+                "en_buffer": len(self._buffer),
+            }
+
+
+canal_emergencias = CanalEventos(tamano_buffer=EVENTOS_BUFFER, tamano_cola=EVENTOS_COLA)
+
+
+def datos_emergencia(emergencia, **extra: Any) -> Dict[str, Any]:
+    """Datos de un evento de emergencia: fila del listado y marcador del mapa"""
+    return {"emergencia": emergencia.a_dict(), "marcador": emergencia.a_marcador(), **extra}
@@ -0,0 +1,180 @@
+# app/services/importacion_emergencias.py
+"""Importación masiva de emergencias desde CSV o JSONL
+(scripts/importar_emergencias.py y POST /api/emergencias/bulk).
+
+Cada fila se valida con validar_emergencia, con las mismas reglas que POST
+/api/emergencias, y además puede traer fecha_reporte y fecha_cierre, para
+migrar registros históricos. Las filas válidas se insertan de a
+IMPORTACION_LOTE con un INSERT de varias filas (executemany /
+insertmanyvalues). Cada lote va en su propia transacción junto con sus
+conteos de estadisticas_emergencias.
+
+Una fila inválida se informa con su número y no detiene la importación. Si la
+base rechaza un lote, se reintenta por mitades para informar solo las filas
+que fallan. Un archivo que no se puede seguir leyendo (bytes que no son UTF-8,
+CSV mal formado) detiene la lectura: lo leído hasta ahí se inserta y el
+resultado lo informa en error_archivo, con los lotes ya confirmados.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models.models import Emergencia
+from app.repositories import estadisticas as estadisticas_repo
+from app.repositories import versiones as versiones_repo
+from app.services.validacion_emergencias import validar_emergencia
+
+FORMATOS_IMPORTACION = ("csv", "jsonl")
+IMPORTACION_LOTE = int(os.getenv("IMPORTACION_LOTE", "1000"))
+# Errores que se detallan en el resultado (el resto solo se cuenta)
+MAX_ERRORES_INFORMADOS = 1000
+
+# (número de fila, payload de la emergencia)
+FilaImportada = Tuple[int, Any]
+
+
+def lineas_utf8(flujo: BinaryIO) -> Iterator[str]:
+    """Líneas de un flujo binario decodificadas de a una (UTF-8, con o sin BOM).
+
+    Un byte inválido falla en su propia línea: con io.TextIOWrapper fallaría al
+    decodificar el bloque que lo contiene, antes de entregar las filas válidas
+    que lo preceden.
+    """
+    for numero, linea in enumerate(flujo):
+        yield linea.decode("utf-8-sig" if numero == 0 else "utf-8")
+
+
+def leer_csv(flujo: Iterable[str]) -> Iterator[FilaImportada]:
+    """Filas de un CSV con encabezado (fila 1 = primera fila de datos)"""
+    return enumerate(csv.DictReader(flujo), start=1)
+
+
+def leer_jsonl(flujo: Iterable[str]) -> Iterator[FilaImportada]:
+    """Un objeto JSON por línea (fila = número de línea); las líneas vacías se saltean"""
+    for numero, linea in enumerate(flujo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except ValueError:
+            # validar_emergencia la informa como fila inválida
+            yield numero, None
+
+
+def leer(flujo: Iterable[str], formato: str) -> Iterator[FilaImportada]:
+    if formato not in FORMATOS_IMPORTACION:
+        raise ValueError(f"formato debe ser {' o '.join(FORMATOS_IMPORTACION)}")
+    return leer_csv(flujo) if formato == "csv" else leer_jsonl(flujo)
+
+
+@dataclass
+class ResultadoImportacion:
+    insertadas: int = 0
+    total_errores: int = 0
+    errores: List[Dict[str, Any]] = field(default_factory=list)
+    # Motivo por el que no se leyó el archivo completo
+    error_archivo: Optional[str] = None
+
+    def agregar_error(self, fila: int, error: str) -> None:
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES_INFORMADOS:
+            self.errores.append({"fila": fila, "error": error})
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "insertadas": self.insertadas,
+            "con_errores": self.total_errores,
+            "errores": self.errores,
+            "error_archivo": self.error_archivo,
+        }
+
+
+def _hasta_error(filas: Iterable[FilaImportada], resultado: ResultadoImportacion) -> Iterator[FilaImportada]:
+    """Las filas hasta el primer error de lectura, que queda en resultado.error_archivo.
+
+    El cuerpo se decodifica línea por línea (lineas_utf8): un byte inválido
+    aparece recién al llegar a su línea, con las filas anteriores ya leídas y
+    los lotes anteriores ya confirmados.
+    """
+    numero = 0
+    try:
+        for numero, data in filas:
+            yield numero, data
+    except (csv.Error, UnicodeDecodeError) as ex:
+        resultado.error_archivo = f"Archivo inválido después de la fila {numero}: {ex}"
+
+
+def _mensaje(ex: SQLAlchemyError) -> str:
+    return str(getattr(ex, "orig", None) or ex)
+
+
+def _insertar(db: Session, filas: List[Dict[str, Any]]) -> None:
+    # INSERT de Core sobre la tabla: el bulk insert del ORM parte el lote cada vez
+    # que cambian las columnas en NULL de una fila a otra
+    db.execute(insert(Emergencia.__table__), filas)
+    # Conteo agregado de /api/estadisticas, en la misma transacción
+    estadisticas_repo.registrar_altas(db, filas)
+    versiones_repo.incrementar(db, versiones_repo.EMERGENCIAS)
+    db.commit()
+
+
+def _insertar_lote(db: Session, lote: List[Tuple[int, Dict[str, Any]]], resultado: ResultadoImportacion) -> None:
+    try:
+        _insertar(db, [valores for _, valores in lote])
+        resultado.insertadas += len(lote)
+        return
+    except SQLAlchemyError as ex:
+        db.rollback()
+        if len(lote) == 1:
+            resultado.agregar_error(lote[0][0], _mensaje(ex))
+            return
+
+    # La base rechazó el lote: se reintenta por mitades hasta aislar las filas
+    # que fallan (pocas sentencias si son pocas, en vez de una por fila)
+    mitad = len(lote) // 2
+    _insertar_lote(db, lote[:mitad], resultado)
+    _insertar_lote(db, lote[mitad:], resultado)
+
+
+def importar(db: Session, filas: Iterable[FilaImportada], usuario_id: Optional[int] = None,
+             lote: int = IMPORTACION_LOTE,
+             al_confirmar: Optional[Callable[[ResultadoImportacion], None]] = None) -> ResultadoImportacion:
+    """
+    Valida e inserta las filas, confirmando cada lote (no hace falta commit
+    después). Las filas se consumen de a una: la memoria depende del tamaño
+    del lote, no del archivo. Un error de lectura no se propaga: queda en
+    resultado.error_archivo.
+
+    Args:
+        filas: (número de fila, payload) como los de leer()
+        usuario_id: usuario que figura como autor de las emergencias
+        al_confirmar: se llama con el resultado parcial tras cada lote
+    """
+    resultado = ResultadoImportacion()
+    ahora = datetime.utcnow()
+    pendientes: List[Tuple[int, Dict[str, Any]]] = []
+    for numero, data in _hasta_error(filas, resultado):
+        try:
+            valores = validar_emergencia(data, ahora, con_fechas=True)
+        except ValueError as ex:
+            resultado.agregar_error(numero, str(ex))
+            continue
+        valores["usuario_municipal_id_usuario"] = usuario_id
+        pendientes.append((numero, valores))
+        if len(pendientes) >= lote:
+            _insertar_lote(db, pendientes, resultado)
+            pendientes = []
+            if al_confirmar:
+                al_confirmar(resultado)
+    if pendientes:
+        _insertar_lote(db, pendientes, resultado)
+        if al_confirmar:
+            al_confirmar(resultado)
+    return resultado
@@ -0,0 +1,89 @@
+# app/services/indice_espacial.py
+"""Índice espacial de grilla uniforme para consultas por radio.
+
+Los puntos se agrupan en celdas de tamaño fijo (en grados). Una consulta por
+radio solo revisa las celdas que intersectan la caja envolvente del círculo y
+devuelve las posiciones candidatas; la verificación exacta (haversine) la hace
+el llamador.
+"""
+from math import cos, floor, radians
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Kilómetros por grado de latitud (R = 6371 km)
+KM_POR_GRADO = 6371 * 3.141592653589793 / 180
+
+# 0.02° ≈ 2.2 km: con radios típicos de 5-15 km en Lima/Callao se revisan
+# pocas decenas/cientos de celdas y cada una tiene unas decenas de hidrantes
+TAMANO_CELDA_DEFAULT = 0.02
+
+
+def caja_envolvente(lat: float, lng: float, radio_km: float) -> Optional[Tuple[float, float, float, float]]:
+    """Caja (lat_min, lat_max, lng_min, lng_max) que contiene el círculo del radio.
+
+    Es conservadora: el ancho en longitud se calcula con la latitud más cercana
+    al polo dentro de la banda, así ningún punto dentro del radio queda fuera.
+    Devuelve None si el círculo alcanza un polo o da la vuelta al globo.
+    """
+    dlat = radio_km / KM_POR_GRADO
+    lat_extrema = abs(lat) + dlat
+    if lat_extrema >= 89.9:
+        return None
+    dlng = radio_km / (KM_POR_GRADO * cos(radians(lat_extrema)))
+    if dlng >= 180:
+        return None
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+class IndiceGrilla:
+    """Grilla lat/lng -> posiciones de los puntos en la secuencia original"""
+
+    def __init__(self, lats: Sequence[Optional[float]], lngs: Sequence[Optional[float]],
+                 tamano_celda: float = TAMANO_CELDA_DEFAULT):
+        self.tamano_celda = tamano_celda
+        self.celdas: Dict[Tuple[int, int], List[int]] = {}
+        self.total = 0
+        for pos, (lat, lng) in enumerate(zip(lats, lngs)):
+            if lat is None or lng is None or lat != lat or lng != lng:
+                # Sin coordenadas (None o NaN)
+                continue
+            self.celdas.setdefault(self._celda(lat, lng), []).append(pos)
+            self.total += 1
+
+    def _celda(self, lat: float, lng: float) -> Tuple[int, int]:
+        return floor(lat / self.tamano_celda), floor(lng / self.tamano_celda)
+
+    def candidatos(self, lat: float, lng: float, radio_km: float) -> List[int]:
+        """Posiciones de los puntos cuyas celdas intersectan la caja del radio.
+
+        El resultado puede incluir puntos fuera del radio (ver `caja_envolvente`).
+        """
+        caja = caja_envolvente(lat, lng, radio_km)
+        if caja is None:
+            return sorted(p for posiciones in self.celdas.values() for p in posiciones)
+
+        lat_min, lat_max, lng_min, lng_max = caja
+        i0, j0 = self._celda(lat_min, lng_min)
+        i1, j1 = self._celda(lat_max, lng_max)
+
+        resultado: List[int] = []
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.celdas):
+            # Radio muy grande respecto a la grilla: es más barato recorrer las celdas ocupadas
+            for (i, j), posiciones in self.celdas.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    resultado.extend(posiciones)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    posiciones = self.celdas.get((i, j))
+                    if posiciones:
+                        resultado.extend(posiciones)
+        return resultado
+
+    def estadisticas(self) -> Dict[str, float]:
+        ocupadas = len(self.celdas)
+        return {
+            "puntos": self.total,
+            "celdas_ocupadas": ocupadas,
+            "tamano_celda_grados": self.tamano_celda,
+            "max_por_celda": max((len(p) for p in self.celdas.values()), default=0),
+        }
@@ -0,0 +1,123 @@
+# app/services/validacion_emergencias.py
+"""Validación de los datos de una emergencia nueva.
+
+La usan POST /api/emergencias y la importación masiva
+(app/services/importacion_emergencias.py): mismas reglas y mismos mensajes.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from app.constants.geo import ALL_DISTRICTS, LIMA_CALLAO_BBOX
+from app.constants.status import ESTADOS_CIERRE, normalizar_estado
+from app.models.models import Emergencia
+
+
+def _texto(data: Dict[str, Any], *claves: str) -> str:
+    """Primer valor presente entre `claves` (nombre del formulario y de la columna)"""
+    for clave in claves:
+        valor = data.get(clave)
+        if valor:
+            return str(valor).strip()
+    return ""
+
+
+def _a_float(v) -> Optional[float]:
+    # Lat/Lon pueden venir como string
+    try:
+        if v is None or v == "":
+            return None
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _a_fecha(valor: Any, campo: str) -> Optional[datetime]:
+    """Fecha ISO ('YYYY-MM-DD HH:MM:SS' o con T); con zona horaria se pasa a UTC"""
+    if valor is None or valor == "":
+        return None
+    try:
+        fecha = datetime.fromisoformat(str(valor).strip())
+    except ValueError:
+        raise ValueError(f"{campo} debe tener formato YYYY-MM-DD HH:MM:SS.")
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+# Largo máximo de las columnas de texto
+_LARGOS = {
+    c.name: c.type.length
+    for c in Emergencia.__table__.columns
+    if getattr(c.type, "length", None)
+}
+
+
+def validar_emergencia(data: Dict[str, Any], ahora: datetime, con_fechas: bool = False) -> Dict[str, Any]:
+    """
+    Columnas de la emergencia a insertar (sin el usuario) a partir del payload.
+
+    - fecha_reporte: `ahora`
+    - fecha_cierre: `ahora` si el estado implica cierre; en caso contrario, None
+    - con_fechas (importación): fecha_reporte y fecha_cierre pueden venir en el
+      payload y reemplazan a esos valores
+
+    Lanza ValueError con el mensaje para el usuario si los datos no son válidos.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Cada emergencia debe ser un objeto JSON.")
+
+    # Extraer y normalizar payload
+    nombre = _texto(data, "nombre", "Nombre_emergencia")
+    descripcion = _texto(data, "descripcion", "detalles")
+    tipo = _texto(data, "tipo", "emergency_type")
+    estado = _texto(data, "estado", "emergency_status")
+    direccion = _texto(data, "direccion", "location")
+    distrito = _texto(data, "distrito", "distrito_lima")
+
+    lat = _a_float(data.get("lat"))
+    lon = _a_float(data.get("lon"))
+
+    # Validación mínima
+    if not nombre:
+        raise ValueError("El nombre de la emergencia es obligatorio.")
+
+    # Validaciones de ámbito Lima Metropolitana
+    # 1) Distrito es obligatorio y debe pertenecer a Lima Metropolitana
+    if not distrito:
+        raise ValueError("Debe seleccionar un distrito de Lima Metropolitana.")
+    if distrito not in ALL_DISTRICTS:
+        raise ValueError("Solo se permiten distritos de Lima Metropolitana.")
+
+    # 2) Si hay coordenadas, deben caer dentro de la caja de Lima
+    if lat is not None and lon is not None:
+        bbox = LIMA_CALLAO_BBOX
+        if not (bbox["south"] <= lat <= bbox["north"] and bbox["west"] <= lon <= bbox["east"]):
+            raise ValueError("Las coordenadas deben ubicarse dentro de Lima Metropolitana.")
+
+    # Normalización de estado para coincidir con los valores de la BD ('ABIERTO', 'EN CURSO', 'CERRADO')
+    estado_norm = normalizar_estado(estado)
+
+    valores = {
+        "Nombre_emergencia": nombre,
+        "descripcion": descripcion or None,
+        "tipo": tipo or None,
+        "estado": estado_norm or None,
+        "fecha_reporte": ahora,
+        "fecha_cierre": ahora if (estado_norm in ESTADOS_CIERRE) else None,
+        "lat": lat,
+        "lon": lon,
+        "direccion": direccion or None,
+        "distrito": distrito or None,
+    }
+    if con_fechas:
+        valores["fecha_reporte"] = _a_fecha(data.get("fecha_reporte"), "fecha_reporte") or ahora
+        fecha_cierre = _a_fecha(data.get("fecha_cierre"), "fecha_cierre")
+        if fecha_cierre is not None:
+            valores["fecha_cierre"] = fecha_cierre
+
+    # Textos dentro del largo de sus columnas
+    for columna, largo in _LARGOS.items():
+        valor = valores.get(columna)
+        if isinstance(valor, str) and len(valor) > largo:
+            raise ValueError(f"{columna} no puede superar {largo} caracteres.")
+    return valores
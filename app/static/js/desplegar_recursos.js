@@ -349,7 +349,14 @@ async function manejarDespliegue(event) {
         const data = await response.json();
         
         if (!response.ok || !data.ok) {
-            throw new Error(data.error || 'Error al desplegar recursos');
+            let mensaje = data.error || 'Error al desplegar recursos';
+            // Recursos que ya no existen en el catálogo (se informan por id)
+            if (data.ids_desconocidos) {
+                const { bomberos = [], hidrantes = [] } = data.ids_desconocidos;
+                if (bomberos.length) mensaje += `\nBomberos desconocidos: ${bomberos.join(', ')}`;
+                if (hidrantes.length) mensaje += `\nHidrantes desconocidos: ${hidrantes.join(', ')}`;
+            }
+            throw new Error(mensaje);
         }
         
         // Redirigir al reporte de la emergencia
@@ -31,27 +31,44 @@
       }catch(e){}
     }
 
-    markers.forEach(m => {
-      if (typeof m.lat === 'number' && typeof m.lon === 'number') {
-        const popup = [`<b>${m.nombre || ''}</b>`];
-        if (m.distrito) popup.push(`${m.distrito}`);
-        if (m.estado) popup.push(`<small>Estado: ${m.estado}</small>`);
-        // Enlazar a detalle si tenemos id
-        if (m.id) {
-          popup.push(`<a href="/emergencias/${m.id}" class="text-blue-600 underline text-xs">Ver detalle</a>`);
-        }
-        const marker = L.marker([m.lat, m.lon]).addTo(group)
-          .bindPopup(popup.join('<br/>'));
+    function escapar(texto){
+      const div = document.createElement('div');
+      div.textContent = texto == null ? '' : String(texto);
+      return div.innerHTML;
+    }
+
+    function popupHtml(m){
+      const popup = [`<b>${escapar(m.nombre)}</b>`];
+      if (m.distrito) popup.push(`${escapar(m.distrito)}`);
+      if (m.estado) popup.push(`<small>Estado: ${escapar(m.estado)}</small>`);
+      // Enlazar a detalle si tenemos id
+      if (m.id) {
+        popup.push(`<a href="/emergencias/${m.id}" class="text-blue-600 underline text-xs">Ver detalle</a>`);
+      }
+      return popup.join('<br/>');
+    }
+
+    // Crea el marcador, o actualiza posición y popup si ya existe
+    function upsertMarker(m){
+      if (typeof m.lat !== 'number' || typeof m.lon !== 'number') return;
+      const existente = m.id !== undefined ? byId.get(String(m.id)) : null;
+      if (existente) {
+        existente.setLatLng([m.lat, m.lon]).setPopupContent(popupHtml(m));
+        return;
+      }
+      const marker = L.marker([m.lat, m.lon]).addTo(group)
+        .bindPopup(popupHtml(m));
+      if(m.id !== undefined){
+        byId.set(String(m.id), marker);
+      }
+      marker.on('click', ()=>{
         if(m.id !== undefined){
-          byId.set(String(m.id), marker);
+          highlightRow(String(m.id));
         }
-        marker.on('click', ()=>{
-          if(m.id !== undefined){
-            highlightRow(String(m.id));
-          }
-        });
-      }
-    });
+      });
+    }
+
+    markers.forEach(upsertMarker);
 
     // Si hay marcadores, ajustar a sus límites; si no, vista por defecto
     if (group.getLayers().length > 0) {
@@ -68,6 +85,7 @@
       map,
       group,
       byId,
+      upsertMarker,
       focusById: function(id){
         const mk = byId.get(String(id));
         if(mk){
@@ -86,9 +104,49 @@
     };
   }
 
+  // Aviso flotante para recargar el listado cuando hay cambios que la tabla no muestra
+  function avisoRecarga(texto){
+    let aviso = document.getElementById('aviso-cambios');
+    if (!aviso) {
+      aviso = document.createElement('button');
+      aviso.id = 'aviso-cambios';
+      aviso.type = 'button';
+      aviso.className = 'fixed bottom-4 right-4 z-[1000] rounded-lg bg-primary text-white text-sm font-bold px-4 py-2 shadow-lg';
+      aviso.addEventListener('click', ()=> window.location.reload());
+      document.body.appendChild(aviso);
+    }
+    aviso.textContent = texto + ' · Actualizar';
+  }
+
+  // Cambios en vivo (GET /api/emergencias/stream, Server-Sent Events). El
+  // navegador se reconecta solo y recupera lo perdido con Last-Event-ID.
+  function escucharCambios(){
+    if (!window.EventSource) return;
+    const fuente = new EventSource('/api/emergencias/stream');
+    const actualizar = (ev) => {
+      let datos;
+      try { datos = JSON.parse(ev.data); } catch (e) { return; }
+      const ctx = window._MAP_CTX;
+      if (datos.marcador && ctx && ctx.upsertMarker) ctx.upsertMarker(datos.marcador);
+      if (ev.type === 'creada') {
+        avisoRecarga('Nueva emergencia: ' + ((datos.emergencia && datos.emergencia.nombre) || ''));
+      } else if (datos.emergencia && document.querySelector("tr[data-id='" + datos.emergencia.id + "']")) {
+        avisoRecarga('Emergencia ' + datos.emergencia.id + ' actualizada');
+      }
+    };
+    ['creada', 'actualizada', 'estado'].forEach(tipo => fuente.addEventListener(tipo, actualizar));
+    fuente.addEventListener('importadas', (ev) => {
+      let datos = {};
+      try { datos = JSON.parse(ev.data); } catch (e) {}
+      avisoRecarga((datos.insertadas || 0) + ' emergencias importadas');
+    });
+    fuente.addEventListener('recargar', ()=> avisoRecarga('Hay cambios sin mostrar'));
+  }
+
   if (document.readyState === 'loading') {
-    document.addEventListener('DOMContentLoaded', init);
+    document.addEventListener('DOMContentLoaded', ()=>{ init(); escucharCambios(); });
   } else {
     init();
+    escucharCambios();
   }
 })();
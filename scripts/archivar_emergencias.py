@@ -0,0 +1,90 @@
+# scripts/archivar_emergencias.py
+"""
+Mueve las emergencias cerradas hace más de --dias días (con sus recursos,
+despliegues y acciones) a las tablas de archivo (<tabla>_archivo), por lotes.
+
+Cada lote es una transacción: si el proceso se interrumpe, lo ya movido queda
+archivado y basta con volver a ejecutarlo para seguir. Crea las tablas de
+archivo si no existen, así que también sirve de migración. Con --simular solo
+cuenta cuántas emergencias se archivarían.
+
+Requiere que la base no reutilice los ids de las filas borradas (tablas con
+AUTOINCREMENT en SQLite, MySQL 8.0 o superior); se verifica antes de empezar.
+
+Uso:
+    python scripts/archivar_emergencias.py [--dias 365] [--lote 500] [--pausa 0] [--simular]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.repositories.db import Base, SessionLocal, engine
+from app.repositories import archivo as archivo_repo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=archivo_repo.ARCHIVO_DIAS,
+                        help="Antigüedad mínima desde el cierre (default: ARCHIVO_DIAS o 365)")
+    parser.add_argument("--lote", type=int, default=archivo_repo.ARCHIVO_LOTE,
+                        help="Emergencias por transacción (default: ARCHIVO_LOTE o 500)")
+    parser.add_argument("--pausa", type=float, default=0.0, help="Segundos de espera entre lotes")
+    parser.add_argument("--simular", action="store_true", help="Solo contar, sin mover nada")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ARCHIVO DE EMERGENCIAS CERRADAS")
+    print("=" * 60 + "\n")
+
+    antes_de = datetime.utcnow() - timedelta(days=args.dias)
+    print(f"📅 Cerradas antes de {antes_de:%Y-%m-%d %H:%M} (más de {args.dias} días)")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=archivo_repo.TABLAS_ARCHIVO)
+
+        with SessionLocal() as db:
+            motivo = archivo_repo.reutiliza_ids(db)
+            if motivo:
+                print(f"❌ No se puede archivar: {motivo}")
+                sys.exit(1)
+            pendientes = archivo_repo.contar_candidatas(db, antes_de)
+        print(f"📦 Emergencias a archivar: {pendientes}")
+        if args.simular or not pendientes:
+            print("\n✅ Nada que mover\n" if not pendientes else "\n✅ Simulación completada\n")
+            return
+
+        movidas = 0
+        inicio = time.perf_counter()
+        while True:
+            with SessionLocal() as db:
+                ids = archivo_repo.archivar_lote(db, antes_de, args.lote)
+                db.commit()
+            if not ids:
+                break
+            movidas += len(ids)
+            print(f"  ✅ Lote archivado: {len(ids)} emergencias (ids {ids[0]}..{ids[-1]}), "
+                  f"{movidas}/{pendientes}")
+            if args.pausa:
+                time.sleep(args.pausa)
+
+        segundos = time.perf_counter() - inicio
+        print(f"\n✅ Archivo completado ({movidas} emergencias en {segundos:.1f} s)\n")
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrumpido: los lotes confirmados quedan archivados; volver a ejecutar para seguir")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error durante el archivado: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# scripts/bench_despliegue.py
+"""
+Benchmark de la escritura de un despliegue (POST /api/desplegar-recursos):
+un db.add() por fila vs un INSERT por tabla (registrar_despliegue).
+
+Por defecto usa una base SQLite temporal; con --url se mide sobre otra base
+(las filas creadas se borran al terminar).
+
+Uso:
+    python scripts/bench_despliegue.py [--tamanos 1,50,500] [--repeticiones 20] [--url mysql+pymysql://...]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+_temporal = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+os.environ["DATABASE_URL"] = f"sqlite:///{_temporal}"
+
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import sessionmaker
+
+from app.repositories.db import Base
+from app.repositories import db as db_modulo
+from app.models.models import Accion, Emergencia, Recurso, RecursoDesplazado
+from app.repositories.despliegues import registrar_despliegue
+from app.services.distancias import haversine_km
+
+Registro = namedtuple("Registro", "id nombre lat lng")
+
+
+def por_fila(db, emergencia, recursos, descripcion, ahora):
+    """Implementación anterior: un objeto ORM (y un INSERT) por fila"""
+    for clave, tipo, tipo_desplazado, estado in (("bomberos", "bombero", 1, "EN_CAMINO"),
+                                                 ("hidrantes", "hidrante", 2, "IDENTIFICADO")):
+        for r in recursos[clave]:
+            distancia = haversine_km(float(emergencia.lat), float(emergencia.lon), r.lat, r.lng)
+            db.add(Recurso(
+                tipo_recurso=tipo, entidad_recurso=str(r.id),
+                lat=Decimal(str(r.lat)), lon=Decimal(str(r.lng)),
+                direccion=r.nombre or '', distancia_recurso=f"{round(distancia, 2)} km",
+                emergencias_id_emergencias=emergencia.id_emergencias,
+            ))
+    for clave, tipo, tipo_desplazado, estado in (("bomberos", "bombero", 1, "EN_CAMINO"),
+                                                 ("hidrantes", "hidrante", 2, "IDENTIFICADO")):
+        for r in recursos[clave]:
+            db.add(RecursoDesplazado(tipo_recurso_deplazado=tipo_desplazado, hora_salida=ahora,
+                                     estado=estado, emergencias_id_emergencias=emergencia.id_emergencias))
+    db.add(Accion(tipo_accion='DESPLIEGUE_RECURSOS', descripcion_durante_emer=descripcion,
+                  fecha_hora=ahora, emergencias_id_emergencias=emergencia.id_emergencias))
+
+
+def recursos_sinteticos(rnd, n):
+    registros = [Registro(i, f"Recurso {i}", rnd.uniform(-12.2, -11.9), rnd.uniform(-77.15, -76.9))
+                 for i in range(1, n + 1)]
+    mitad = n // 2
+    return {"bomberos": registros[:mitad], "hidrantes": registros[mitad:]}
+
+
+def medir(Sesion, escribir, emergencia_id, recursos, repeticiones):
+    """(ms promedio por despliegue, sentencias INSERT por despliegue)"""
+    sentencias = []
+    contar = lambda *a: sentencias.append(a[2])
+    event.listen(Sesion.kw["bind"], "before_cursor_execute", contar)
+    try:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            with Sesion() as db:
+                emergencia = db.get(Emergencia, emergencia_id)
+                escribir(db, emergencia, recursos, "Bench", datetime.utcnow())
+                db.commit()
+        ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    finally:
+        event.remove(Sesion.kw["bind"], "before_cursor_execute", contar)
+    inserts = sum(1 for s in sentencias if s.lstrip().upper().startswith("INSERT"))
+    return ms, inserts / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", default="1,50,500")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--url", default=None, help="Base de datos a usar (default: SQLite temporal)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url) if args.url else db_modulo.engine
+    Base.metadata.create_all(bind=engine)
+    Sesion = sessionmaker(bind=engine, autoflush=False, future=True)
+
+    with Sesion() as db:
+        emergencia = Emergencia(Nombre_emergencia="Bench despliegue", lat=-12.05, lon=-77.04, estado="ABIERTO")
+        db.add(emergencia)
+        db.commit()
+        emergencia_id = emergencia.id_emergencias
+
+    rnd = random.Random(42)
+    print(f"{'recursos':>9} {'por fila ms':>12} {'INSERTs':>8} {'lote ms':>9} {'INSERTs':>8} {'x':>6}")
+    try:
+        for n in (int(t) for t in args.tamanos.split(",")):
+            recursos = recursos_sinteticos(rnd, n)
+            t_fila, s_fila = medir(Sesion, por_fila, emergencia_id, recursos, args.repeticiones)
+            t_lote, s_lote = medir(Sesion, registrar_despliegue, emergencia_id, recursos, args.repeticiones)
+            print(f"{n:>9} {t_fila:>12.2f} {s_fila:>8.0f} {t_lote:>9.2f} {s_lote:>8.0f} {t_fila / t_lote:>6.1f}")
+    finally:
+        with Sesion() as db:
+            for modelo in (Recurso, RecursoDesplazado, Accion):
+                db.execute(delete(modelo).where(modelo.emergencias_id_emergencias == emergencia_id))
+            db.execute(delete(Emergencia).where(Emergencia.id_emergencias == emergencia_id))
+            db.commit()
+        os.unlink(_temporal)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/bench_indice_espacial.py
+"""
+Benchmark de consultas por radio: recorrido completo vs índice de grilla.
+Genera catálogos sintéticos dentro de Lima/Callao de 10k a 1M puntos.
+
+Uso:
+    python scripts/bench_indice_espacial.py [--consultas 20] [--tamanos 10000,100000,1000000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.constants.geo import LIMA_CALLAO_BBOX
+from app.services.indice_espacial import IndiceGrilla
+from app.services.distancias import haversine_km as calcular_distancia
+
+
+def recorrido_completo(lats, lngs, lat, lng, radio_km):
+    return [
+        i for i, (la, ln) in enumerate(zip(lats, lngs))
+        if calcular_distancia(lat, lng, la, ln) <= radio_km
+    ]
+
+
+def con_indice(indice, lats, lngs, lat, lng, radio_km):
+    return [
+        i for i in indice.candidatos(lat, lng, radio_km)
+        if calcular_distancia(lat, lng, lats[i], lngs[i]) <= radio_km
+    ]
+
+
+def medir(fn, consultas):
+    inicio = time.perf_counter()
+    resultados = [fn(*c) for c in consultas]
+    return (time.perf_counter() - inicio) * 1000 / len(consultas), resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--tamanos", default="10000,100000,1000000")
+    parser.add_argument("--radios", default="1,5,15")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    bbox = LIMA_CALLAO_BBOX
+    tamanos = [int(t) for t in args.tamanos.split(",")]
+    radios = [float(r) for r in args.radios.split(",")]
+
+    print(f"{'puntos':>10} {'radio':>6} {'completo ms':>12} {'indice ms':>10} {'x':>7} {'resultados':>11}")
+    for n in tamanos:
+        lats = [rnd.uniform(bbox["south"], bbox["north"]) for _ in range(n)]
+        lngs = [rnd.uniform(bbox["west"], bbox["east"]) for _ in range(n)]
+        t = time.perf_counter()
+        indice = IndiceGrilla(lats, lngs)
+        construccion_ms = (time.perf_counter() - t) * 1000
+        print(f"{n:>10} construcción del índice: {construccion_ms:.0f} ms, {len(indice.celdas)} celdas")
+
+        for radio in radios:
+            consultas = [
+                (rnd.uniform(-12.2, -11.9), rnd.uniform(-77.15, -76.9), radio)
+                for _ in range(args.consultas)
+            ]
+            # El recorrido completo es lento con catálogos grandes: menos repeticiones
+            muestra = consultas[:max(1, args.consultas * 10000 // n)]
+            t_completo, r_completo = medir(lambda *c: recorrido_completo(lats, lngs, *c), muestra)
+            t_indice, r_indice = medir(lambda *c: con_indice(indice, lats, lngs, *c), consultas)
+            assert [sorted(r) for r in r_completo] == [sorted(r) for r in r_indice[:len(muestra)]]
+            promedio = sum(len(r) for r in r_indice) / len(r_indice)
+            print(f"{n:>10} {radio:>6g} {t_completo:>12.2f} {t_indice:>10.2f} {t_completo / t_indice:>7.1f} {promedio:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# scripts/construir_catalogo_binario.py
+"""
+Genera app/JSON/catalogo.bin (formato columnar para mmap) a partir de
+bomberos.json e hidrantes.json. Los JSON siguen siendo la fuente de verdad:
+el binario guarda el sha256 de cada JSON y la aplicación lo ignora si no coincide.
+
+Uso:
+    python scripts/construir_catalogo_binario.py             # construir
+    python scripts/construir_catalogo_binario.py --verificar # comparar binario vs JSON
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.services.catalogo_binario import ARCHIVO_BINARIO, COLUMNAS, CatalogoBinarioError, abrir, construir
+from app.services.catalogo_recursos import RUTA_JSON, ARCHIVO_BOMBEROS, ARCHIVO_HIDRANTES
+
+FUENTES = {"bomberos": ARCHIVO_BOMBEROS, "hidrantes": ARCHIVO_HIDRANTES}
+
+
+def leer_fuentes(directorio):
+    """Devuelve (registros por tabla, sha256 por archivo JSON)"""
+    datos, hashes = {}, {}
+    for tabla, nombre in FUENTES.items():
+        with open(os.path.join(directorio, nombre), "rb") as f:
+            contenido = f.read()
+        hashes[nombre] = hashlib.sha256(contenido).hexdigest()
+        datos[tabla] = json.loads(contenido)
+    return datos, hashes
+
+
+def construir_binario(directorio):
+    print("🔧 Construyendo catálogo binario...")
+    datos, hashes = leer_fuentes(directorio)
+    contenido = construir(datos, hashes)
+
+    destino = os.path.join(directorio, ARCHIVO_BINARIO)
+    # Escribir en un temporal y renombrar: los procesos que tienen mapeado el
+    # archivo anterior lo siguen viendo intacto hasta recargar
+    fd, temporal = tempfile.mkstemp(dir=directorio, prefix=".catalogo-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.chmod(temporal, 0o644)
+        os.replace(temporal, destino)
+    except Exception:
+        os.unlink(temporal)
+        raise
+
+    tamano_json = sum(os.path.getsize(os.path.join(directorio, n)) for n in FUENTES.values())
+    for tabla, filas in datos.items():
+        print(f"  ✅ {tabla}: {len(filas)} registros")
+    print(f"  📦 {destino}: {len(contenido):,} bytes (JSON: {tamano_json:,} bytes)\n")
+
+
+def _iguales(a, b):
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def verificar_binario(directorio):
+    """Compara registro por registro el binario con los JSON. Devuelve True si coinciden."""
+    print("🔍 Verificando consistencia catálogo binario vs JSON...")
+    datos, hashes = leer_fuentes(directorio)
+    try:
+        archivo = abrir(os.path.join(directorio, ARCHIVO_BINARIO), hashes)
+    except CatalogoBinarioError as e:
+        print(f"  ❌ {e}")
+        return False
+
+    errores = 0
+    for tabla, filas in datos.items():
+        if archivo.filas(tabla) != len(filas):
+            print(f"  ❌ {tabla}: {archivo.filas(tabla)} filas en el binario, {len(filas)} en el JSON")
+            errores += 1
+            continue
+        for campo, clave, _ in COLUMNAS[tabla]:
+            leer = archivo.lector(tabla, campo)
+            for pos, fila in enumerate(filas):
+                if not _iguales(leer(pos), fila.get(clave)):
+                    errores += 1
+                    if errores <= 10:
+                        print(f"  ❌ {tabla}[{pos}].{clave}: {leer(pos)!r} != {fila.get(clave)!r}")
+        print(f"  ✅ {tabla}: {len(filas)} registros revisados")
+
+    if errores:
+        print(f"❌ {errores} diferencias encontradas\n")
+        return False
+    print("✅ El catálogo binario coincide con los JSON\n")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verificar", action="store_true", help="Solo comparar el binario existente con los JSON")
+    parser.add_argument("--directorio", default=RUTA_JSON)
+    args = parser.parse_args()
+
+    try:
+        if args.verificar:
+            sys.exit(0 if verificar_binario(args.directorio) else 1)
+        construir_binario(args.directorio)
+        if not verificar_binario(args.directorio):
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
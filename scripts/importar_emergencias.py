@@ -0,0 +1,92 @@
+# scripts/importar_emergencias.py
+"""
+Importa emergencias en bloque desde un CSV (con encabezado) o un JSONL (un
+objeto por línea), por ejemplo registros históricos del sistema anterior o un
+escenario de simulacro.
+
+Cada fila lleva los mismos campos que POST /api/emergencias (nombre,
+descripcion, tipo, estado, direccion, distrito, lat, lon) y, opcionalmente,
+fecha_reporte y fecha_cierre (YYYY-MM-DD HH:MM:SS, UTC). Se valida igual que
+en la API. Las filas con errores se informan y no detienen la importación.
+Cada lote se confirma por separado.
+
+Uso:
+    python scripts/importar_emergencias.py ARCHIVO [--formato csv|jsonl] [--lote 1000] [--usuario ID]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.repositories.db import SessionLocal
+from app.services import importacion_emergencias as importacion
+
+# Extensión de archivo -> formato
+EXTENSIONES = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+# Errores que se muestran en consola
+ERRORES_MOSTRADOS = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archivo", type=Path)
+    parser.add_argument("--formato", choices=importacion.FORMATOS_IMPORTACION,
+                        help="Default: según la extensión (.csv, .jsonl, .ndjson)")
+    parser.add_argument("--lote", type=int, default=importacion.IMPORTACION_LOTE,
+                        help="Filas por INSERT y por transacción (default: IMPORTACION_LOTE o 1000)")
+    parser.add_argument("--usuario", type=int, default=None, help="id_usuario que figura como autor")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IMPORTACIÓN MASIVA DE EMERGENCIAS")
+    print("=" * 60 + "\n")
+
+    formato = args.formato or EXTENSIONES.get(args.archivo.suffix.lower())
+    if formato is None:
+        print(f"❌ No se reconoce el formato de {args.archivo.name}; indicar --formato")
+        sys.exit(1)
+    if not args.archivo.is_file():
+        print(f"❌ No existe el archivo {args.archivo}")
+        sys.exit(1)
+
+    print(f"📂 Archivo: {args.archivo} ({formato}, lotes de {args.lote})")
+
+    def progreso(resultado):
+        print(f"  ✅ {resultado.insertadas} insertadas, {resultado.total_errores} con errores")
+
+    inicio = time.perf_counter()
+    try:
+        with open(args.archivo, "rb") as flujo, SessionLocal() as db:
+            resultado = importacion.importar(db, importacion.leer(importacion.lineas_utf8(flujo), formato),
+                                             usuario_id=args.usuario, lote=args.lote,
+                                             al_confirmar=progreso)
+    except Exception as e:
+        print(f"❌ Error durante la importación: {e}")
+        print("   Los lotes ya confirmados quedaron guardados")
+        sys.exit(1)
+    segundos = time.perf_counter() - inicio
+
+    for error in resultado.errores[:ERRORES_MOSTRADOS]:
+        print(f"  ⚠️  Fila {error['fila']}: {error['error']}")
+    if resultado.total_errores > ERRORES_MOSTRADOS:
+        print(f"  ... y {resultado.total_errores - ERRORES_MOSTRADOS} errores más")
+
+    if resultado.error_archivo:
+        print(f"\n❌ {resultado.error_archivo}")
+        print(f"   Las {resultado.insertadas} emergencias anteriores quedaron guardadas")
+        sys.exit(1)
+
+    filas_s = resultado.insertadas / segundos if segundos else 0
+    print(f"\n✅ Importación completada: {resultado.insertadas} insertadas, "
+          f"{resultado.total_errores} con errores ({segundos:.1f} s, {filas_s:.0f} filas/s)\n")
+
+
+if __name__ == "__main__":
+    main()
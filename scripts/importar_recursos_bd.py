@@ -0,0 +1,131 @@
+# scripts/importar_recursos_bd.py
+"""
+Importa el catálogo de recursos (app/JSON/bomberos.json e hidrantes.json) a las
+tablas companias_bomberos e hidrantes, creándolas con su índice espacial si no
+existen (R*Tree en SQLite, SPATIAL INDEX en MySQL 8.0 o superior).
+
+Es idempotente: cada ejecución reemplaza el contenido de ambas tablas en una
+sola transacción. Los ids del JSON se conservan como clave primaria, así
+recursos.entidad_recurso sigue apuntando al mismo registro.
+
+Uso:
+    python scripts/importar_recursos_bd.py [--directorio app/JSON]
+
+Después de importar, RECURSOS_FUENTE=bd hace que /api/recursos/* consulte la BD.
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import delete, func, insert, select, text
+
+from app.repositories.db import Base, SessionLocal, engine
+from app.models.models import CompaniaBomberos, Hidrante
+from app.repositories import versiones as versiones_repo
+from app.services.catalogo_recursos import RUTA_JSON, ARCHIVO_BOMBEROS, ARCHIVO_HIDRANTES
+
+LOTE = 2000
+
+
+def filas_bomberos(registros):
+    for r in registros:
+        yield {
+            "id_compania_bomberos": int(r["idCompaniaBomberos"]),
+            "nombre": r.get("nombre") or "",
+            "lat": float(r["lat"]),
+            "lng": float(r["lng"]),
+            "bomberos_disponibles": r.get("bomberos_disponibles"),
+            "vehiculos_disponibles": r.get("vehiculos_disponibles"),
+            "nombre_responsable": r.get("nombre_responsable"),
+            "cargo_responsable": r.get("cargo_responsable"),
+        }
+
+
+def filas_hidrantes(registros):
+    for r in registros:
+        yield {
+            "id_hidrante": int(r["ID"]),
+            "nis": None if r.get("NIS") is None else str(r["NIS"]),
+            "nombre": r.get("nombre") or "",
+            "estado": r.get("estado"),
+            "lat": float(r["lat"]),
+            "lng": float(r["lng"]),
+        }
+
+
+def coordenadas_validas(r) -> bool:
+    """lat/lng numéricas y dentro de rango: en MySQL la columna generada
+    `ubicacion` (POINT SRID 4326, NOT NULL) rechaza cualquier otra fila"""
+    try:
+        lat, lng = float(r.get("lat")), float(r.get("lng"))
+    except (TypeError, ValueError):
+        return False
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def verificar_motor():
+    """El índice espacial de MySQL usa el atributo SRID de columna (MySQL 8.0+)"""
+    if engine.dialect.name != "mysql":
+        return
+    with engine.connect() as conexion:
+        version = conexion.scalar(text("SELECT VERSION()"))
+    if "mariadb" in version.lower() or int(version.split(".")[0]) < 8:
+        raise RuntimeError(f"se requiere MySQL 8.0 o superior (servidor: {version})")
+
+
+def importar(db, modelo, archivo, convertir):
+    with open(archivo, "r", encoding="utf-8") as f:
+        registros = json.load(f)
+    # Sin coordenadas válidas no se pueden ubicar: se omiten
+    validos = [r for r in registros if coordenadas_validas(r)]
+
+    db.execute(delete(modelo))
+    filas = list(convertir(validos))
+    for i in range(0, len(filas), LOTE):
+        db.execute(insert(modelo), filas[i:i + LOTE])
+
+    omitidos = len(registros) - len(validos)
+    print(f"  ✅ {modelo.__tablename__}: {len(filas)} registros importados"
+          + (f" ({omitidos} sin coordenadas válidas omitidos)" if omitidos else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorio", default=RUTA_JSON)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("IMPORTACIÓN DEL CATÁLOGO DE RECURSOS A LA BASE DE DATOS")
+    print("=" * 60 + "\n")
+
+    try:
+        verificar_motor()
+        print("🔧 Creando tablas e índices espaciales (si no existen)...")
+        Base.metadata.create_all(bind=engine, tables=[CompaniaBomberos.__table__, Hidrante.__table__])
+
+        print("📥 Importando registros...")
+        with SessionLocal() as db:
+            importar(db, CompaniaBomberos, os.path.join(args.directorio, ARCHIVO_BOMBEROS), filas_bomberos)
+            importar(db, Hidrante, os.path.join(args.directorio, ARCHIVO_HIDRANTES), filas_hidrantes)
+            # Invalida los ETag de /api/recursos/* con RECURSOS_FUENTE=bd
+            versiones_repo.incrementar(db, versiones_repo.RECURSOS)
+            db.commit()
+
+            total = db.scalar(select(func.count()).select_from(Hidrante))
+            print(f"\n✅ Importación completada ({total} hidrantes en la BD)\n")
+    except Exception as e:
+        print(f"❌ Error durante la importación: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# scripts/migrate_add_emergencia_fulltext.py
+"""
+Script de migración para crear el índice de texto completo del buscador de
+emergencias (nombre, descripción y dirección) en una base existente:
+    - SQLite: tabla FTS5 emergencias_fts + triggers, y carga de las filas actuales
+    - MySQL: índice FULLTEXT ft_emergencias_texto (en línea, LOCK=NONE)
+
+Es idempotente: si el índice ya existe no hace nada. Después de migrar hay que
+reiniciar la aplicación para que el buscador deje de usar LIKE.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.repositories.db import engine
+from app.models.models import SENTENCIAS_TEXTO_MYSQL, SENTENCIAS_TEXTO_SQLITE
+
+
+def indice_existe(cursor, dialecto):
+    if dialecto == "mysql":
+        cursor.execute("""
+            SELECT COUNT(*)
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'emergencias'
+            AND INDEX_NAME = 'ft_emergencias_texto'
+        """)
+    else:
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'emergencias_fts'")
+    return cursor.fetchone()[0] > 0
+
+
+def migrate_emergencia_fulltext():
+    """Crea el índice de texto completo de emergencias si no existe"""
+    print("🔧 Ejecutando migración del índice de texto de emergencias...")
+    dialecto = engine.dialect.name
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if indice_existe(cursor, dialecto):
+            print("  ℹ️  El índice de texto completo ya existe")
+            return
+
+        if dialecto == "mysql":
+            print("  ➕ Creando índice FULLTEXT ft_emergencias_texto...")
+            for sql in SENTENCIAS_TEXTO_MYSQL:
+                cursor.execute(sql + ", ALGORITHM=INPLACE, LOCK=NONE")
+        else:
+            print("  ➕ Creando tabla FTS5 emergencias_fts y triggers...")
+            for sql in SENTENCIAS_TEXTO_SQLITE:
+                cursor.execute(sql)
+            # Indexa las emergencias que ya estaban cargadas
+            cursor.execute("INSERT INTO emergencias_fts(emergencias_fts) VALUES ('rebuild')")
+
+        connection.commit()
+        print("  ✅ Índice de texto completo creado")
+        print("✅ Migración completada exitosamente\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Error en la migración: {e}")
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def main():
+    print("="*60)
+    print("🚀 MIGRACIÓN: BÚSQUEDA DE TEXTO EN EMERGENCIAS")
+    print("="*60 + "\n")
+
+    try:
+        migrate_emergencia_fulltext()
+
+        print("="*60)
+        print("✅ MIGRACIÓN COMPLETADA")
+        print("="*60)
+        print()
+
+    except Exception as e:
+        print("\n" + "="*60)
+        print("❌ ERROR EN LA MIGRACIÓN")
+        print("="*60)
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
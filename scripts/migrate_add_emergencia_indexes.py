@@ -0,0 +1,106 @@
+# scripts/migrate_add_emergencia_indexes.py
+"""
+Script de migración para crear los índices compuestos de la tabla emergencias
+(declarados en Emergencia.__table_args__) en una base existente.
+
+Es idempotente: solo crea los índices que faltan. En MySQL se crean en línea
+(ALGORITHM=INPLACE, LOCK=NONE), sin bloquear lecturas ni escrituras.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.repositories.db import engine
+from app.models.models import Emergencia
+
+
+def indices_declarados():
+    """[(nombre, [columnas])] de los índices del modelo"""
+    return [(ix.name, [c.name for c in ix.columns]) for ix in Emergencia.__table__.indexes]
+
+
+def indices_existentes(cursor, dialecto):
+    if dialecto == "mysql":
+        cursor.execute("""
+            SELECT DISTINCT INDEX_NAME
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = 'emergencias'
+        """)
+    else:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'emergencias'")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate_emergencia_indexes():
+    """Crea los índices compuestos que falten en la tabla emergencias"""
+    print("🔧 Ejecutando migración de índices de emergencias...")
+    dialecto = engine.dialect.name
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        existentes = indices_existentes(cursor, dialecto)
+
+        for nombre, columnas in indices_declarados():
+            if nombre in existentes:
+                print(f"  ℹ️  Índice {nombre} ya existe")
+                continue
+
+            print(f"  ➕ Creando índice {nombre} ({', '.join(columnas)})...")
+            if dialecto == "mysql":
+                cursor.execute(f"""
+                    ALTER TABLE emergencias
+                    ADD INDEX {nombre} ({', '.join(columnas)}),
+                    ALGORITHM=INPLACE, LOCK=NONE
+                """)
+            else:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON emergencias ({', '.join(columnas)})")
+            print(f"  ✅ Índice {nombre} creado")
+
+        if dialecto == "sqlite":
+            # Actualiza las estadísticas que usa el planificador para elegir índice
+            cursor.execute("ANALYZE emergencias")
+
+        connection.commit()
+        print("✅ Migración completada exitosamente\n")
+
+    except Exception as e:
+        connection.rollback()
+        print(f"❌ Error en la migración: {e}")
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def main():
+    print("="*60)
+    print("🚀 MIGRACIÓN: ÍNDICES COMPUESTOS DE EMERGENCIAS")
+    print("="*60 + "\n")
+
+    try:
+        migrate_emergencia_indexes()
+
+        print("="*60)
+        print("✅ MIGRACIÓN COMPLETADA")
+        print("="*60)
+        print()
+
+    except Exception as e:
+        print("\n" + "="*60)
+        print("❌ ERROR EN LA MIGRACIÓN")
+        print("="*60)
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
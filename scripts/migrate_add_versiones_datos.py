@@ -0,0 +1,58 @@
+# scripts/migrate_add_versiones_datos.py
+"""
+Script de migración para crear la tabla versiones_datos (contadores de cambios
+que usan los ETag de /api/emergencias, /api/recursos/* y /emergencias/<id>).
+
+Es idempotente: si la tabla ya existe no hace nada. Hasta que exista, esas
+respuestas salen sin ETag, como antes.
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import inspect
+
+from app.repositories.db import Base, engine
+from app.models.models import VersionDatos
+
+
+def migrate_versiones_datos():
+    """Crea la tabla versiones_datos si falta"""
+    print("🔧 Ejecutando migración de versiones_datos...")
+    if inspect(engine).has_table(VersionDatos.__tablename__):
+        print(f"  ℹ️  La tabla {VersionDatos.__tablename__} ya existe")
+    else:
+        Base.metadata.create_all(bind=engine, tables=[VersionDatos.__table__])
+        print(f"  ✅ Tabla {VersionDatos.__tablename__} creada")
+    print("✅ Migración completada exitosamente\n")
+
+
+def main():
+    print("="*60)
+    print("🚀 MIGRACIÓN: VERSIONES DE DATOS (ETAG)")
+    print("="*60 + "\n")
+
+    try:
+        migrate_versiones_datos()
+
+        print("="*60)
+        print("✅ MIGRACIÓN COMPLETADA")
+        print("="*60)
+        print()
+
+    except Exception as e:
+        print("\n" + "="*60)
+        print("❌ ERROR EN LA MIGRACIÓN")
+        print("="*60)
+        print(f"Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# scripts/reconstruir_estadisticas.py
+"""
+Reconstruye la tabla de conteos agregados estadisticas_emergencias (la que
+responde GET /api/estadisticas) a partir de la tabla emergencias y de su archivo.
+
+Crea la tabla si no existe, así que también sirve de migración. Con
+--verificar solo compara los conteos guardados con los reales y muestra las
+diferencias, sin escribir nada.
+
+Uso:
+    python scripts/reconstruir_estadisticas.py [--verificar]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import func, select
+
+from app.repositories.db import Base, SessionLocal, engine
+from app.models.models import Emergencia, EmergenciaArchivada, EstadisticaEmergencias
+from app.repositories import archivo as archivo_repo
+from app.repositories import estadisticas as estadisticas_repo
+
+
+def conteos_reales(db):
+    conteos = {}
+    tablas = [Emergencia, EmergenciaArchivada] if archivo_repo.disponible(db) else [Emergencia]
+    for E in tablas:
+        for e in db.execute(select(E.fecha_reporte, E.estado, E.distrito, E.tipo).execution_options(yield_per=5000)):
+            c = estadisticas_repo.clave(e)
+            conteos[c] = conteos.get(c, 0) + 1
+    return conteos
+
+
+def conteos_guardados(db):
+    T = EstadisticaEmergencias
+    return {
+        (dia, estado, distrito, tipo): total
+        for dia, estado, distrito, tipo, total in db.execute(select(T.dia, T.estado, T.distrito, T.tipo, T.total))
+        if total
+    }
+
+
+def verificar(db):
+    reales = conteos_reales(db)
+    guardados = conteos_guardados(db)
+    diferencias = [
+        (c, guardados.get(c, 0), reales.get(c, 0))
+        for c in sorted(set(reales) | set(guardados))
+        if guardados.get(c, 0) != reales.get(c, 0)
+    ]
+    for (dia, estado, distrito, tipo), guardado, real in diferencias[:50]:
+        print(f"  ⚠️  {dia or '(sin fecha)'} | {estado} | {distrito} | {tipo}: guardado {guardado}, real {real}")
+    return diferencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verificar", action="store_true", help="Solo comparar, sin reconstruir")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ESTADÍSTICAS AGREGADAS DE EMERGENCIAS")
+    print("=" * 60 + "\n")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[EstadisticaEmergencias.__table__])
+
+        with SessionLocal() as db:
+            if args.verificar:
+                print("🔍 Comparando conteos guardados con la tabla emergencias...")
+                diferencias = verificar(db)
+                if diferencias:
+                    print(f"\n❌ {len(diferencias)} conteos difieren; ejecutar sin --verificar para reparar\n")
+                    sys.exit(1)
+                print("\n✅ Los conteos coinciden\n")
+                return
+
+            print("🔧 Recalculando conteos...")
+            filas = estadisticas_repo.reconstruir(db)
+            db.commit()
+            total = db.scalar(select(func.sum(EstadisticaEmergencias.total))) or 0
+            print(f"\n✅ Reconstrucción completada ({filas} filas, {total} emergencias)\n")
+    except Exception as e:
+        print(f"❌ Error durante la reconstrucción: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# scripts/simular_replica_sqlite.py
+"""
+Simula una réplica de lectura en local con dos archivos SQLite: copia la base
+primaria (DATABASE_URL) sobre la réplica (DATABASE_REPLICA_URL) cada --retraso
+segundos, así la réplica queda atrasada como una réplica real.
+
+La copia usa la API de backup de SQLite (instantánea consistente aunque la
+aplicación esté escribiendo).
+
+Uso:
+    DATABASE_URL=sqlite:///primaria.db DATABASE_REPLICA_URL=sqlite:///replica.db \\
+        python scripts/simular_replica_sqlite.py [--retraso 5] [--una-vez]
+
+Con la aplicación corriendo con las mismas variables, las vistas @solo_lectura
+leen de replica.db, salvo durante DB_REPLICA_VENTANA_S tras una escritura del
+mismo usuario.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy.engine import make_url
+
+
+def ruta_sqlite(url: str, variable: str) -> str:
+    if not url:
+        raise ValueError(f"{variable} no está definida")
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        raise ValueError(f"{variable} debe ser una base SQLite en archivo")
+    return url.database
+
+
+def replicar(primaria: str, replica: str) -> float:
+    """Copia primaria sobre replica; devuelve los ms que tomó"""
+    inicio = time.perf_counter()
+    origen = sqlite3.connect(primaria)
+    destino = sqlite3.connect(replica)
+    try:
+        origen.backup(destino)
+    finally:
+        destino.close()
+        origen.close()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retraso", type=float, default=5.0, help="Segundos entre copias (retraso de replicación)")
+    parser.add_argument("--una-vez", action="store_true", help="Copiar una sola vez y salir")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SIMULACIÓN DE RÉPLICA SQLITE")
+    print("=" * 60 + "\n")
+
+    try:
+        primaria = ruta_sqlite(os.getenv("DATABASE_URL"), "DATABASE_URL")
+        replica = ruta_sqlite(os.getenv("DATABASE_REPLICA_URL"), "DATABASE_REPLICA_URL")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"📤 Primaria: {primaria}")
+    print(f"📥 Réplica:  {replica}")
+    try:
+        while True:
+            ms = replicar(primaria, replica)
+            print(f"  ✅ {time.strftime('%H:%M:%S')} réplica actualizada ({ms:.0f} ms)")
+            if args.una_vez:
+                break
+            time.sleep(args.retraso)
+    except KeyboardInterrupt:
+        print("\n👋 Simulación detenida")
+    except sqlite3.Error as e:
+        print(f"❌ Error al copiar la base: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# tests/conftest.py
+"""Configuración común de los tests: una base SQLite temporal por sesión de
+pytest, con el esquema y un usuario administrador, y el cliente ya logueado.
+
+Cada módulo vacía las tablas que usa con su propio fixture.
+"""
+import os
+import shutil
+import tempfile
+
+# El engine se crea al importar app.repositories.db: la base se elige antes
+_DIRECTORIO = tempfile.mkdtemp(prefix="sisgem-tests-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_DIRECTORIO, "tests.db")
+
+import pytest
+
+from app.main import app
+from app.models.models import UsuarioMunicipal
+from app.repositories.db import Base, SessionLocal, engine
+
+EMAIL = "admin@test.pe"
+PASSWORD = "admin"
+
+
+def pytest_unconfigure(config):
+    engine.dispose()
+    shutil.rmtree(_DIRECTORIO, ignore_errors=True)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def esquema():
+    """Esquema completo y el administrador con el que se loguea `cliente`"""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add(UsuarioMunicipal(dni=1, nombre_usuario="Admin", email_usuario=EMAIL,
+                                password_usuario=PASSWORD, is_admin=True))
+        db.commit()
+
+
+@pytest.fixture()
+def cliente():
+    app.testing = True
+    c = app.test_client()
+    assert c.post("/login", data={"email": EMAIL, "password": PASSWORD}).status_code == 302
+    return c
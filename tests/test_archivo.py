@@ -0,0 +1,93 @@
+# tests/test_archivo.py
+"""Archivo de emergencias: los ids archivados no se reutilizan y el listado
+con archivo no pierde ni repite filas (app/repositories/archivo.py)."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.models.models import (
+    Accion, AccionArchivada, Emergencia, EmergenciaArchivada, EstadisticaEmergencias,
+    Recurso, RecursoArchivado, RecursoDesplazado, RecursoDesplazadoArchivado, VersionDatos,
+)
+from app.repositories import archivo as archivo_repo
+from app.repositories.db import Base, SessionLocal, engine
+
+TABLAS = [m.__table__ for m in (
+    Emergencia, Recurso, RecursoDesplazado, Accion,
+    EmergenciaArchivada, RecursoArchivado, RecursoDesplazadoArchivado, AccionArchivada,
+    EstadisticaEmergencias, VersionDatos,
+)]
+
+
+@pytest.fixture(autouse=True)
+def tablas_vacias():
+    # Volver a crearlas también reinicia los contadores de AUTOINCREMENT
+    Base.metadata.drop_all(bind=engine, tables=TABLAS)
+    Base.metadata.create_all(bind=engine, tables=TABLAS)
+
+
+def crear(cliente, nombre, estado="ABIERTO"):
+    r = cliente.post("/api/emergencias", json={"nombre": nombre, "distrito": "Lima", "estado": estado})
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()["id"]
+
+
+def archivar():
+    with SessionLocal() as db:
+        assert archivo_repo.reutiliza_ids(db) is None
+        ids = archivo_repo.archivar_lote(db, datetime.utcnow() + timedelta(days=1))
+        db.commit()
+    return ids
+
+
+def listado(cliente, limite=50):
+    """Ids del listado con archivo (filtro de fechas), recorriendo todas las páginas"""
+    ids, cursor = [], None
+    while True:
+        url = f"/api/emergencias?desde=2000-01-01&limite={limite}"
+        r = cliente.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert r.status_code == 200, r.get_json()
+        datos = r.get_json()
+        ids += [e["id"] for e in datos["data"]]
+        cursor = datos["siguiente_cursor"]
+        if not cursor:
+            return ids
+
+
+def test_archivar_y_crear_no_reutiliza_ids(cliente):
+    archivadas = [crear(cliente, f"Cerrada {i}", "CERRADO") for i in range(3)]
+    assert archivar() == archivadas
+
+    nueva = crear(cliente, "Nueva", "CERRADO")
+    assert nueva > max(archivadas)
+    assert sorted(listado(cliente)) == archivadas + [nueva]
+
+    # La nueva también se archiva sin chocar con el archivo
+    assert archivar() == [nueva]
+
+
+def test_listado_con_ids_repetidos_no_pierde_filas(cliente):
+    # Base que ya reutilizó ids: el mismo id en las tablas activas y en el archivo
+    ids = [crear(cliente, f"Emergencia {i}") for i in range(4)]
+    with SessionLocal() as db:
+        filas = [dict(f._mapping) for f in db.execute(select(*Emergencia.__table__.columns))]
+        db.execute(insert(EmergenciaArchivada.__table__), filas)
+        db.commit()
+
+    for limite in (1, 3, 50):
+        assert sorted(listado(cliente, limite)) == sorted(ids * 2)
+
+
+def test_archivar_informa_ids_repetidos(cliente):
+    id_emergencia = crear(cliente, "Cerrada", "CERRADO")
+    with SessionLocal() as db:
+        fila = dict(db.execute(select(*Emergencia.__table__.columns)).one()._mapping)
+        db.execute(insert(EmergenciaArchivada.__table__).values(**fila))
+        db.commit()
+
+    with SessionLocal() as db:
+        with pytest.raises(RuntimeError, match=rf"emergencias_archivo ya tiene filas con los ids \[{id_emergencia}\]"):
+            archivo_repo.archivar_lote(db, datetime.utcnow() + timedelta(days=1))
+        db.rollback()
+        assert db.scalar(select(Emergencia.id_emergencias)) == id_emergencia
@@ -0,0 +1,42 @@
+# tests/test_importacion.py
+"""Importación masiva: un archivo que deja de poder leerse conserva todas las
+filas anteriores (app/services/importacion_emergencias.py)."""
+import pytest
+from sqlalchemy import func, select
+
+from app.models.models import Emergencia, EstadisticaEmergencias, VersionDatos
+from app.repositories.db import Base, SessionLocal, engine
+
+TABLAS = [m.__table__ for m in (Emergencia, EstadisticaEmergencias, VersionDatos)]
+
+
+@pytest.fixture(autouse=True)
+def tablas_vacias():
+    Base.metadata.drop_all(bind=engine, tables=TABLAS)
+    Base.metadata.create_all(bind=engine, tables=TABLAS)
+
+
+def contar():
+    with SessionLocal() as db:
+        return db.scalar(select(func.count()).select_from(Emergencia))
+
+
+def test_csv_con_byte_invalido_inserta_las_filas_anteriores(cliente):
+    filas = "".join(f"Emergencia {i},Lima,ABIERTO\n" for i in range(2000))
+    cuerpo = ("﻿nombre,distrito,estado\n" + filas).encode() + b"Rota \xff,Lima,ABIERTO\n"
+
+    r = cliente.post("/api/emergencias/bulk", data=cuerpo, content_type="text/csv")
+
+    assert r.status_code == 400
+    datos = r.get_json()
+    assert datos["insertadas"] == 2000 == contar()
+    assert datos["error_archivo"].startswith("Archivo inválido después de la fila 2000")
+
+
+def test_ndjson_con_byte_invalido_en_la_primera_linea(cliente):
+    cuerpo = b'{"nombre": "Rota \xff", "distrito": "Lima", "estado": "ABIERTO"}\n'
+
+    r = cliente.post("/api/emergencias/bulk", data=cuerpo, content_type="application/x-ndjson")
+
+    assert r.status_code == 400
+    assert r.get_json()["insertadas"] == 0 == contar()
@@ -0,0 +1,66 @@
+# tests/test_replica.py
+"""Enrutamiento primario/réplica de SesionEnrutada en las vistas @solo_lectura
+(app/repositories/db.py)."""
+import pytest
+from flask import g
+from sqlalchemy import create_engine, select, text
+
+from app.main import app
+from app.models.models import VersionDatos
+from app.repositories import db as db_module
+from app.repositories.db import Base, SessionLocal, engine, solo_lectura
+
+TABLAS = [VersionDatos.__table__]
+
+
+@pytest.fixture(autouse=True)
+def tablas_vacias():
+    Base.metadata.drop_all(bind=engine, tables=TABLAS)
+    Base.metadata.create_all(bind=engine, tables=TABLAS)
+
+
+@pytest.fixture()
+def replica(monkeypatch, tmp_path):
+    # Réplica vacía (sin tablas): una escritura enviada ahí falla
+    replica = create_engine("sqlite:///" + str(tmp_path / "replica.db"))
+    monkeypatch.setattr(db_module, "engine_replica", replica)
+    yield replica
+    replica.dispose()
+
+
+def en_vista_solo_lectura(f):
+    with app.test_request_context():
+        return solo_lectura(f)()
+
+
+def test_lecturas_van_a_la_replica(replica):
+    def vista():
+        with SessionLocal() as db:
+            return [db.get_bind(clause=c) for c in (select(VersionDatos), text("SELECT 1"), None)]
+
+    assert en_vista_solo_lectura(vista) == [replica] * 3
+
+
+def test_flush_en_vista_solo_lectura_va_al_primario(replica):
+    def vista():
+        with SessionLocal() as db:
+            db.add(VersionDatos(nombre="prueba", version=1))
+            db.commit()
+            return db.info.get("escribio"), g.solo_lectura
+
+    assert en_vista_solo_lectura(vista) == (True, True)
+    with SessionLocal() as db:
+        assert db.scalar(select(VersionDatos.version).where(VersionDatos.nombre == "prueba")) == 1
+
+
+@pytest.mark.parametrize("sql", [
+    "UPDATE versiones_datos SET version = version + 1",
+    "  insert into versiones_datos (nombre, version) values ('x', 1)",
+    "SELECT version FROM versiones_datos FOR UPDATE",
+])
+def test_sql_textual_que_escribe_va_al_primario(replica, sql):
+    def vista():
+        with SessionLocal() as db:
+            return db.get_bind(clause=text(sql)), db.info.get("escribio")
+
+    assert en_vista_solo_lectura(vista) == (engine, True)